@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+REST/JSON API for RDS PaySpace Leave Converter
+Serves the Process Leave pipeline to other systems over HTTP, as its own
+process next to the Streamlit app (nginx.conf routes /api/ to it)
+
+Usage:
+    python api.py                              # http://127.0.0.1:8502
+    python api.py --host 0.0.0.0 --port 8502 --workers 2
+
+Every endpoint except /api/health needs HTTP Basic auth with an app user:
+    GET  /api/health                  liveness check
+    POST /api/convert                 leave transactions xlsx -> breakdown
+    GET  /api/employees               employee working hours as JSON
+    POST /api/employees               add or update employees from a JSON list
+    POST /api/jobs                    queue an upload as a background job
+    GET  /api/jobs                    your background jobs
+    GET  /api/jobs/{id}               one job's status and progress
+    GET  /api/jobs/{id}/result        download a finished job's breakdown
+
+Uploads are sent as the raw request body or as a multipart 'file' field.
+/api/convert and /api/jobs take ?format=xlsx|csv|parquet, ?sheet=<index or
+name> and ?public_holidays=false; /api/jobs also takes ?all_sheets=true and
+?combined=false (one breakdown per sheet in a zip).
+
+Example:
+    curl -u admin:PASSWORD --data-binary @Leave_Transactions.xlsx \\
+         "http://localhost:8502/api/convert?format=csv" -o Leave_Breakdown.csv
+"""
+
+import argparse
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import pandas as pd
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from leave_converter import pipeline
+from leave_converter.batch import batch_output_name, list_sheet_names
+from leave_converter.breakdown import iter_formatted_breakdown
+from leave_converter.employees import (EMPLOYEE_COLUMNS, diff_employee_import, get_employee_roster,
+                                       import_employees, load_employee_data, standardize_employee_columns)
+from leave_converter.holidays import get_holiday_calendar
+from leave_converter.instrumentation import perf_run
+from leave_converter.jobs import get_job_queue, job_result_path, list_jobs, read_job, submit_leave_job
+from leave_converter.users import authenticate, get_user
+from leave_converter.writers import EXPORT_FORMATS, available_export_formats, export_breakdown
+
+logger = logging.getLogger("leave_converter.api")
+
+API_PREFIX = "/api"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+# Multipart form field holding the uploaded workbook
+UPLOAD_FIELD = "file"
+DEFAULT_UPLOAD_NAME = "Leave_Transactions.xlsx"
+# Size of the pieces xlsx and parquet responses are sent in
+STREAM_CHUNK_BYTES = 1024 * 1024
+# How long a verified password is accepted without running bcrypt again
+CREDENTIAL_CACHE_SECONDS = 300
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+# ==================== AUTHENTICATION ====================
+
+# (username, stored bcrypt hash) -> (expiry, HMAC of the password keyed by
+# that hash). A repeat request within CREDENTIAL_CACHE_SECONDS skips bcrypt;
+# a password change (a new stored hash) or the expiry ends it.
+_verified_credentials = {}
+_verified_lock = threading.Lock()
+
+def _password_digest(stored_hash, password):
+    return hmac.new(stored_hash.encode('utf-8'), password.encode('utf-8'), hashlib.sha256).digest()
+
+def _recently_verified(user, password):
+    """Whether this password was verified against the user's current hash within the cache period"""
+    with _verified_lock:
+        entry = _verified_credentials.get((user['username'], user['password']))
+    return (entry is not None and entry[0] > time.monotonic()
+            and hmac.compare_digest(entry[1], _password_digest(user['password'], password)))
+
+def _remember_verified(user, password):
+    """Cache a verified password for CREDENTIAL_CACHE_SECONDS, dropping expired entries"""
+    now = time.monotonic()
+    with _verified_lock:
+        for key in [key for key, (expiry, _) in _verified_credentials.items() if expiry <= now]:
+            del _verified_credentials[key]
+        _verified_credentials[(user['username'], user['password'])] = (
+            now + CREDENTIAL_CACHE_SECONDS, _password_digest(user['password'], password))
+
+def _unauthorized():
+    return HTTPException(401, "Invalid or missing credentials",
+                         headers={'WWW-Authenticate': 'Basic realm="RDS Leave Converter"'})
+
+def authenticate_request(request):
+    """
+    The active user named by the request's HTTP Basic credentials.
+    bcrypt runs at most once per CREDENTIAL_CACHE_SECONDS for a user and
+    password; raises a 401 HTTPException when the credentials are missing
+    or wrong.
+    """
+    scheme, _, encoded = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'basic' or not encoded:
+        raise _unauthorized()
+    try:
+        username, _, password = base64.b64decode(encoded, validate=True).decode('utf-8').partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        raise _unauthorized()
+
+    user = get_user(username)
+    if user is not None and user['active'] and _recently_verified(user, password):
+        return user
+
+    valid, user = authenticate(username, password)
+    if not valid:
+        raise _unauthorized()
+    # authenticate may have rehashed the password at the configured cost
+    user = get_user(username)
+    if user is None:
+        # Deleted or renamed since the password was checked
+        raise _unauthorized()
+    _remember_verified(user, password)
+    return user
+
+async def _authorized(request):
+    """Authenticate off the event loop (bcrypt takes a noticeable fraction of a second)"""
+    return await run_in_threadpool(authenticate_request, request)
+
+# ==================== REQUEST HELPERS ====================
+
+def _flag(params, name, default):
+    """A true/false query parameter"""
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise HTTPException(400, f"{name} must be true or false")
+
+def conversion_options(request):
+    """Export format, sheet (index or name) and public-holiday setting from the query string"""
+    params = request.query_params
+    export_format = params.get('format', 'xlsx')
+    formats = available_export_formats()
+    if export_format not in formats:
+        raise HTTPException(400, f"Unsupported format '{export_format}'; use one of {', '.join(formats)}")
+    sheet = params.get('sheet', '0')
+    sheet = int(sheet) if sheet.isdigit() else sheet
+    return export_format, sheet, _flag(params, 'public_holidays', True)
+
+async def read_upload(request):
+    """The uploaded workbook's file name and bytes, from a multipart 'file' field or the raw body"""
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get(UPLOAD_FIELD)
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(400, f"Send the workbook in a '{UPLOAD_FIELD}' form field")
+        name, data = upload.filename or DEFAULT_UPLOAD_NAME, await upload.read()
+    else:
+        name = request.query_params.get('filename', DEFAULT_UPLOAD_NAME)
+        data = await request.body()
+    if not data:
+        raise HTTPException(400, "The upload is empty")
+    return os.path.basename(name), data
+
+def _download_headers(file_name):
+    return {'Content-Disposition': f'attachment; filename="{file_name}"'}
+
+# ==================== CONVERSION ====================
+
+def convert_upload(data, sheet=0, public_holidays=True):
+    """
+    Read one sheet of an uploaded workbook and expand it against the warm
+    employee roster, as the Process Leave tab does (a ConversionResult).
+    """
+    with perf_run('api_convert'):
+        return pipeline.convert(io.BytesIO(data), get_employee_roster(),
+                                get_holiday_calendar(public_holidays), sheet)
+
+def iter_csv_export(breakdown_df):
+    """CSV response body formatted chunk by chunk, so the first rows go out before the last are formatted"""
+    for i, chunk in enumerate(iter_formatted_breakdown(breakdown_df)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode('utf-8')
+
+def iter_bytes(payload):
+    """A serialized export sent in STREAM_CHUNK_BYTES pieces"""
+    for start in range(0, len(payload), STREAM_CHUNK_BYTES):
+        yield payload[start:start + STREAM_CHUNK_BYTES]
+
+async def convert(request):
+    """POST /api/convert: the breakdown of an uploaded leave transactions workbook"""
+    await _authorized(request)
+    export_format, sheet, public_holidays = conversion_options(request)
+    name, data = await read_upload(request)
+    try:
+        result = await run_in_threadpool(convert_upload, data, sheet, public_holidays)
+    except Exception as e:
+        logger.info("Could not convert %s: %s", name, e)
+        raise HTTPException(422, f"Could not read {name}: {e}")
+
+    _, extension, mime = EXPORT_FORMATS[export_format]
+    headers = _download_headers(batch_output_name(name, sheet, 1, extension))
+    headers.update({
+        'X-Transactions': str(result.transactions),
+        'X-Filtered-Transactions': str(result.filtered),
+        'X-Records': str(len(result.breakdown)),
+        'X-Leave-Issues': str(len(result.issues)),
+    })
+    if not result.has_status:
+        headers['X-Warning'] = "No Status column - declined/cancelled leave not filtered"
+    if export_format == 'csv':
+        body = iter_csv_export(result.breakdown)
+    else:
+        # xlsx (with the issues sheet) and parquet are serialized before the
+        # response starts, so a failure is a 500 rather than a cut-off download
+        try:
+            payload = await run_in_threadpool(export_breakdown, result.breakdown, export_format, result.issues)
+        except Exception as e:
+            logger.exception("Could not export %s as %s", name, export_format)
+            raise HTTPException(500, f"Could not write the {export_format} breakdown: {e}")
+        body = iter_bytes(payload)
+    return StreamingResponse(body, media_type=mime, headers=headers)
+
+# ==================== EMPLOYEES ====================
+
+@functools.lru_cache(maxsize=4)
+def _employees_json(roster):
+    """JSON body of the employee list, serialized once per roster version"""
+    df = roster.df.reindex(columns=EMPLOYEE_COLUMNS)
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    return json.dumps({'employees': records}).encode('utf-8')
+
+async def list_employees(request):
+    """GET /api/employees: every employee with their weekday hours"""
+    await _authorized(request)
+    roster = await run_in_threadpool(get_employee_roster)
+    return Response(_employees_json(roster), media_type='application/json')
+
+def import_employee_records(records):
+    """
+    Validate JSON employee objects as a bulk import and, if every one is
+    valid, upsert them in one go. Returns the import preview
+    (diff_employee_import) and the (added, updated) counts, or None when
+    any record is invalid.
+    """
+    df = pd.DataFrame(records, dtype=object)
+    text = df.where(df.notna(), '').astype(str)
+    import_df = standardize_employee_columns(text)
+    diff_df = diff_employee_import(import_df, load_employee_data())
+    if (diff_df['Action'] == 'Invalid').any():
+        return diff_df, None
+    return diff_df, import_employees(diff_df)
+
+async def upsert_employees(request):
+    """POST /api/employees: add or update employees by Employee Number"""
+    await _authorized(request)
+    try:
+        records = await request.json()
+    except ValueError:
+        raise HTTPException(400, "The body must be JSON")
+    if isinstance(records, dict):
+        records = records.get('employees', [records])
+    if not records or not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise HTTPException(400, "Send a JSON list of employee objects")
+
+    try:
+        diff_df, counts = await run_in_threadpool(import_employee_records, records)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    if counts is None:
+        invalid = diff_df[diff_df['Action'] == 'Invalid']
+        return JSONResponse({
+            'error': f"{len(invalid)} of {len(diff_df)} employees are invalid; nothing was saved",
+            'invalid': [{'index': int(row['Row']) - 2,
+                         'Employee Number': None if pd.isna(row['Employee Number']) else row['Employee Number'],
+                         'errors': row['Errors']}
+                        for _, row in invalid.iterrows()]
+        }, status_code=422)
+    added, updated = counts
+    return JSONResponse({'added': added, 'updated': updated,
+                         'unchanged': int((diff_df['Action'] == 'Unchanged').sum())})
+
+# ==================== BACKGROUND JOBS ====================
+
+JOB_FIELDS = ['id', 'username', 'created', 'started', 'finished', 'status', 'stage', 'progress',
+              'export_format', 'combined', 'records', 'message', 'results']
+
+def job_summary(job):
+    """The public fields of a persisted job, with its result URL once finished"""
+    summary = {field: job.get(field) for field in JOB_FIELDS}
+    source_progress = job.get('source_progress') or [None] * len(job['sources'])
+    summary['sources'] = [{'file': source['file'], 'sheet': source['sheet'], 'progress': progress}
+                          for source, progress in zip(job['sources'], source_progress)]
+    summary['result_url'] = f"{API_PREFIX}/jobs/{job['id']}/result" if job['result_file'] else None
+    return summary
+
+def _user_job(job_id, user):
+    """A job the user may see (admins see every job); 404 otherwise"""
+    job = read_job(job_id)
+    if job is None or (job['username'] != user['username'] and not user['is_admin']):
+        raise HTTPException(404, f"No job {job_id}")
+    return job
+
+def submit_job(username, name, data, export_format, sheet, public_holidays, all_sheets, combined):
+    """Persist and queue a conversion of one upload; returns the job"""
+    sheets = list_sheet_names(io.BytesIO(data)) if all_sheets else [sheet]
+    calendar = get_holiday_calendar(public_holidays)
+    job_id = submit_leave_job(username, [(name, data, s) for s in sheets], get_employee_roster(),
+                              export_format, combined, calendar.key)
+    return read_job(job_id)
+
+async def create_job(request):
+    """POST /api/jobs: queue an upload for a background worker (202 with the job)"""
+    user = await _authorized(request)
+    export_format, sheet, public_holidays = conversion_options(request)
+    all_sheets = _flag(request.query_params, 'all_sheets', False)
+    combined = _flag(request.query_params, 'combined', True)
+    name, data = await read_upload(request)
+    try:
+        job = await run_in_threadpool(submit_job, user['username'], name, data, export_format, sheet,
+                                      public_holidays, all_sheets, combined)
+    except Exception as e:
+        raise HTTPException(422, f"Could not read {name}: {e}")
+    return JSONResponse(job_summary(job), status_code=202,
+                        headers={'Location': f"{API_PREFIX}/jobs/{job['id']}"})
+
+async def list_user_jobs(request):
+    """GET /api/jobs: the user's jobs, newest first"""
+    user = await _authorized(request)
+    jobs = await run_in_threadpool(list_jobs, user['username'])
+    return JSONResponse({'jobs': [job_summary(job) for job in jobs]})
+
+async def job_status(request):
+    """GET /api/jobs/{id}: one job's status, progress and per-sheet results"""
+    user = await _authorized(request)
+    return JSONResponse(job_summary(_user_job(request.path_params['job_id'], user)))
+
+async def job_result(request):
+    """GET /api/jobs/{id}/result: a finished job's breakdown (or zip), streamed from disk"""
+    user = await _authorized(request)
+    job = _user_job(request.path_params['job_id'], user)
+    if job['status'] != 'done':
+        raise HTTPException(409, f"Job {job['id']} is {job['status']}")
+    if not job['result_file']:
+        raise HTTPException(404, job['message'] or "The job produced no breakdown")
+    extension = os.path.splitext(job['result_file'])[1]
+    mime = 'application/zip' if extension == '.zip' else EXPORT_FORMATS[job['export_format']][2]
+    return FileResponse(job_result_path(job), media_type=mime,
+                        filename=f"Leave_Breakdown_{job['id']}{extension}")
+
+# ==================== APPLICATION ====================
+
+async def health(request):
+    """GET /api/health: liveness check for load balancers (no auth)"""
+    return JSONResponse({'status': 'ok'})
+
+async def http_error(request, exc):
+    """Errors as {"error": message} JSON"""
+    return JSONResponse({'error': exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+@asynccontextmanager
+async def lifespan(_):
+    # Warm the roster and pick up jobs left by a server that has stopped
+    await run_in_threadpool(get_employee_roster)
+    await run_in_threadpool(get_job_queue)
+    yield
+
+def create_app():
+    """The Starlette application"""
+    routes = [
+        Route(f"{API_PREFIX}/health", health, methods=['GET']),
+        Route(f"{API_PREFIX}/convert", convert, methods=['POST']),
+        Route(f"{API_PREFIX}/employees", list_employees, methods=['GET']),
+        Route(f"{API_PREFIX}/employees", upsert_employees, methods=['POST', 'PUT']),
+        Route(f"{API_PREFIX}/jobs", list_user_jobs, methods=['GET']),
+        Route(f"{API_PREFIX}/jobs", create_job, methods=['POST']),
+        Route(f"{API_PREFIX}/jobs/{{job_id}}", job_status, methods=['GET']),
+        Route(f"{API_PREFIX}/jobs/{{job_id}}/result", job_result, methods=['GET']),
+    ]
+    return Starlette(routes=routes, exception_handlers={HTTPException: http_error}, lifespan=lifespan)
+
+api = create_app()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="REST/JSON API for the RDS PaySpace Leave Converter")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"interface to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="server processes; each keeps its own roster cache (default: 1)")
+    parser.add_argument('--log-level', default='info', choices=['critical', 'error', 'warning', 'info', 'debug'],
+                        help="server log level (default: info)")
+    args = parser.parse_args(argv)
+
+    # Several workers need the import string so each process can load the app
+    target = 'api:api' if args.workers > 1 else api
+    uvicorn.run(target, host=args.host, port=args.port, workers=args.workers,
+                log_level=args.log_level, proxy_headers=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
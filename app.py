@@ -1,10 +1,30 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import io
+import hashlib
 import os
-import bcrypt
-from PIL import Image
+from collections import OrderedDict
+
+from leave_converter.batch import combine_batch_issues, list_sheet_names, run_leave_batch, zip_batch_outputs
+from leave_converter.breakdown import concat_breakdowns, format_breakdown, process_leave_chunks
+from leave_converter.config import BCRYPT_ROUNDS_RANGE, PERF_LOG_FILE
+from leave_converter.employees import (WEEKDAY_COLUMNS, WEEKEND_COLUMNS, delete_employees, diff_employee_import,
+                                       get_employee_roster, import_employees, load_employee_data,
+                                       load_employee_schedules, parse_employee_import,
+                                       save_employee_schedules, upsert_employees)
+from leave_converter.holidays import (get_holiday_calendar, load_company_closures,
+                                      parse_company_closures, save_company_closures)
+from leave_converter.incremental import clear_breakdown_store, process_leave_incremental
+from leave_converter.instrumentation import clear_perf_log, load_perf_runs, perf_stage_summary
+from leave_converter.issues import ISSUE_DAYS_MISMATCH, ISSUE_DUPLICATE, ISSUE_OVERLAP, find_leave_issues
+from leave_converter.jobs import (JOB_ACTIVE_STATUSES, delete_job, get_job_queue, job_result_path,
+                                  list_jobs, submit_leave_job)
+from leave_converter.lazy import pd
+from leave_converter.reader import iter_leave_chunks
+from leave_converter.settings import load_settings, save_settings
+from leave_converter.users import (add_user, authenticate, delete_user, get_user, hash_password,
+                                   load_users, update_user, verify_password)
+from leave_converter.writers import EXPORT_FORMATS, available_export_formats, export_breakdown
 
 # Page configuration
 st.set_page_config(
@@ -13,275 +33,55 @@ st.set_page_config(
     layout="wide"
 )
 
-# File paths
-EMPLOYEE_DATA_FILE = "employee_data.csv"
-USERS_FILE = "users.csv"
+LOGO_FILE = "RDS_Logo.jpg"
 
-# ==================== HELPER FUNCTIONS ====================
+# Per-session memo of parsed uploads, breakdowns and exports (LRU entries)
+SESSION_CACHE_MAX_ENTRIES = 8
 
-def find_column(df, possible_names):
-    """
-    Find a column in the dataframe that matches one of the possible names.
-    Handles variations in spacing, capitalization, and punctuation.
-    """
-    # Create a mapping of normalized names to actual column names
-    col_map = {}
-    for col in df.columns:
-        # Normalize: strip whitespace, lowercase, remove extra spaces
-        normalized = str(col).strip().lower()
-        normalized = ' '.join(normalized.split())  # Remove extra spaces
-        col_map[normalized] = col
-    
-    # Try each possible name
-    for name in possible_names:
-        normalized_name = str(name).strip().lower()
-        normalized_name = ' '.join(normalized_name.split())
-        
-        if normalized_name in col_map:
-            return col_map[normalized_name]
-    
-    return None
+# Uploads of this size or more run as a background job; the job list
+# refreshes this often while jobs are active
+BACKGROUND_JOB_MIN_BYTES = 5 * 1024 * 1024
+JOB_REFRESH_SECONDS = 2
 
-def detect_header_row(file):
-    """
-    Intelligently detect which row contains the column headers.
-    Tries common locations: row 0 (first row) and row 7 (8th row).
-    """
-    required_columns = ['emp', 'employee', 'start', 'end', 'days', 'leave']
-    
-    # Try row 0 first (most common)
-    try:
-        df = pd.read_excel(file, sheet_name=0, header=0, nrows=5)
-        cols_lower = [str(col).lower() for col in df.columns]
-        matches = sum(1 for req in required_columns if any(req in col for col in cols_lower))
-        if matches >= 4:  # If we find at least 4 required columns
-            return 0
-    except:
-        pass
-    
-    # Try row 7 (legacy format)
-    try:
-        file.seek(0)  # Reset file pointer
-        df = pd.read_excel(file, sheet_name=0, header=7, nrows=5)
-        cols_lower = [str(col).lower() for col in df.columns]
-        matches = sum(1 for req in required_columns if any(req in col for col in cols_lower))
-        if matches >= 4:
-            return 7
-    except:
-        pass
-    
-    # Default to row 0 if detection fails
-    return 0
+# Manage Employees grid: rows per page choices
+EMPLOYEE_PAGE_SIZES = [25, 50, 100]
+
+# ==================== SESSION CACHE ====================
 
-def normalize_leave_dataframe(df):
+def session_memo(key, compute):
     """
-    Normalize column names in the leave transactions dataframe.
-    Maps various column name formats to standard names.
+    Return the value cached under key for this session, computing it on a miss.
+    Least recently used entries are evicted beyond SESSION_CACHE_MAX_ENTRIES.
     """
-    # Define column mappings
-    column_mappings = {
-        'Emp. Number': ['emp. number', 'emp number', 'employee number', 'empnumber', 'emp.number', 'emp . number'],
-        'Employee Name': ['employee name', 'emp name', 'name', 'employeename', 'emp. name'],
-        'Initials': ['initials', 'initial'],
-        'Leave Description': ['leave description', 'leavedescription', 'description', 'leave desc'],
-        'Leave Type Description': ['leave type description', 'leave type', 'leavetype', 'type description', 'leave type desc'],
-        'Start Date': ['start date', 'startdate', 'from date', 'date from', 'start'],
-        'End Date': ['end date', 'enddate', 'to date', 'date to', 'end'],
-        'No Days': ['no days', 'nodays', 'days', 'number of days', 'no. days', 'no.days', 'no . days'],
-        'Status': ['status', 'leave status', 'approval status', 'state']  # NEW
-    }
-    
-    # Create new column name mapping
-    rename_dict = {}
-    missing_columns = []
-    optional_columns = ['Status']  # These columns are optional
-    
-    for standard_name, variations in column_mappings.items():
-        found_col = find_column(df, [standard_name] + variations)
-        if found_col:
-            if found_col != standard_name:
-                rename_dict[found_col] = standard_name
-        else:
-            # Only add to missing if it's not an optional column
-            if standard_name not in optional_columns:
-                missing_columns.append(standard_name)
-    
-    # Rename columns
-    if rename_dict:
-        df = df.rename(columns=rename_dict)
-    
-    # Check for missing required columns
-    if missing_columns:
-        available_cols = ', '.join(df.columns.tolist())
-        raise ValueError(
-            f"Missing required columns: {', '.join(missing_columns)}\n\n"
-            f"Available columns in your file: {available_cols}\n\n"
-            f"Please ensure your Excel file has these column headers."
-        )
-    
-    return df
-
-# ==================== USER AUTHENTICATION ====================
-
-def hash_password(password):
-    """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(password, hashed):
-    """Verify a password against a hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-
-def load_users():
-    """Load users from CSV file"""
-    if os.path.exists(USERS_FILE):
-        return pd.read_csv(USERS_FILE)
-    else:
-        # Create default admin user
-        default_users = pd.DataFrame([{
-            'username': 'admin',
-            'password': hash_password('admin123'),
-            'full_name': 'System Administrator',
-            'is_admin': True,
-            'active': True,
-            'created_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }])
-        default_users.to_csv(USERS_FILE, index=False)
-        return default_users
-
-def save_users(df):
-    """Save users to CSV file"""
-    df.to_csv(USERS_FILE, index=False)
-
-def authenticate(username, password):
-    """Authenticate a user"""
-    users_df = load_users()
-    user = users_df[users_df['username'] == username]
-    
-    if len(user) == 0:
-        return False, None
-    
-    user = user.iloc[0]
-    
-    if not user['active']:
-        return False, None
-    
-    if verify_password(password, user['password']):
-        return True, user
-    
-    return False, None
-
-def add_user(username, password, full_name, is_admin=False):
-    """Add a new user"""
-    users_df = load_users()
-    
-    # Check if user already exists
-    if username in users_df['username'].values:
-        return False, "Username already exists"
-    
-    new_user = pd.DataFrame([{
-        'username': username,
-        'password': hash_password(password),
-        'full_name': full_name,
-        'is_admin': is_admin,
-        'active': True,
-        'created_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }])
+    cache = st.session_state.setdefault('result_cache', OrderedDict())
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
     
-    users_df = pd.concat([users_df, new_user], ignore_index=True)
-    save_users(users_df)
-    return True, "User added successfully"
-
-# ==================== EMPLOYEE DATA FUNCTIONS ====================
-
-def load_employee_data():
-    """Load employee data from CSV file"""
-    if os.path.exists(EMPLOYEE_DATA_FILE):
-        return pd.read_csv(EMPLOYEE_DATA_FILE)
-    else:
-        return pd.DataFrame(columns=[
-            'Employee Number', 'First Name', 'Last Name', 
-            'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'
-        ])
+    value = compute()
+    cache[key] = value
+    while len(cache) > SESSION_CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+    return value
 
-def save_employee_data(df):
-    """Save employee data to CSV file"""
-    df.to_csv(EMPLOYEE_DATA_FILE, index=False)
+# ==================== LOGIN SCREEN ====================
 
-def process_leave_breakdown(leave_df, employee_df):
-    """Process leave transactions and create daily breakdown"""
-    breakdown_data = []
-    
-    hours_dict = {}
-    for _, row in employee_df.iterrows():
-        emp_num = row['Employee Number']
-        hours_dict[emp_num] = {
-            'first_name': row['First Name'],
-            'last_name': row['Last Name'],
-            'monday': row['Monday'],
-            'tuesday': row['Tuesday'],
-            'wednesday': row['Wednesday'],
-            'thursday': row['Thursday'],
-            'friday': row['Friday']
-        }
-    
-    for idx, row in leave_df.iterrows():
-        # Explicitly convert to appropriate types to avoid datetime errors
-        emp_num = str(row['Emp. Number']).strip()
-        emp_name = str(row['Employee Name']).strip()
-        initials = str(row['Initials']).strip() if pd.notna(row['Initials']) else ''
-        leave_desc = str(row['Leave Description']).strip()
-        leave_type = str(row['Leave Type Description']).strip()
-        
-        # Convert dates properly
-        try:
-            start_date = pd.to_datetime(row['Start Date'])
-            end_date = pd.to_datetime(row['End Date'])
-        except Exception as e:
-            # Skip this row if dates can't be parsed
-            continue
-            
-        # Convert number of days to float
-        try:
-            no_days = float(row['No Days'])
-        except (ValueError, TypeError):
-            no_days = 0
-        
-        if emp_num in hours_dict:
-            emp_hours = hours_dict[emp_num]
-        else:
-            continue
-        
-        is_partial_day = (start_date == end_date) and (no_days < 1)
-        
-        current_date = start_date
-        while current_date <= end_date:
-            day_of_week = current_date.weekday()
-            
-            if day_of_week not in [5, 6]:
-                day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
-                base_daily_hours = emp_hours[day_names[day_of_week]]
-                
-                if is_partial_day and pd.notna(base_daily_hours):
-                    daily_hours = no_days * base_daily_hours
-                else:
-                    daily_hours = base_daily_hours if pd.notna(base_daily_hours) else 0
-                
-                breakdown_data.append({
-                    'Employee Number': str(emp_num),
-                    'Employee Name': str(emp_name),
-                    'Initials': str(initials),
-                    'Leave Description': str(leave_desc),
-                    'Leave Type Description': str(leave_type),
-                    'Date': current_date.strftime('%Y-%m-%d'),
-                    'Day of Week': current_date.strftime('%A'),
-                    'Daily Hours': float(daily_hours) if pd.notna(daily_hours) else 0.0
-                })
-            
-            current_date += timedelta(days=1)
+@st.cache_resource(show_spinner=False)
+def load_logo():
+    """
+    The logo as encoded image bytes, or None if the file is missing or not
+    an image. Read and decoded (to check it) once per server process;
+    st.image re-encodes PIL images on every call, but serves bytes as they are.
+    """
+    from PIL import Image
     
-    return pd.DataFrame(breakdown_data)
-
-# ==================== LOGIN SCREEN ====================
+    try:
+        with open(LOGO_FILE, 'rb') as f:
+            data = f.read()
+        Image.open(io.BytesIO(data)).load()
+    except (OSError, Image.UnidentifiedImageError):
+        return None
+    return data
 
 def show_login():
     """Display login screen"""
@@ -289,8 +89,8 @@ def show_login():
     
     with col2:
         # Display logo (centered and smaller)
-        if os.path.exists('RDS_Logo.jpg'):
-            logo = Image.open('RDS_Logo.jpg')
+        logo = load_logo()
+        if logo is not None:
             # Create three columns to center the logo
             logo_col1, logo_col2, logo_col3 = st.columns([1, 2, 1])
             with logo_col2:
@@ -321,14 +121,289 @@ def show_login():
 
 # ==================== MAIN APP ====================
 
+def show_holiday_settings():
+    """
+    Public holiday and company closure settings for the Process Leave tab.
+    Returns the HolidayCalendar to exclude from the breakdown.
+    """
+    with st.expander("🗓️ Public Holidays & Company Closures"):
+        public_holidays = st.checkbox(
+            "Exclude South African public holidays",
+            value=True,
+            key="exclude_public_holidays",
+            help="Leave days that fall on a public holiday get no hours in the breakdown"
+        )
+        calendar = get_holiday_calendar(public_holidays)
+        
+        year = st.number_input("Show non-working days for", min_value=2000, max_value=2100,
+                               value=datetime.now().year, step=1, key="holiday_year")
+        holidays = calendar.holidays(int(year), int(year))
+        if holidays:
+            st.dataframe(
+                pd.DataFrame({
+                    'Date': [day.strftime('%Y-%m-%d') for day in holidays],
+                    'Day of Week': [day.strftime('%A') for day in holidays],
+                    'Description': list(holidays.values())
+                }),
+                hide_index=True,
+                width="stretch"
+            )
+        else:
+            st.caption("No non-working days in this year.")
+        
+        st.markdown("**Company Closures**")
+        st.caption("Dates the company is closed (e.g. the December shutdown). Leave on these days gets no hours.")
+        closures_upload = st.file_uploader(
+            "Import closure dates (CSV or Excel with a Date column)",
+            type=['csv', 'xlsx'],
+            key="closures_upload"
+        )
+        if closures_upload is not None and st.button("📥 Import Closure Dates"):
+            try:
+                imported = parse_company_closures(closures_upload)
+                merged = pd.concat([load_company_closures(), imported], ignore_index=True)
+                merged['Date'] = merged['Date'].astype(str)
+                merged = merged.drop_duplicates(subset='Date', keep='last').sort_values('Date')
+                save_company_closures(merged)
+                st.success(f"✅ Imported {len(imported)} closure dates")
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ Could not import closure dates: {e}")
+        
+        closures = load_company_closures()
+        edited = st.data_editor(
+            closures.assign(Date=pd.to_datetime(closures['Date'], errors='coerce')),
+            num_rows="dynamic",
+            hide_index=True,
+            width="stretch",
+            column_config={
+                'Date': st.column_config.DateColumn("Date", format="YYYY-MM-DD", required=True),
+                'Description': st.column_config.TextColumn("Description")
+            },
+            key="closures_editor"
+        )
+        if st.button("💾 Save Closures"):
+            edited = edited.dropna(subset=['Date'])
+            save_company_closures(pd.DataFrame({
+                'Date': pd.to_datetime(edited['Date']).dt.strftime('%Y-%m-%d'),
+                'Description': edited['Description'].fillna('').replace('', "Company closure")
+            }).drop_duplicates(subset='Date', keep='last').sort_values('Date'))
+            st.success("✅ Company closures saved")
+            st.rerun()
+    
+    return calendar
+
+def show_leave_issues(issues_df, export_format, key):
+    """Duplicate, overlapping and miscounted transactions found while processing"""
+    if issues_df is None or len(issues_df) == 0:
+        st.caption("✅ No duplicate, overlapping or miscounted leave transactions found")
+        return
+    
+    counts = issues_df['Issue'].value_counts()
+    st.warning(
+        f"⚠️ {len(issues_df)} possible problems in the leave transactions: "
+        f"{counts.get(ISSUE_DUPLICATE, 0)} duplicates, {counts.get(ISSUE_OVERLAP, 0)} overlapping and "
+        f"{counts.get(ISSUE_DAYS_MISMATCH, 0)} with No Days that differ from the working days. "
+        "Duplicate and overlapping leave is counted twice in the breakdown."
+    )
+    with st.expander("🔍 Leave Issues"):
+        st.dataframe(issues_df, hide_index=True, width="stretch")
+        if export_format == 'xlsx':
+            st.caption("These are also on the Leave Issues sheet of the Excel download.")
+        else:
+            st.download_button(
+                label="📥 Download Leave Issues (.csv)",
+                data=issues_df.to_csv(index=False).encode('utf-8'),
+                file_name=f"Leave_Issues_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv",
+                key=key
+            )
+
+def _show_job_list(username, was_active):
+    """Job cards with progress, status and downloads (runs as a fragment)"""
+    jobs = list_jobs(username)
+    if was_active and not any(job['status'] in JOB_ACTIVE_STATUSES for job in jobs):
+        # Refresh the whole page once, which also stops the polling
+        st.rerun()
+    
+    st.subheader("⏳ Background Jobs")
+    for job in jobs:
+        sources = job['sources']
+        if len(sources) == 1:
+            title = sources[0]['file']
+        else:
+            title = f"{len(sources)} sheets from {len({source['file'] for source in sources})} files"
+        
+        with st.container(border=True):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f"**{title}** - submitted {job['created'].replace('T', ' ')}")
+                if job['status'] in JOB_ACTIVE_STATUSES:
+                    st.progress(job['progress'], text=job['stage'])
+                elif job['status'] == 'done' and job['result_file']:
+                    st.success(f"✅ {job['records']} daily leave records")
+                    # Jobs from before issue checks have no Issues count
+                    issues = sum(result.get('Issues', 0) for result in job['results'])
+                    if issues > 0:
+                        st.caption(f"⚠️ {issues} possible duplicate, overlapping or miscounted transactions "
+                                   "(see the Issues column per sheet and the Leave Issues sheet of Excel downloads)")
+                elif job['status'] == 'done':
+                    st.warning(job['message'])
+                else:
+                    st.error(f"❌ {job['message']}")
+                if len(job['results']) > 1 or any(result['Status'] != '✅' for result in job['results']):
+                    with st.expander("Status per sheet"):
+                        st.dataframe(pd.DataFrame(job['results']), hide_index=True, width="stretch")
+            with col2:
+                if job['status'] == 'done' and job['result_file']:
+                    extension = os.path.splitext(job['result_file'])[1]
+                    st.download_button(
+                        label="📥 Download",
+                        # Read from disk only when clicked
+                        data=lambda path=job_result_path(job): open(path, 'rb').read(),
+                        file_name=f"Leave_Breakdown_{job['id']}{extension}",
+                        mime="application/zip" if extension == '.zip' else EXPORT_FORMATS[job['export_format']][2],
+                        on_click="ignore",
+                        type="primary",
+                        key=f"job_download_{job['id']}"
+                    )
+                if job['status'] == 'queued':
+                    if st.button("✖️ Cancel", key=f"job_cancel_{job['id']}"):
+                        get_job_queue().cancel(job['id'])
+                        st.rerun()
+                elif job['status'] not in JOB_ACTIVE_STATUSES:
+                    if st.button("🗑️ Remove", key=f"job_remove_{job['id']}"):
+                        delete_job(job['id'])
+                        st.rerun()
+
+def show_jobs(username):
+    """The user's background jobs; polls for progress while any are active"""
+    jobs = list_jobs(username)
+    if not jobs:
+        return
+    active = any(job['status'] in JOB_ACTIVE_STATUSES for job in jobs)
+    # Only the fragment reruns on the timer, not the whole page
+    st.fragment(_show_job_list, run_every=JOB_REFRESH_SECONDS if active else None)(username, active)
+
+def show_batch_processing(uploaded_files, process_all_sheets, roster, calendar):
+    """
+    Process several uploads (and optionally every sheet) as one batch.
+    Batches of BACKGROUND_JOB_MIN_BYTES or more are submitted as a
+    background job instead of being processed in the page.
+    """
+    sources = []
+    for uploaded in uploaded_files:
+        data = uploaded.getvalue()
+        if process_all_sheets:
+            try:
+                sheets = list_sheet_names(io.BytesIO(data))
+            except Exception:
+                sheets = [0]  # Reported as an error by the pipeline
+        else:
+            sheets = [0]
+        sources.extend((uploaded.name, data, sheet) for sheet in sheets)
+    
+    if len(sources) > 1:
+        st.success(f"✅ {len(uploaded_files)} files uploaded ({len(sources)} sheets to process)")
+    background = sum(len(data) for data in {data for _, data, _ in sources}) >= BACKGROUND_JOB_MIN_BYTES
+    
+    confirmed = st.checkbox(
+        "✓ I confirm that all declined and cancelled leave transactions have been removed from files without a Status column",
+        key="confirm_batch_cleanup"
+    )
+    if not confirmed:
+        st.info("👆 Please confirm that declined/cancelled leave has been removed before processing.")
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(sources) > 1:
+            output_mode = st.radio("Output", ["One combined breakdown", "Zip of per-file breakdowns"], key="batch_output_mode")
+        else:
+            output_mode = "One combined breakdown"
+    with col2:
+        export_format = st.selectbox(
+            "Download format",
+            available_export_formats(),
+            format_func=lambda fmt: EXPORT_FORMATS[fmt][0],
+            key="batch_export_format"
+        )
+    combined = output_mode == "One combined breakdown"
+    _, extension, mime = EXPORT_FORMATS[export_format]
+    
+    if background:
+        st.info("ℹ️ Large uploads are processed in the background. You can keep working or come back later; the result appears under Background Jobs.")
+        if st.button("⏳ Submit Background Job", type="primary"):
+            submit_leave_job(st.session_state.username, sources, roster, export_format, combined, calendar.key)
+            st.success("✅ Job submitted")
+        return
+    
+    # Memoized per set of uploads, roster version, holiday calendar and output choice
+    content_hash = hashlib.sha256()
+    for name, data, sheet in sources:
+        content_hash.update(f"{name}\0{sheet}\0".encode('utf-8'))
+        content_hash.update(hashlib.sha256(data).digest())
+    result_key = ('batch', content_hash.hexdigest(), roster.version, calendar.key, combined, export_format)
+    compute_batch = lambda: run_leave_batch(sources, roster, None if combined else export_format,
+                                            calendar_key=calendar.key)
+    
+    if st.button("🔄 Process Batch", type="primary"):
+        with st.spinner(f"Processing {len(sources)} sheets in parallel..."):
+            session_memo(result_key, compute_batch)
+        st.session_state['processed_batch'] = result_key
+    
+    if st.session_state.get('processed_batch') != result_key:
+        return
+    
+    results = session_memo(result_key, compute_batch)
+    status_df = pd.DataFrame([
+        {key: value for key, value in result.items() if key not in ('breakdown', 'issues', 'export')}
+        for result in results
+    ])
+    st.subheader("Batch Status")
+    st.dataframe(status_df, hide_index=True, width="stretch")
+    
+    succeeded = [result for result in results if result['breakdown'] is not None and len(result['breakdown']) > 0]
+    if not succeeded:
+        st.warning("No breakdown records were produced.")
+        return
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    issues_df = combine_batch_issues(succeeded)
+    if combined:
+        breakdown_df = concat_breakdowns(result['breakdown'] for result in succeeded)
+        st.success(f"✅ Successfully created {len(breakdown_df)} daily leave records from {len(succeeded)} sheets!")
+        show_leave_issues(issues_df, export_format, key="batch_issues_download")
+        with st.spinner("Preparing download..."):
+            export_data = session_memo(result_key + ('export',),
+                                       lambda: export_breakdown(breakdown_df, export_format, issues_df))
+        st.download_button(
+            label="📥 Download Combined Leave Breakdown",
+            data=export_data,
+            file_name=f"Leave_Breakdown_{timestamp}.{extension}",
+            mime=mime,
+            type="primary"
+        )
+    else:
+        total = sum(result['Records'] for result in succeeded)
+        st.success(f"✅ Successfully created {total} daily leave records in {len(succeeded)} files!")
+        show_leave_issues(issues_df, export_format, key="batch_issues_download")
+        st.download_button(
+            label="📥 Download Leave Breakdowns (zip)",
+            data=session_memo(result_key + ('zip',), lambda: zip_batch_outputs(results, extension)),
+            file_name=f"Leave_Breakdowns_{timestamp}.zip",
+            mime="application/zip",
+            type="primary"
+        )
+
 def show_main_app():
     """Display main application after login"""
     
     # Header with logout
     col1, col2, col3 = st.columns([2, 3, 2])
     with col1:
-        if os.path.exists('RDS_Logo.jpg'):
-            logo = Image.open('RDS_Logo.jpg')
+        logo = load_logo()
+        if logo is not None:
             st.image(logo, width=120)  # Smaller header logo
     with col2:
         st.markdown("<h2 style='text-align: center; margin-top: 20px;'>RDS PaySpace Leave Converter for OpenTime</h2>", unsafe_allow_html=True)
@@ -387,13 +462,93 @@ def show_main_app():
                             'Thursday': new_thu,
                             'Friday': new_fri
                         }])
-                        employee_df = pd.concat([employee_df, new_row], ignore_index=True)
-                        save_employee_data(employee_df)
+                        upsert_employees(new_row)
                         st.success(f"✅ Employee {new_emp_num} added successfully!")
                         st.rerun()
                 else:
                     st.error("Please fill in all required fields!")
         
+        # Bulk import: validate and preview every row, then write them in one upsert
+        with st.expander("📤 Bulk Import Employees", expanded=False):
+            st.caption("Upload a CSV or Excel file in the same layout as `employee_data_template.csv`. "
+                       "Existing employees are updated by Employee Number; new ones are added.")
+            roster_upload = st.file_uploader("Employee file", type=['csv', 'xlsx'], key="employee_import")
+            
+            if roster_upload is not None:
+                try:
+                    diff_df = diff_employee_import(parse_employee_import(roster_upload), employee_df)
+                except Exception as e:
+                    st.error(f"❌ Could not read employee file: {e}")
+                    diff_df = None
+                
+                if diff_df is not None:
+                    counts = diff_df['Action'].value_counts()
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("New", int(counts.get('Add', 0)))
+                    col2.metric("Updated", int(counts.get('Update', 0)))
+                    col3.metric("Unchanged", int(counts.get('Unchanged', 0)))
+                    col4.metric("Invalid", int(counts.get('Invalid', 0)))
+                    
+                    show_actions = st.multiselect(
+                        "Show rows", ['Add', 'Update', 'Unchanged', 'Invalid'],
+                        default=['Add', 'Update', 'Invalid'], key="employee_import_filter"
+                    )
+                    st.dataframe(diff_df[diff_df['Action'].isin(show_actions)], hide_index=True, width="stretch")
+                    
+                    invalid = int(counts.get('Invalid', 0))
+                    to_write = int(counts.get('Add', 0) + counts.get('Update', 0))
+                    skip_invalid = True
+                    if invalid > 0:
+                        st.warning(f"⚠️ {invalid} rows have errors (see the Errors column) and will not be imported.")
+                        skip_invalid = st.checkbox("Import the valid rows and skip the invalid ones",
+                                                   key="employee_import_skip_invalid")
+                    
+                    if to_write == 0:
+                        st.info("Nothing to import - every valid row matches the current employee data.")
+                    elif st.button(f"✅ Import {to_write} Employees", type="primary", disabled=not skip_invalid):
+                        added, updated = import_employees(diff_df)
+                        st.success(f"✅ Imported employees: {added} added, {updated} updated")
+                        st.rerun()
+        
+        # Effective-dated schedule versions, edited as one table like the company closures
+        with st.expander("📆 Schedule Changes", expanded=False):
+            st.caption("When an employee's hours change, add a row with the date the new hours start. "
+                       "Leave before that date keeps the hours that applied then. Before an employee's "
+                       "first change, the hours under Current Employees apply. Enter Saturday or Sunday "
+                       "hours for staff who work weekends.")
+            schedule_days = WEEKDAY_COLUMNS + WEEKEND_COLUMNS
+            schedules = load_employee_schedules()
+            edited_schedules = st.data_editor(
+                schedules.assign(**{
+                    'Employee Number': schedules['Employee Number'].astype(str),
+                    'Effective From': pd.to_datetime(schedules['Effective From'], errors='coerce'),
+                    **{day: pd.to_numeric(schedules[day], errors='coerce') for day in schedule_days}
+                }),
+                num_rows="dynamic",
+                hide_index=True,
+                width="stretch",
+                column_config={
+                    'Employee Number': st.column_config.SelectboxColumn(
+                        'Employee Number', options=sorted(employee_df['Employee Number'].astype(str)), required=True
+                    ),
+                    'Effective From': st.column_config.DateColumn('Effective From', format="YYYY-MM-DD", required=True),
+                    **{
+                        day: st.column_config.NumberColumn(day, min_value=0.0, max_value=24.0, step=0.25,
+                                                           format="%.2f", default=0.0)
+                        for day in schedule_days
+                    }
+                },
+                key="schedules_editor"
+            )
+            if st.button("💾 Save Schedule Changes"):
+                edited_schedules = edited_schedules.dropna(subset=['Employee Number', 'Effective From'])
+                save_employee_schedules(edited_schedules.assign(**{
+                    'Effective From': pd.to_datetime(edited_schedules['Effective From']).dt.strftime('%Y-%m-%d'),
+                    **{day: edited_schedules[day].fillna(0.0) for day in schedule_days}
+                }).drop_duplicates(subset=['Employee Number', 'Effective From'], keep='last'))
+                st.success("✅ Schedule changes saved")
+                st.rerun()
+        
         st.markdown("---")
         
         # Display and edit existing employees
@@ -415,102 +570,110 @@ def show_main_app():
             else:
                 display_df = employee_df
             
-            for idx, row in display_df.iterrows():
-                with st.expander(f"{row['Employee Number']} - {row['First Name']} {row['Last Name']}"):
-                    col1, col2, col3 = st.columns([2, 3, 1])
-                    
-                    with col1:
-                        st.text_input("Employee Number", value=row['Employee Number'], disabled=True, key=f"emp_{idx}")
-                        edit_first = st.text_input("First Name", value=row['First Name'], key=f"first_{idx}")
-                        edit_last = st.text_input("Last Name", value=row['Last Name'], key=f"last_{idx}")
-                    
-                    with col2:
-                        st.write("**Working Hours**")
-                        edit_mon = st.number_input("Monday", value=float(row['Monday']), min_value=0.0, max_value=24.0, step=0.25, key=f"mon_{idx}")
-                        edit_tue = st.number_input("Tuesday", value=float(row['Tuesday']), min_value=0.0, max_value=24.0, step=0.25, key=f"tue_{idx}")
-                        edit_wed = st.number_input("Wednesday", value=float(row['Wednesday']), min_value=0.0, max_value=24.0, step=0.25, key=f"wed_{idx}")
-                        edit_thu = st.number_input("Thursday", value=float(row['Thursday']), min_value=0.0, max_value=24.0, step=0.25, key=f"thu_{idx}")
-                        edit_fri = st.number_input("Friday", value=float(row['Friday']), min_value=0.0, max_value=24.0, step=0.25, key=f"fri_{idx}")
-                    
-                    with col3:
-                        st.write("")
-                        st.write("")
-                        if st.button("💾 Save", key=f"save_{idx}", type="primary"):
-                            employee_df.at[idx, 'First Name'] = edit_first
-                            employee_df.at[idx, 'Last Name'] = edit_last
-                            employee_df.at[idx, 'Monday'] = edit_mon
-                            employee_df.at[idx, 'Tuesday'] = edit_tue
-                            employee_df.at[idx, 'Wednesday'] = edit_wed
-                            employee_df.at[idx, 'Thursday'] = edit_thu
-                            employee_df.at[idx, 'Friday'] = edit_fri
-                            save_employee_data(employee_df)
-                            st.success("✅ Updated!")
-                            st.rerun()
-                        
-                        if st.button("🗑️ Delete", key=f"del_{idx}"):
-                            employee_df = employee_df.drop(idx).reset_index(drop=True)
-                            save_employee_data(employee_df)
-                            st.success("✅ Deleted!")
-                            st.rerun()
+            # Render one page of the roster in a single grid; edits are saved in one batch
+            page_size = st.selectbox("Rows per page", EMPLOYEE_PAGE_SIZES, key="emp_page_size")
+            page_count = max(1, -(-len(display_df) // page_size))
+            # Keyed on search and page count so the page resets when either changes
+            page = st.number_input(
+                f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1,
+                key=f"emp_page_{search}_{page_count}"
+            )
+            first_row = (page - 1) * page_size
+            page_df = display_df.iloc[first_row:first_row + page_size].copy()
+            page_df['Delete'] = False
+            
+            if len(display_df) > 0:
+                st.caption(f"Showing {first_row + 1}–{first_row + len(page_df)} of {len(display_df)} employees")
+            
+            hours_config = {
+                day: st.column_config.NumberColumn(day, min_value=0.0, max_value=24.0, step=0.25, format="%.2f")
+                for day in WEEKDAY_COLUMNS
+            }
+            edited_df = st.data_editor(
+                page_df,
+                key=f"emp_editor_{search}_{page_size}_{page}",
+                hide_index=True,
+                disabled=['Employee Number'],
+                column_config={
+                    'Employee Number': st.column_config.TextColumn('Employee Number'),
+                    'First Name': st.column_config.TextColumn('First Name', required=True),
+                    'Last Name': st.column_config.TextColumn('Last Name', required=True),
+                    'Delete': st.column_config.CheckboxColumn('🗑️ Delete', default=False),
+                    **hours_config
+                },
+                width="stretch"
+            )
+            
+            if st.button("💾 Save Changes", type="primary", key="save_employee_page"):
+                to_delete = edited_df.index[edited_df['Delete']]
+                edited_rows = edited_df.drop(columns=['Delete'])
+                editable = ['First Name', 'Last Name'] + WEEKDAY_COLUMNS
+                
+                before, after = page_df[editable], edited_rows[editable]
+                changed = ~(after.eq(before) | (after.isna() & before.isna())).all(axis=1)
+                changed &= ~edited_df['Delete']
+                
+                if edited_rows[['First Name', 'Last Name']].isna().any().any():
+                    st.error("First Name and Last Name cannot be empty!")
+                elif len(to_delete) == 0 and not changed.any():
+                    st.info("No changes to save.")
+                else:
+                    # Only the changed and deleted rows are written
+                    if changed.any():
+                        upsert_employees(edited_rows.loc[changed, ['Employee Number'] + editable])
+                    if len(to_delete) > 0:
+                        delete_employees(employee_df.loc[to_delete, 'Employee Number'])
+                    st.success("✅ Updated!")
+                    st.rerun()
     
     # Tab 2: Process Leave
     with tab2:
         st.header("Process Leave Transactions")
         
-        employee_df = load_employee_data()
+        roster = get_employee_roster()
         
-        if len(employee_df) == 0:
+        if len(roster) == 0:
             st.warning("⚠️ Please add employees first in the 'Manage Employees' tab before processing leave transactions.")
         else:
-            st.info(f"📊 {len(employee_df)} employees loaded and ready for processing")
+            st.info(f"📊 {len(roster)} employees loaded and ready for processing")
+            
+            calendar = show_holiday_settings()
             
-            uploaded_file = st.file_uploader(
-                "Upload Leave Transactions Excel File",
+            uploaded_files = st.file_uploader(
+                "Upload Leave Transactions Excel File(s)",
                 type=['xlsx'],
-                help="Upload your leave transactions file (same format as Leave_Transactions_648648.xlsx)"
-            )
+                accept_multiple_files=True,
+                help="Upload one or more leave transactions files (same format as Leave_Transactions_648648.xlsx)"
+            ) or []
+            process_all_sheets = st.checkbox("Process every sheet in each workbook", key="process_all_sheets")
+            
+            # A single file on its first sheet keeps the detailed preview flow,
+            # unless it is large enough to run as a background job
+            uploaded_file = None
+            if (len(uploaded_files) == 1 and not process_all_sheets
+                    and len(uploaded_files[0].getvalue()) < BACKGROUND_JOB_MIN_BYTES):
+                uploaded_file = uploaded_files[0]
+            elif len(uploaded_files) > 0:
+                show_batch_processing(uploaded_files, process_all_sheets, roster, calendar)
             
             if uploaded_file is not None:
                 try:
-                    # Detect which row contains the headers
-                    header_row = detect_header_row(uploaded_file)
-                    uploaded_file.seek(0)  # Reset file pointer
-                    
-                    # Read the Excel file with detected header row
-                    leave_df = pd.read_excel(uploaded_file, sheet_name=0, header=header_row)
-                    
-                    # Normalize column names to handle variations
-                    leave_df = normalize_leave_dataframe(leave_df)
-                    
-                    # Filter out group headers and invalid rows
-                    leave_df = leave_df[leave_df['Emp. Number'] != 'Group : All Groups'].reset_index(drop=True)
-                    leave_df = leave_df[leave_df['No Days'] >= 0].reset_index(drop=True)
-                    
-                    # Check if Status column exists and filter automatically
-                    if 'Status' in leave_df.columns:
-                        original_count = len(leave_df)
-                        # Keep only Approved status, remove Declined/Cancelled
-                        leave_df = leave_df[leave_df['Status'].str.strip().str.lower() == 'approved'].reset_index(drop=True)
-                        filtered_count = original_count - len(leave_df)
-                        if filtered_count > 0:
-                            st.info(f"ℹ️ Automatically filtered out {filtered_count} non-approved leave transactions (Declined/Cancelled)")
-                    
-                    # Clean and validate data types
-                    leave_df['Emp. Number'] = leave_df['Emp. Number'].astype(str).str.strip()
-                    leave_df['Employee Name'] = leave_df['Employee Name'].astype(str).str.strip()
-                    leave_df['Initials'] = leave_df['Initials'].astype(str).str.strip()
-                    leave_df['Leave Description'] = leave_df['Leave Description'].astype(str).str.strip()
-                    leave_df['Leave Type Description'] = leave_df['Leave Type Description'].astype(str).str.strip()
-                    
-                    # Ensure dates are datetime objects
-                    leave_df['Start Date'] = pd.to_datetime(leave_df['Start Date'], errors='coerce')
-                    leave_df['End Date'] = pd.to_datetime(leave_df['End Date'], errors='coerce')
-                    
-                    # Remove rows with invalid dates
-                    leave_df = leave_df.dropna(subset=['Start Date', 'End Date']).reset_index(drop=True)
-                    
-                    # Ensure No Days is numeric
-                    leave_df['No Days'] = pd.to_numeric(leave_df['No Days'], errors='coerce').fillna(0)
+                    # Stream the file in one read-only pass: detect the header row,
+                    # keep only the mapped columns, drop group headers, invalid rows
+                    # and non-approved leave, clean data types and expand each chunk
+                    # to daily records as it is read
+                    # Memoized per upload, roster version and holiday calendar, so
+                    # reruns from other widgets skip the parse
+                    upload_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+                    with st.spinner("Reading leave transactions..."):
+                        leave_df, filtered_count, streamed_df, streamed_positions = session_memo(
+                            ('leave', upload_hash, roster.version, calendar.key),
+                            lambda: process_leave_chunks(
+                                iter_leave_chunks(io.BytesIO(uploaded_file.getvalue())), roster, calendar
+                            )
+                        )
+                    if filtered_count > 0:
+                        st.info(f"ℹ️ Automatically filtered out {filtered_count} non-approved leave transactions (Declined/Cancelled)")
                     
                     st.success(f"✅ File uploaded successfully! Found {len(leave_df)} approved leave transactions.")
                     
@@ -543,29 +706,111 @@ def show_main_app():
                     
                     # Only enable processing if confirmed
                     if confirmed:
+                        export_format = st.selectbox(
+                            "Download format",
+                            available_export_formats(),
+                            format_func=lambda fmt: EXPORT_FORMATS[fmt][0],
+                            key="export_format"
+                        )
+                        
+                        incremental = st.checkbox(
+                            "♻️ Only recalculate transactions that changed since my last upload",
+                            value=False,
+                            key="incremental",
+                            help="Reuses the daily records of unchanged transactions from your previous "
+                                 "upload of a file with the same name and adds a download of just the "
+                                 "changed days for OpenTime"
+                        )
+                        
+                        # Results are memoized per upload, roster version and holiday
+                        # calendar and stay visible across reruns until one changes
+                        result_key = (upload_hash, roster.version, calendar.key, incremental)
+                        def compute_result():
+                            if incremental:
+                                (breakdown_df, positions), delta_df, summary = process_leave_incremental(
+                                    st.session_state.username, leave_df, roster, calendar, uploaded_file.name,
+                                    source_rows=True
+                                )
+                            else:
+                                breakdown_df, positions = streamed_df, streamed_positions
+                                delta_df, summary = None, None
+                            issues_df = find_leave_issues(leave_df, roster, breakdown_df, positions)
+                            return breakdown_df, delta_df, summary, issues_df
+                        
                         if st.button("🔄 Process Leave Breakdown", type="primary"):
                             with st.spinner("Processing leave breakdown..."):
-                                breakdown_df = process_leave_breakdown(leave_df, employee_df)
+                                session_memo(('breakdown',) + result_key, compute_result)
+                            st.session_state['processed_result'] = result_key
+                        
+                        if st.session_state.get('processed_result') == result_key:
+                            breakdown_df, delta_df, summary, issues_df = session_memo(('breakdown',) + result_key,
+                                                                                      compute_result)
+                            _, extension, mime = EXPORT_FORMATS[export_format]
+                            
+                            if len(breakdown_df) > 0:
+                                st.success(f"✅ Successfully created {len(breakdown_df)} daily leave records!")
+                                show_leave_issues(issues_df, export_format, key="issues_download")
                                 
-                                if len(breakdown_df) > 0:
-                                    st.success(f"✅ Successfully created {len(breakdown_df)} daily leave records!")
-                                    
-                                    st.subheader("Results Preview")
-                                    st.dataframe(breakdown_df.head(20), width="stretch")
-                                    
-                                    output = io.BytesIO()
-                                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                                        breakdown_df.to_excel(writer, index=False, sheet_name='Leave Breakdown')
-                                    
+                                st.subheader("Results Preview")
+                                preview_rows = st.number_input(
+                                    "Rows to preview", min_value=5, max_value=500, value=20, step=5,
+                                    key="preview_rows"
+                                )
+                                st.dataframe(format_breakdown(breakdown_df.head(preview_rows)), width="stretch")
+                                
+                                with st.spinner("Preparing download..."):
+                                    export_data = session_memo(
+                                        ('export',) + result_key + (export_format,),
+                                        lambda: export_breakdown(breakdown_df, export_format, issues_df)
+                                    )
+                                st.download_button(
+                                    label="📥 Download Leave Breakdown",
+                                    data=export_data,
+                                    file_name=f"Leave_Breakdown_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                                    mime=mime,
+                                    type="primary"
+                                )
+                            else:
+                                st.warning("No matching employees found in the leave transactions.")
+                            
+                            if delta_df is not None:
+                                st.subheader("Changes Since Last Upload")
+                                previous = summary['previous']
+                                if previous is None:
+                                    st.info(f"♻️ No previous upload to compare with. All {summary['expanded']} "
+                                            "transactions were calculated and stored for your next upload.")
+                                else:
+                                    st.info(
+                                        f"♻️ Compared with **{previous['source'] or 'your previous upload'}** "
+                                        f"(processed {previous['updated'].replace('T', ' ')}): "
+                                        f"{summary['reused']} transactions unchanged, {summary['expanded']} new or changed "
+                                        f"and {summary['dropped']} changed or no longer in the file."
+                                    )
+                                
+                                col1, col2 = st.columns(2)
+                                col1.metric("Days Added", summary['added_days'])
+                                col2.metric("Days Removed", summary['removed_days'])
+                                if len(delta_df) > 0:
+                                    with st.spinner("Preparing download..."):
+                                        delta_data = session_memo(
+                                            ('delta',) + result_key + (export_format,),
+                                            lambda: export_breakdown(delta_df, export_format)
+                                        )
                                     st.download_button(
-                                        label="📥 Download Leave Breakdown",
-                                        data=output.getvalue(),
-                                        file_name=f"Leave_Breakdown_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                        type="primary"
+                                        label="📥 Download Changes for OpenTime",
+                                        data=delta_data,
+                                        file_name=f"Leave_Breakdown_Changes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                                        mime=mime,
+                                        help="Only the days added or removed since your previous upload, "
+                                             "marked in the Change column"
                                     )
                                 else:
-                                    st.warning("No matching employees found in the leave transactions.")
+                                    st.info("No days changed since your previous upload.")
+                                
+                                if st.button("🗑️ Forget Previous Uploads", key="clear_breakdown_store",
+                                             help="The next upload is compared with nothing and calculated in full"):
+                                    clear_breakdown_store(st.session_state.username)
+                                    st.success("✅ Previous uploads forgotten.")
                     else:
                         st.info("👆 Please confirm that declined/cancelled leave has been removed before processing.")
                     
@@ -628,6 +873,8 @@ def show_main_app():
                         
                         If the problem persists, please check the file format matches the example Leave_Transactions file.
                         """)
+            
+            show_jobs(st.session_state.username)
     
     # Tab 3: Admin Panel (only for admins)
     if tab3 is not None:
@@ -660,6 +907,66 @@ def show_main_app():
                     else:
                         st.error("❌ Please fill in all required fields!")
             
+            # Password hashing cost
+            with st.expander("🔐 Password Security", expanded=False):
+                settings = load_settings()
+                st.write("Passwords are hashed with bcrypt. A higher cost is harder to crack but makes every login slower.")
+                rounds = st.number_input(
+                    "bcrypt cost factor",
+                    min_value=BCRYPT_ROUNDS_RANGE[0],
+                    max_value=BCRYPT_ROUNDS_RANGE[1],
+                    value=int(settings['bcrypt_rounds']),
+                    step=1,
+                    key="bcrypt_rounds",
+                    help="Each step doubles the time to hash or check a password. The default is 12."
+                )
+                st.caption("Existing passwords are upgraded to the new cost the next time each user logs in.")
+                if st.button("💾 Save Security Settings"):
+                    save_settings(bcrypt_rounds=int(rounds))
+                    st.success(f"✅ bcrypt cost set to {int(rounds)}")
+            
+            # Pipeline timings recorded by perf_run
+            with st.expander("📈 Performance", expanded=False):
+                perf_enabled = st.toggle(
+                    "Record pipeline timings",
+                    value=bool(settings['perf_logging']),
+                    key="perf_logging",
+                    help=f"Times each Process Leave stage and employee/user loads and logs them to {PERF_LOG_FILE}"
+                )
+                if perf_enabled != bool(settings['perf_logging']):
+                    save_settings(perf_logging=perf_enabled)
+                
+                runs = load_perf_runs()
+                if not runs:
+                    st.info("No runs recorded yet. Turn on recording and process a leave file.")
+                else:
+                    kinds = sorted({run['kind'] for run in runs})
+                    # Unkeyed, so run types that appear later are selected too
+                    selected_kinds = st.multiselect("Run types", kinds, default=kinds)
+                    selected_runs = [run for run in runs if run['kind'] in selected_kinds]
+                    
+                    st.markdown(f"**Stage timings** (last {len(selected_runs)} runs)")
+                    st.dataframe(perf_stage_summary(selected_runs), hide_index=True, width="stretch")
+                    
+                    st.markdown("**Recent runs**")
+                    st.dataframe(
+                        pd.DataFrame([{
+                            'Time': run['time'].replace('T', ' '),
+                            'Run': run['kind'],
+                            'Status': run.get('status'),
+                            'Rows': run.get('rows'),
+                            'Seconds': run['seconds'],
+                            'Memory (MB)': run.get('rss_mb'),
+                            'Slowest Stage': max(run['stages'], key=lambda stage: run['stages'][stage]['seconds'], default='')
+                        } for run in reversed(selected_runs)]),
+                        hide_index=True,
+                        width="stretch"
+                    )
+                    
+                    if st.button("🗑️ Clear Performance Log"):
+                        clear_perf_log()
+                        st.rerun()
+            
             st.markdown("---")
             
             # Display existing users
@@ -687,8 +994,7 @@ def show_main_app():
                             if st.form_submit_button("Reset Password"):
                                 if new_pwd and new_pwd == new_pwd_confirm:
                                     if len(new_pwd) >= 6:
-                                        users_df.at[idx, 'password'] = hash_password(new_pwd)
-                                        save_users(users_df)
+                                        update_user(user['username'], password=hash_password(new_pwd))
                                         st.success("✅ Password reset successfully!")
                                         st.rerun()
                                     else:
@@ -707,14 +1013,12 @@ def show_main_app():
                                     st.warning("⚠️ Cannot deactivate the last admin")
                                 else:
                                     if st.button("🔒 Deactivate User", key=f"deactivate_{idx}"):
-                                        users_df.at[idx, 'active'] = False
-                                        save_users(users_df)
+                                        update_user(user['username'], active=False)
                                         st.success("✅ User deactivated!")
                                         st.rerun()
                             else:
                                 if st.button("🔓 Activate User", key=f"activate_{idx}"):
-                                    users_df.at[idx, 'active'] = True
-                                    save_users(users_df)
+                                    update_user(user['username'], active=True)
                                     st.success("✅ User activated!")
                                     st.rerun()
                         else:
@@ -729,8 +1033,7 @@ def show_main_app():
                                 st.warning("⚠️ Cannot delete the last admin")
                             else:
                                 if st.button("🗑️ Delete User", key=f"delete_user_{idx}"):
-                                    users_df = users_df.drop(idx).reset_index(drop=True)
-                                    save_users(users_df)
+                                    delete_user(user['username'])
                                     st.success("✅ User deleted!")
                                     st.rerun()
     
@@ -739,13 +1042,11 @@ def show_main_app():
         st.header("👤 My Profile")
         
         current_username = st.session_state.get('username')
-        users_df = load_users()
         
         if current_username:
-            user_row = users_df[users_df['username'] == current_username]
+            user_info = get_user(current_username)
             
-            if len(user_row) > 0:
-                user_info = user_row.iloc[0]
+            if user_info is not None:
                 
                 # Display account information
                 st.subheader("Account Information")
@@ -786,13 +1087,12 @@ def show_main_app():
                             st.error("❌ New password must be different from current password")
                         else:
                             # Verify current password
-                            if bcrypt.checkpw(current_password.encode('utf-8'), user_info['password'].encode('utf-8')):
+                            if verify_password(current_password, user_info['password']):
                                 # Hash new password
-                                new_hashed = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                                new_hashed = hash_password(new_password)
                                 
                                 # Update password
-                                users_df.loc[users_df['username'] == current_username, 'password'] = new_hashed
-                                save_users(users_df)
+                                update_user(current_username, password=new_hashed)
                                 
                                 st.success("✅ Password changed successfully!")
                                 st.info("💡 Please remember your new password. You will need it for your next login.")
@@ -862,8 +1162,14 @@ def show_main_app():
         - Example: 0.5 day leave on a 8.5 hour day = 4.25 hours
         
         **Weekend Handling:**
-        - Saturdays and Sundays are automatically excluded
-        - Only weekdays (Monday-Friday) appear in the breakdown
+        - Saturdays and Sundays are excluded unless the employee's schedule gives them weekend hours
+        - Add a row under **Schedule Changes** (Manage Employees tab) with Saturday or Sunday hours for staff who work weekends
+        - A weekend day appears in the breakdown only when the schedule in force on that date has hours for it
+        
+        **Public Holidays & Company Closures:**
+        - South African public holidays are excluded by default (a Sunday holiday moves to the Monday)
+        - Add company closure dates (e.g. the December shutdown) under **Public Holidays & Company Closures** in the Process Leave tab
+        - Leave falling on these days gets no hours in the breakdown
         
         ### 🔐 Security
         - All passwords are encrypted using bcrypt
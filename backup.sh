@@ -17,6 +17,17 @@ echo ""
 # Create backup directory if it doesn't exist
 mkdir -p "$BACKUP_DIR"
 
+# Employee and user changes are appended to *.changes logs next to the CSVs;
+# fold them in first so each CSV copied below holds every record
+if (cd "$APP_DIR" && "$APP_DIR/venv/bin/python" -c "from leave_converter.employees import compact_employee_files; from leave_converter.users import compact_users_file; compact_employee_files(); compact_users_file()"); then
+    echo "✅ Folded change logs into the CSV files"
+else
+    echo "⚠️  Could not fold change logs into the CSV files; copying the logs as well"
+    for LOG in "$APP_DIR"/*.csv.changes; do
+        [ -f "$LOG" ] && cp "$LOG" "$BACKUP_DIR/$(basename "$LOG" .csv.changes)_$DATE.csv.changes"
+    done
+fi
+
 # Backup employee data
 if [ -f "$APP_DIR/employee_data.csv" ]; then
     cp "$APP_DIR/employee_data.csv" "$BACKUP_DIR/employee_data_$DATE.csv"
@@ -33,8 +44,26 @@ else
     echo "⚠️  users.csv not found (may not exist yet)"
 fi
 
+# Backup employee schedule changes
+if [ -f "$APP_DIR/employee_schedules.csv" ]; then
+    cp "$APP_DIR/employee_schedules.csv" "$BACKUP_DIR/employee_schedules_$DATE.csv"
+    echo "✅ Backed up employee_schedules.csv"
+fi
+
+# Backup company closure dates
+if [ -f "$APP_DIR/company_closures.csv" ]; then
+    cp "$APP_DIR/company_closures.csv" "$BACKUP_DIR/company_closures_$DATE.csv"
+    echo "✅ Backed up company_closures.csv"
+fi
+
+# Backup admin settings
+if [ -f "$APP_DIR/app_settings.json" ]; then
+    cp "$APP_DIR/app_settings.json" "$BACKUP_DIR/app_settings_$DATE.json"
+    echo "✅ Backed up app_settings.json"
+fi
+
 # Clean up old backups (keep last 30 days)
-DELETED=$(find "$BACKUP_DIR" -name "*.csv" -mtime +$KEEP_DAYS -delete -print | wc -l)
+DELETED=$(find "$BACKUP_DIR" \( -name "*.csv" -o -name "*.json" -o -name "*.changes" \) -mtime +$KEEP_DAYS -delete -print | wc -l)
 if [ $DELETED -gt 0 ]; then
     echo "🗑️  Deleted $DELETED old backup(s) (older than $KEEP_DAYS days)"
 fi
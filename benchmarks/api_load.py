@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Load generator for the REST/JSON API (api.py)
+Starts api.py on a free local port in a scratch directory (seed employees,
+default admin account), then drives each endpoint from concurrent
+keep-alive clients and reports throughput and latency percentiles.
+
+Usage:
+    python benchmarks/api_load.py                           # 1, 4 and 16 clients, 10s each
+    python benchmarks/api_load.py --concurrency 8 --duration 30 --rows 10000
+    python benchmarks/api_load.py --url http://server/api --user me --password secret
+
+Results are written to benchmarks/results/api/ as JSON.
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from run_benchmarks import RESULTS_DIR, git_revision
+from synthetic import REPO_DIR, SEED_EMPLOYEES, cached_leave_export
+
+API_RESULTS_DIR = os.path.join(RESULTS_DIR, 'api')
+DEFAULT_CONCURRENCY = [1, 4, 16]
+# The account api.py creates in an empty directory
+DEFAULT_USER, DEFAULT_PASSWORD = 'admin', 'admin123'
+SERVER_START_TIMEOUT = 60
+
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir, port):
+    """Run api.py in workdir and wait until /api/health answers"""
+    shutil.copy(SEED_EMPLOYEES, os.path.join(workdir, 'employee_data.csv'))
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, 'api.py'), '--port', str(port), '--log-level', 'warning'],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"api.py exited: {server.stderr.read()}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"api.py did not start within {SERVER_START_TIMEOUT}s")
+
+
+def scenarios(rows, export_format):
+    """(name, method, path, body) requests to load-test"""
+    with open(cached_leave_export(rows), 'rb') as f:
+        workbook = f.read()
+    return [
+        ('health', 'GET', '/health', None),
+        ('employees', 'GET', '/employees', None),
+        (f'convert {rows} rows ({export_format})', 'POST', f'/convert?format={export_format}', workbook),
+    ]
+
+
+def connect(base):
+    """A keep-alive connection to the API host"""
+    url = urlsplit(base)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=300)
+
+
+def send(conn, base, auth, method, path, body):
+    """Issue one request; returns its status and response size"""
+    headers = {'Authorization': auth}
+    if body is not None:
+        headers['Content-Type'] = 'application/octet-stream'
+    conn.request(method, urlsplit(base).path + path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, len(response.read())
+
+
+def client(base, auth, method, path, body, stop_at, latencies, errors, received):
+    """One keep-alive client issuing the request back to back until stop_at"""
+    conn = connect(base)
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        try:
+            status, size = send(conn, base, auth, method, path, body)
+        except (OSError, http.client.HTTPException):
+            errors.append('connection')
+            conn.close()
+            conn = connect(base)
+            continue
+        latencies.append(time.perf_counter() - start)
+        received.append(size)
+        if status != 200:
+            errors.append(status)
+    conn.close()
+
+
+def run_load(base, auth, scenario, concurrency, duration):
+    """Drive one scenario from concurrent clients; returns its statistics"""
+    name, method, path, body = scenario
+    # One untimed request warms the server's caches and checks the credentials
+    conn = connect(base)
+    status, _ = send(conn, base, auth, method, path, body)
+    conn.close()
+    if status != 200:
+        raise RuntimeError(f"{name}: request failed with HTTP {status}")
+
+    client_latencies, client_errors, client_received = [], [], []
+    stop_at = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(base, auth, method, path, body, stop_at,
+                                                      client_latencies, client_errors, client_received))
+               for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(client_latencies) * 1000
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0, 0, 0)
+    return {
+        'scenario': name,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(client_errors),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 2),
+        'mb_per_second': round(sum(client_received) / elapsed / 1e6, 3),
+        'p50_ms': round(float(p50), 2),
+        'p90_ms': round(float(p90), 2),
+        'p99_ms': round(float(p99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the leave converter REST API")
+    parser.add_argument('--url', help="API base URL, e.g. http://server/api (default: start api.py locally)")
+    parser.add_argument('--user', default=DEFAULT_USER, help=f"API username (default: {DEFAULT_USER})")
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help="API password")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY,
+                        help="concurrent clients per run (default: 1 4 16)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per run (default: 10)")
+    parser.add_argument('--rows', type=int, default=1000, help="transactions in the converted export (default: 1000)")
+    parser.add_argument('--format', dest='export_format', default='csv', choices=['csv', 'xlsx', 'parquet'],
+                        help="breakdown format requested from /convert (default: csv)")
+    parser.add_argument('--no-save', action='store_true', help="do not write a result file")
+    args = parser.parse_args()
+
+    auth = 'Basic ' + base64.b64encode(f"{args.user}:{args.password}".encode()).decode()
+    workdir, server = None, None
+    base = args.url
+    if base is None:
+        workdir = tempfile.mkdtemp(prefix='api_load_')
+        port = free_port()
+        print(f"Starting api.py on port {port} in {workdir}...")
+        server = start_server(workdir, port)
+        base = f"http://127.0.0.1:{port}/api"
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'url': args.url or 'local',
+        'duration': args.duration,
+        'runs': [],
+    }
+    try:
+        print(f"  {'scenario':<30}{'clients':>8}{'req/s':>10}{'MB/s':>9}{'p50':>10}{'p90':>10}{'p99':>10}{'errors':>8}")
+        for scenario in scenarios(args.rows, args.export_format):
+            for concurrency in args.concurrency:
+                run = run_load(base, auth, scenario, concurrency, args.duration)
+                report['runs'].append(run)
+                print(f"  {run['scenario']:<30}{concurrency:>8}{run['requests_per_second']:>10.1f}"
+                      f"{run['mb_per_second']:>9.2f}{run['p50_ms']:>8.1f}ms{run['p90_ms']:>8.1f}ms"
+                      f"{run['p99_ms']:>8.1f}ms{run['errors']:>8}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if not args.no_save:
+        os.makedirs(API_RESULTS_DIR, exist_ok=True)
+        out_path = os.path.join(API_RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['revision']}.json")
+        with open(out_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Export benchmark for RDS PaySpace Leave Converter
+Times each breakdown export format and records its peak traced memory,
+with the previous openpyxl writer as the baseline.
+
+Usage:
+    python benchmarks/bench_export.py [rows ...]
+"""
+
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from leave_converter.breakdown import BREAKDOWN_COLUMNS
+from leave_converter.writers import EXPORT_FORMATS, available_export_formats, export_breakdown
+
+
+def synthetic_breakdown(rows):
+    """A breakdown frame with the OpenTime columns and realistic repetition"""
+    emp = np.arange(rows) % 500
+    dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.arange(rows) % 365, unit='D')
+    return pd.DataFrame({
+        'Employee Number': [f"RDS{e:05d}" for e in emp],
+        'Employee Name': [f"Employee {e}" for e in emp],
+        'Initials': 'E',
+        'Leave Description': 'Annual Leave',
+        'Leave Type Description': 'Full Day',
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Day of Week': dates.day_name(),
+        'Daily Hours': np.where(emp % 3 == 0, 4.25, 8.5),
+    }, columns=BREAKDOWN_COLUMNS)
+
+
+def openpyxl_export(breakdown_df):
+    """The previous writer: pandas to_excel through openpyxl"""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        breakdown_df.to_excel(writer, index=False, sheet_name='Leave Breakdown')
+    return output.getvalue()
+
+
+def measure(func, breakdown_df):
+    """Run func once under tracemalloc; return (seconds, peak MB, output MB)"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    data = func(breakdown_df)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, len(data) / 1024 / 1024
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    writers = [('xlsx (openpyxl)', openpyxl_export)]
+    for export_format in available_export_formats():
+        writers.append((EXPORT_FORMATS[export_format][0],
+                        lambda df, fmt=export_format: export_breakdown(df, fmt)))
+
+    print("Export benchmark (peak traced memory)")
+    print(f"{'rows':>8}  {'format':<20}{'time':>9}{'peak':>10}{'size':>10}")
+    for rows in sizes:
+        breakdown_df = synthetic_breakdown(rows)
+        for label, func in writers:
+            elapsed, peak, size = measure(func, breakdown_df)
+            print(f"{rows:>8}  {label:<20}{elapsed:>8.2f}s{peak:>8.1f}MB{size:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
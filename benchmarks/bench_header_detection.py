@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Header detection benchmark for RDS PaySpace Leave Converter
+Compares the old detection (two pd.read_excel calls) plus the full read
+against the single read-only scan in detect_header_row plus the full read.
+
+Usage:
+    python benchmarks/bench_header_detection.py [rows] [repeats]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from leave_converter.reader import detect_header_row
+from synthetic import write_leave_export
+
+
+def legacy_detect_header_row(file):
+    """The previous detection: read row 0 as header, then row 7"""
+    required_columns = ['emp', 'employee', 'start', 'end', 'days', 'leave']
+    for header in (0, 7):
+        file.seek(0)
+        df = pd.read_excel(file, sheet_name=0, header=header, nrows=5)
+        cols_lower = [str(col).lower() for col in df.columns]
+        if sum(1 for req in required_columns if any(req in col for col in cols_lower)) >= 4:
+            return header
+    return 0
+
+
+def time_pipeline(path, detect, repeats):
+    """Best-of-N time for detection alone and for detection plus the full read"""
+    detect_times, total_times = [], []
+    for _ in range(repeats):
+        with open(path, 'rb') as f:
+            t0 = time.perf_counter()
+            header_row = detect(f)
+            t1 = time.perf_counter()
+            f.seek(0)
+            pd.read_excel(f, sheet_name=0, header=header_row)
+            t2 = time.perf_counter()
+        detect_times.append(t1 - t0)
+        total_times.append(t2 - t0)
+    return min(detect_times), min(total_times)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print(f"Header detection benchmark ({rows} rows, best of {repeats})")
+    print(f"{'layout':<10}{'old detect':>12}{'new detect':>12}{'old total':>12}{'new total':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for header_row in (0, 7):
+            path = os.path.join(tmp, f"export_row{header_row}.xlsx")
+            write_leave_export(path, rows, header_row)
+            old_detect, old_total = time_pipeline(path, legacy_detect_header_row, repeats)
+            new_detect, new_total = time_pipeline(path, detect_header_row, repeats)
+            print(f"{'row ' + str(header_row):<10}{old_detect:>11.3f}s{new_detect:>11.3f}s"
+                  f"{old_total:>11.3f}s{new_total:>11.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Effective-dated schedule benchmark for RDS PaySpace Leave Converter
+Times process_leave_breakdown with the roster hours only and with schedule
+versions (a mid-year change per employee, some with Saturday hours), and
+checks the versioned result against the row-by-row reference engine.
+
+Usage:
+    python benchmarks/bench_schedules.py [rows ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from leave_converter import EmployeeRoster, HolidayCalendar, format_breakdown, process_leave_breakdown
+from leave_converter.breakdown import process_leave_breakdown_reference
+from leave_converter.employees import SCHEDULE_COLUMNS, WEEKDAY_COLUMNS
+from synthetic import COLUMNS, SEED_EMPLOYEES, generate_transactions
+
+# Transactions checked against the (slow) reference engine
+PARITY_ROWS = 2000
+REPEATS = 3
+
+
+def schedule_versions(employee_df, seed=0):
+    """One change per employee on a date in 2025; every fourth also works Saturdays"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i, (_, employee) in enumerate(employee_df.iterrows()):
+        effective_from = pd.Timestamp('2025-01-01') + pd.Timedelta(days=int(rng.integers(30, 330)))
+        weekday_hours = (employee[WEEKDAY_COLUMNS].astype(float) * rng.choice([0.5, 0.8, 1.2])).round(2)
+        saturday = 4.0 if i % 4 == 0 else 0.0
+        rows.append([employee['Employee Number'], effective_from.strftime('%Y-%m-%d'),
+                     *weekday_hours, saturday, 0.0])
+    return pd.DataFrame(rows, columns=SCHEDULE_COLUMNS)
+
+
+def best_time(func):
+    """Fastest of REPEATS runs, with the last result"""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    employee_df = pd.read_csv(SEED_EMPLOYEES)
+    schedule_df = schedule_versions(employee_df)
+    calendar = HolidayCalendar()
+    plain = EmployeeRoster(employee_df)
+    versioned = EmployeeRoster(employee_df, schedule_df=schedule_df)
+
+    sample = pd.DataFrame(generate_transactions(PARITY_ROWS), columns=COLUMNS)
+    expected = process_leave_breakdown_reference(sample, employee_df, calendar, schedule_df)
+    expected['Daily Hours'] = expected['Daily Hours'].round(4)
+    actual = format_breakdown(process_leave_breakdown(sample, versioned, calendar))
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+    print(f"✅ versioned breakdown matches reference engine ({PARITY_ROWS} transactions)")
+
+    print(f"{'rows':>8}{'roster only':>14}{'versions':>12}{'records':>12}{'weekend':>10}")
+    for rows in sizes:
+        leave_df = pd.DataFrame(generate_transactions(rows), columns=COLUMNS)
+        plain_time, _ = best_time(lambda: process_leave_breakdown(leave_df, plain, calendar))
+        versioned_time, breakdown_df = best_time(lambda: process_leave_breakdown(leave_df, versioned, calendar))
+        weekend = int(breakdown_df['Day of Week'].isin(['Saturday', 'Sunday']).sum())
+        print(f"{rows:>8}{plain_time:>13.3f}s{versioned_time:>11.3f}s{len(breakdown_df):>12}{weekend:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Sharded expansion benchmark for RDS PaySpace Leave Converter
+Times process_leave_breakdown_sharded (transactions split by employee and
+expanded in worker processes sharing the roster) for several worker counts
+against the single-core process_leave_breakdown, and checks that every
+worker count gives exactly the single-core result. The in-process fallback
+below EXPAND_PARALLEL_MIN_TRANSACTIONS is disabled so the sharded path is
+always timed; worker counts above the CPU count are skipped.
+
+Usage:
+    python benchmarks/bench_sharded.py [rows ...] [--workers 2 4 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from leave_converter import (HolidayCalendar, format_breakdown, process_leave_breakdown,
+                             process_leave_breakdown_sharded, read_roster_files, sharding)
+from synthetic import COLUMNS, SEED_EMPLOYEES, generate_transactions
+
+REPEATS = 3
+
+
+def best_time(func):
+    """Fastest of REPEATS runs, with the last result"""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded leave expansion")
+    parser.add_argument('rows', type=int, nargs='*', default=[100000, 300000],
+                        help="transactions per run (default: 100000 300000)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, os.cpu_count() or 1],
+                        help="worker counts to time (default: 2 4 and the CPU count)")
+    args = parser.parse_args()
+    workers = sorted({count for count in args.workers if 1 < count <= sharding.EXPAND_MAX_WORKERS})
+    sharding.EXPAND_PARALLEL_MIN_TRANSACTIONS = 0
+
+    roster = read_roster_files(SEED_EMPLOYEES)
+    calendar = HolidayCalendar()
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'rows':>8}{'workers':>9}{'seconds':>10}{'speedup':>9}{'records':>11}")
+    for rows in args.rows:
+        leave_df = pd.DataFrame(generate_transactions(rows), columns=COLUMNS)
+        single_time, expected = best_time(lambda: process_leave_breakdown(leave_df, roster, calendar))
+        expected = format_breakdown(expected)
+        print(f"{rows:>8}{1:>9}{single_time:>9.3f}s{1:>8.2f}x{len(expected):>11}")
+        for count in workers:
+            sharded_time, breakdown_df = best_time(
+                lambda: process_leave_breakdown_sharded(leave_df, roster, calendar, workers=count))
+            pd.testing.assert_frame_equal(expected, format_breakdown(breakdown_df))
+            print(f"{rows:>8}{count:>9}{sharded_time:>9.3f}s{single_time / sharded_time:>8.2f}x"
+                  f"{len(breakdown_df):>11}")
+    print("✅ sharded breakdowns match the single-core engine")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Streaming read benchmark for RDS PaySpace Leave Converter
+Compares peak traced memory and time of the full pd.read_excel path
+(detect, read, normalize, filter, clean) against read_leave_file.
+
+Usage:
+    python benchmarks/bench_streaming_read.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from leave_converter.reader import (clean_leave_dataframe, detect_header_row, filter_leave_transactions,
+                                    normalize_leave_dataframe, read_leave_file)
+from synthetic import write_leave_export
+
+
+def full_read(path):
+    """The previous upload path: whole sheet into a DataFrame, then filter"""
+    with open(path, 'rb') as f:
+        header_row = detect_header_row(f)
+        leave_df = pd.read_excel(f, sheet_name=0, header=header_row)
+    leave_df = normalize_leave_dataframe(leave_df)
+    leave_df, _ = filter_leave_transactions(leave_df)
+    return clean_leave_dataframe(leave_df)
+
+
+def streaming_read(path):
+    """Single read-only pass keeping only mapped, approved rows"""
+    with open(path, 'rb') as f:
+        leave_df, _ = read_leave_file(f)
+    return leave_df
+
+
+def measure(func, path):
+    """Run func once under tracemalloc; return (seconds, peak MB, rows)"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, len(result)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 50000]
+
+    print("Streaming read benchmark (peak traced memory)")
+    print(f"{'rows':>8}{'full time':>12}{'full peak':>12}{'stream time':>13}{'stream peak':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"export_{rows}.xlsx")
+            write_leave_export(path, rows, header_row=7)
+            full_time, full_peak, full_rows = measure(full_read, path)
+            stream_time, stream_peak, stream_rows = measure(streaming_read, path)
+            assert full_rows == stream_rows, (full_rows, stream_rows)
+            print(f"{rows:>8}{full_time:>11.2f}s{full_peak:>10.1f}MB"
+                  f"{stream_time:>12.2f}s{stream_peak:>11.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
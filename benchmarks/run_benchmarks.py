@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark suite for RDS PaySpace Leave Converter
+Times every stage of the Process Leave pipeline on synthetic PaySpace
+exports (both header layouts) and records peak memory per stage.
+
+Usage:
+    python benchmarks/run_benchmarks.py                      # 1k, 10k, 100k rows
+    python benchmarks/run_benchmarks.py --sizes 1000 1000000
+    python benchmarks/run_benchmarks.py --no-memory          # timings only
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<file>.json
+
+Results are written to benchmarks/results/ as JSON and compared against the
+previous run, so regressions show up between versions.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from leave_converter import EmployeeRoster, HolidayCalendar
+from leave_converter.breakdown import format_breakdown, process_leave_breakdown, process_leave_breakdown_reference
+from leave_converter.issues import find_leave_issues
+from leave_converter.reader import (clean_leave_dataframe, detect_header_row, filter_leave_transactions,
+                                    normalize_leave_dataframe, read_leave_file)
+from leave_converter.writers import export_breakdown_excel
+from synthetic import REPO_DIR, SEED_EMPLOYEES, cached_leave_export
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Regressions beyond this fraction are flagged in the comparison
+REGRESSION_THRESHOLD = 0.10
+# Largest export checked against process_leave_breakdown_reference (the loop is slow)
+PARITY_MAX_ROWS = 10000
+
+
+def pipeline_stages(path, roster, calendar):
+    """
+    The Process Leave pipeline as (name, callable) stages; each stage
+    receives the previous stage's output.
+    """
+    def detect(_):
+        with open(path, 'rb') as f:
+            return detect_header_row(f)
+
+    def read_excel(header_row):
+        return pd.read_excel(path, sheet_name=0, header=header_row)
+
+    def filter_rows(leave_df):
+        return filter_leave_transactions(leave_df)[0]
+
+    def stream_read(_):
+        with open(path, 'rb') as f:
+            return read_leave_file(f)[0]
+
+    # The issue check needs the transactions and the breakdown's source rows
+    expanded = {}
+
+    def expand(leave_df):
+        expanded['leave_df'] = leave_df
+        breakdown_df, expanded['positions'] = process_leave_breakdown(leave_df, roster, calendar, source_rows=True)
+        return breakdown_df
+
+    def check(breakdown_df):
+        find_leave_issues(expanded['leave_df'], roster, breakdown_df, expanded['positions'])
+        return breakdown_df
+
+    return [
+        ('detect_header_row', detect),
+        ('read_excel', read_excel),
+        ('normalize_leave_dataframe', normalize_leave_dataframe),
+        ('filter_leave_transactions', filter_rows),
+        ('clean_leave_dataframe', clean_leave_dataframe),
+        ('process_leave_breakdown', expand),
+        ('find_leave_issues', check),
+        ('export_xlsx', export_breakdown_excel),
+        # The streaming reader replaces detect + read + normalize + filter + clean in the app
+        ('read_leave_file (stream)', stream_read),
+    ]
+
+
+def run_stages(stages, trace_memory):
+    """Run the stages in order; return {stage: seconds or peak MB} and row counts"""
+    results, rows = {}, {}
+    value = None
+    for name, func in stages:
+        stage_input = None if name.endswith('(stream)') else value
+        if trace_memory:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        output = func(stage_input)
+        elapsed = time.perf_counter() - t0
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = round(peak / 1024 / 1024, 2)
+        else:
+            results[name] = round(elapsed, 4)
+        if hasattr(output, '__len__') and not isinstance(output, (bytes, str)):
+            rows[name] = len(output)
+        if not name.endswith('(stream)'):
+            value = output
+    return results, rows
+
+
+def check_parity(path, roster, calendar):
+    """True if the vectorized breakdown, as exported, matches the row-by-row reference engine"""
+    with open(path, 'rb') as f:
+        leave_df, _ = read_leave_file(f)
+    expected = process_leave_breakdown_reference(leave_df, roster.df, calendar)
+    actual = process_leave_breakdown(leave_df, roster, calendar)
+    try:
+        pd.testing.assert_frame_equal(format_breakdown(expected), format_breakdown(actual))
+        return True
+    except AssertionError:
+        return False
+
+
+def git_revision():
+    """Short commit hash of the working tree, or 'unknown'"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def latest_result_file():
+    """Most recent saved result, if any"""
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    return files[-1] if files else None
+
+
+def compare(current, previous_path):
+    """Print per-stage timing changes against a previous result file"""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nComparison with {os.path.basename(previous_path)} (revision {previous['revision']})")
+    old_runs = {(r['rows'], r['header_row']): r for r in previous['runs']}
+    for run in current['runs']:
+        old = old_runs.get((run['rows'], run['header_row']))
+        if old is None:
+            continue
+        print(f"  {run['rows']} rows, header row {run['header_row']}:")
+        for stage, seconds in run['seconds'].items():
+            before = old['seconds'].get(stage)
+            if not before:
+                continue
+            change = (seconds - before) / before
+            flag = '  ⚠️ regression' if change > REGRESSION_THRESHOLD else ''
+            print(f"    {stage:<28}{before:>9.3f}s -> {seconds:>9.3f}s  {change:+7.1%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the leave conversion pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="transaction rows per synthetic export")
+    parser.add_argument('--layouts', type=int, nargs='+', default=[0, 7], choices=[0, 7],
+                        help="header rows to test")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--compare', help="result file to compare against (default: latest)")
+    parser.add_argument('--no-save', action='store_true', help="do not write a result file")
+    args = parser.parse_args()
+
+    roster = EmployeeRoster(pd.read_csv(SEED_EMPLOYEES))
+    # The app excludes South African public holidays by default
+    calendar = HolidayCalendar()
+    previous = args.compare or latest_result_file()
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'runs': [],
+    }
+
+    for rows in args.sizes:
+        for header_row in args.layouts:
+            print(f"Generating/using {rows}-row export (header row {header_row})...")
+            path = cached_leave_export(rows, header_row)
+            stages = pipeline_stages(path, roster, calendar)
+
+            seconds, counts = run_stages(stages, trace_memory=False)
+            peak_mb = {} if args.no_memory else run_stages(stages, trace_memory=True)[0]
+
+            run = {'rows': rows, 'header_row': header_row, 'seconds': seconds,
+                   'peak_mb': peak_mb, 'output_rows': counts}
+            if rows <= PARITY_MAX_ROWS:
+                run['parity'] = check_parity(path, roster, calendar)
+                print(f"  {'✅' if run['parity'] else '❌'} breakdown matches reference engine")
+            report['runs'].append(run)
+            print(f"  {'stage':<28}{'time':>10}{'peak':>11}{'rows out':>11}")
+            for stage, elapsed in seconds.items():
+                peak = f"{peak_mb[stage]:>9.1f}MB" if stage in peak_mb else f"{'-':>11}"
+                print(f"  {stage:<28}{elapsed:>9.3f}s{peak}{counts.get(stage, ''):>11}")
+
+    if resource is not None:
+        # ru_maxrss is KB on Linux, bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report['max_rss_mb'] = round(max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+        print(f"\nProcess peak RSS: {report['max_rss_mb']} MB")
+
+    if previous:
+        compare(report, previous)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out_path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['revision']}.json")
+        with open(out_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Synthetic PaySpace leave exports for benchmarks
+
+Generates leave transaction workbooks in both header layouts (headers on
+row 0, or on row 7 below a report banner) with a realistic mix of full days,
+partial days, long sick-leave ranges, declined/cancelled rows, reversals
+with negative No Days and "Group : All Groups" rows.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_EMPLOYEES = os.path.join(REPO_DIR, 'employee_data_seed.csv')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+COLUMNS = ['Emp. Number', 'Employee Name', 'Initials', 'Leave Description',
+           'Leave Type Description', 'Start Date', 'End Date', 'No Days', 'Status']
+
+# (leave description, leave type, weight, (min, max) working days)
+LEAVE_KINDS = [
+    ('Annual Leave', 'Full Day', 0.45, (1, 10)),
+    ('Annual Leave', 'Half Day', 0.15, None),
+    ('Sick Leave', 'Full Day', 0.20, (1, 3)),
+    ('Sick Leave', 'Extended', 0.05, (10, 60)),
+    ('Family Responsibility Leave', 'Full Day', 0.10, (1, 3)),
+    ('Study Leave', 'Partial Day', 0.05, None),
+]
+STATUSES = ['Approved', 'Declined', 'Cancelled']
+STATUS_WEIGHTS = [0.85, 0.10, 0.05]
+
+
+def _add_working_days(start, days):
+    """Calendar end date after covering the given number of weekdays from start"""
+    end = start
+    remaining = days - 1
+    while remaining > 0:
+        end += timedelta(days=1)
+        if end.weekday() < 5:
+            remaining -= 1
+    return end
+
+
+def generate_transactions(rows, seed=0):
+    """Rows of a synthetic leave export as lists in COLUMNS order"""
+    rng = np.random.default_rng(seed)
+    employees = pd.read_csv(SEED_EMPLOYEES)
+    # Pad the seed roster with unknown employees so some rows do not match
+    numbers = list(employees['Employee Number']) + ['RDS90001', 'RDS90002']
+    names = [f"{f} {l}" for f, l in zip(employees['First Name'], employees['Last Name'])] + ['Temp One', 'Temp Two']
+
+    weights = np.array([kind[2] for kind in LEAVE_KINDS])
+    kinds = rng.choice(len(LEAVE_KINDS), size=rows, p=weights / weights.sum())
+    emp_idx = rng.integers(0, len(numbers), size=rows)
+    offsets = rng.integers(0, 365, size=rows)
+    statuses = rng.choice(STATUSES, size=rows, p=STATUS_WEIGHTS)
+    fractions = rng.choice([0.25, 0.5, 0.75], size=rows)
+    reversal = rng.random(rows) < 0.01
+    base = datetime(2025, 1, 1)
+
+    for i in range(rows):
+        description, leave_type, _, day_range = LEAVE_KINDS[kinds[i]]
+        start = base + timedelta(days=int(offsets[i]))
+        while start.weekday() >= 5:
+            start += timedelta(days=1)
+
+        if day_range is None:
+            no_days = float(fractions[i])
+            end = start
+        else:
+            no_days = float(rng.integers(day_range[0], day_range[1] + 1))
+            end = _add_working_days(start, int(no_days))
+        if reversal[i]:
+            no_days = -no_days
+
+        name = names[emp_idx[i]]
+        yield [numbers[emp_idx[i]], name, name[0], description, leave_type,
+               start, end, no_days, statuses[i]]
+
+
+def write_leave_export(path, rows, header_row=0, seed=0):
+    """Write a synthetic leave export with headers on header_row (0 or 7)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Leave Transactions')
+    banner = [['Leave Transactions'], ['RDS Company'], [], ['Period: 2025/01/01 - 2025/12/31'], [], [], []]
+    for i in range(header_row):
+        sheet.append(banner[i] if i < len(banner) else [])
+    sheet.append(COLUMNS)
+    sheet.append(['Group : All Groups'])
+    for values in generate_transactions(rows, seed):
+        sheet.append(values)
+    workbook.save(path)
+
+
+def cached_leave_export(rows, header_row=0, seed=0):
+    """Path to a synthetic export, generated once and reused from benchmarks/.cache"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"leave_{rows}_row{header_row}_seed{seed}.xlsx")
+    if not os.path.exists(path):
+        tmp_path = path + '.tmp'
+        write_leave_export(tmp_path, rows, header_row, seed)
+        os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Headless batch converter for RDS PaySpace Leave Converter
+Runs the same pipeline as the Process Leave tab without the Streamlit UI
+
+Usage:
+    python convert.py Leave_Transactions.xlsx
+    python convert.py exports/                  # every .xlsx in a directory
+    python convert.py "exports/*/Leave_*.xlsx"  # glob pattern
+    python convert.py exports/ --workers 4 --employees employee_data.csv
+    python convert.py exports/ --closures company_closures.csv
+    python convert.py exports/ --schedules employee_schedules.csv
+    python convert.py Big_Export.xlsx --expand-workers 4   # one large file on 4 cores
+
+Each breakdown is written next to its input as <name>_Leave_Breakdown.xlsx
+(or .csv / .parquet with --format). South African public holidays are
+excluded unless --include-public-holidays is given.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from leave_converter import EXPORT_FORMATS, HolidayCalendar, available_export_formats, convert, read_roster_files
+from leave_converter.config import CLOSURES_FILE, EMPLOYEE_DATA_FILE, SCHEDULES_FILE
+from leave_converter.holidays import parse_company_closures
+
+OUTPUT_SUFFIX = "_Leave_Breakdown"
+
+
+def expand_inputs(patterns):
+    """Resolve files, directories and glob patterns into a sorted list of xlsx files"""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = glob.glob(os.path.join(pattern, '*.xlsx'))
+        elif os.path.isfile(pattern):
+            candidates = [pattern]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+
+        for path in candidates:
+            name = os.path.basename(path)
+            # Skip our own outputs and Excel lock files
+            if os.path.splitext(name)[0].endswith(OUTPUT_SUFFIX) or name.startswith('~$'):
+                continue
+            files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def output_path_for(input_path, export_format='xlsx'):
+    """Breakdown file path written next to the input"""
+    stem, _ = os.path.splitext(input_path)
+    return f"{stem}{OUTPUT_SUFFIX}.{EXPORT_FORMATS[export_format][1]}"
+
+
+def convert_file(input_path, roster, export_format='xlsx', calendar=None, expand_workers=1):
+    """
+    Convert one leave transactions file and write its breakdown.
+    Returns a summary dict; errors are reported instead of raised so one bad
+    file does not stop the batch.
+    """
+    summary = {'input': input_path, 'output': None, 'transactions': 0,
+               'records': 0, 'filtered': 0, 'issues': 0, 'has_status': False, 'error': None}
+    try:
+        with open(input_path, 'rb') as f:
+            result = convert(f, roster, calendar, workers=expand_workers)
+        summary['transactions'] = result.transactions
+        summary['filtered'] = result.filtered
+        summary['has_status'] = result.has_status
+        summary['records'] = len(result.breakdown)
+        summary['issues'] = len(result.issues)
+
+        output_path = output_path_for(input_path, export_format)
+        with open(output_path, 'wb') as f:
+            f.write(result.export(export_format))
+        summary['output'] = output_path
+    except Exception as e:
+        summary['error'] = str(e)
+    return summary
+
+
+def print_summary(summary):
+    """Print one result line per file"""
+    name = summary['input']
+    if summary['error']:
+        print(f"❌ {name}: {summary['error']}")
+        return
+
+    print(f"✅ {name} -> {summary['output']} "
+          f"({summary['transactions']} transactions, {summary['records']} daily records)")
+    if summary['filtered'] > 0:
+        print(f"   ℹ️ Filtered out {summary['filtered']} non-approved leave transactions")
+    if not summary['has_status']:
+        print("   ⚠️ No Status column - declined/cancelled leave could not be filtered automatically")
+    if summary['issues'] > 0:
+        print(f"   ⚠️ {summary['issues']} duplicate, overlapping or miscounted transactions "
+              "(listed on the Leave Issues sheet of xlsx output)")
+    if summary['records'] == 0:
+        print("   ⚠️ No matching employees found in the leave transactions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert PaySpace leave transaction exports into OpenTime leave breakdowns"
+    )
+    parser.add_argument('inputs', nargs='+', help="xlsx files, directories or glob patterns")
+    parser.add_argument('--employees', default=EMPLOYEE_DATA_FILE,
+                        help=f"employee hours CSV (default: {EMPLOYEE_DATA_FILE})")
+    parser.add_argument('--schedules', default=SCHEDULES_FILE,
+                        help=f"effective-dated schedule changes CSV (default: {SCHEDULES_FILE} if present)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of files to convert in parallel (default: 1)")
+    parser.add_argument('--expand-workers', type=int, default=1,
+                        help="processes expanding each large file, split by employee (default: 1)")
+    parser.add_argument('--format', dest='export_format', default='xlsx',
+                        choices=available_export_formats(),
+                        help="breakdown output format (default: xlsx)")
+    parser.add_argument('--closures', default=CLOSURES_FILE,
+                        help=f"company closure dates CSV/xlsx (default: {CLOSURES_FILE} if present)")
+    parser.add_argument('--include-public-holidays', action='store_true',
+                        help="give hours to leave on South African public holidays")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="log column layouts and other processing details")
+    args = parser.parse_args(argv)
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if not os.path.exists(args.employees):
+        print(f"❌ Employee data file not found: {args.employees}")
+        return 2
+    if not os.path.exists(args.schedules) and args.schedules != SCHEDULES_FILE:
+        print(f"❌ Schedules file not found: {args.schedules}")
+        return 2
+    roster = read_roster_files(args.employees, args.schedules)
+    if len(roster) == 0:
+        print(f"❌ No employees in {args.employees}")
+        return 2
+
+    closures = {}
+    if os.path.exists(args.closures):
+        with open(args.closures, 'rb') as f:
+            closures_df = parse_company_closures(f)
+        closures = dict(zip(closures_df['Date'], closures_df['Description']))
+    elif args.closures != CLOSURES_FILE:
+        print(f"❌ Closures file not found: {args.closures}")
+        return 2
+    calendar = HolidayCalendar(not args.include_public_holidays, closures)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("❌ No .xlsx files matched the given inputs")
+        return 2
+
+    if args.workers > 1 and len(files) > 1:
+        # Files are already spread over processes, so each is expanded in its own
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            summaries = list(pool.map(convert_file, files, [roster] * len(files),
+                                      [args.export_format] * len(files), [calendar] * len(files)))
+    else:
+        summaries = [convert_file(path, roster, args.export_format, calendar, args.expand_workers)
+                     for path in files]
+
+    for summary in summaries:
+        print_summary(summary)
+
+    failed = sum(1 for s in summaries if s['error'])
+    print(f"\n{len(files) - failed} of {len(files)} files converted")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""
+RDS PaySpace leave conversion core
+
+Turns PaySpace leave transaction exports into the daily OpenTime leave
+breakdown, without Streamlit. The Streamlit app (app.py), the REST API
+(api.py), convert.py and the benchmarks are all clients of this package.
+
+    from leave_converter import convert, get_employee_roster, get_holiday_calendar
+
+    result = convert('Leave_Transactions.xlsx', get_employee_roster(), get_holiday_calendar())
+    with open('Leave_Breakdown.xlsx', 'wb') as f:
+        f.write(result.export('xlsx'))
+
+The stages (read, normalize, filter_approved, expand, check, export) can also be
+called one at a time; see leave_converter.pipeline. Users, batches,
+background jobs and incremental processing live in their own modules.
+"""
+
+from .breakdown import BREAKDOWN_COLUMNS, concat_breakdowns, format_breakdown, process_leave_breakdown
+from .employees import EMPLOYEE_COLUMNS, EmployeeRoster, get_employee_roster, load_employee_data, read_roster_files
+from .holidays import HolidayCalendar, get_holiday_calendar
+from .issues import ISSUE_COLUMNS, find_leave_issues
+from .pipeline import ConversionResult, check, convert, expand, export, filter_approved, normalize, read
+from .reader import detect_header_row, find_column, normalize_leave_dataframe, read_leave_file
+from .sharding import partition_by_employee, process_leave_breakdown_sharded
+from .writers import EXPORT_FORMATS, available_export_formats, export_breakdown
@@ -0,0 +1,130 @@
+"""Converting several files or sheets at once, in worker processes for large batches"""
+
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from .breakdown import process_leave_chunks
+from .config import BATCH_MAX_WORKERS, BATCH_PARALLEL_MIN_BYTES
+from .holidays import HolidayCalendar
+from .instrumentation import instrumented
+from .issues import find_leave_issues
+from .lazy import pd
+from .reader import iter_leave_chunks
+from .writers import export_breakdown
+
+def list_sheet_names(file):
+    """Names of all sheets in an xlsx workbook"""
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+        if hasattr(file, 'seek'):
+            file.seek(0)
+
+@instrumented('convert_leave_source')
+def convert_leave_source(name, data, sheet, employee_df, export_format=None, calendar_key=None,
+                         on_stage=None):
+    """
+    Run the full pipeline on one sheet of an uploaded workbook (as bytes).
+    employee_df may be a DataFrame or an EmployeeRoster, which also carries
+    the schedule versions. calendar_key is a HolidayCalendar.key (plain values, so it pickles for
+    worker processes); on_stage, if given, is called with 'read' (the
+    sheet is read and expanded chunk by chunk), 'check' and 'export' as each
+    stage starts. Returns a status dict with
+    the breakdown and its find_leave_issues findings, plus its serialized
+    export when export_format is given.
+    Errors are reported in the dict instead of raised so one bad file does
+    not stop the batch.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    result = {
+        'File': name, 'Sheet': sheet, 'Status': '❌', 'Transactions': 0,
+        'Filtered': 0, 'Records': 0, 'Issues': 0, 'Message': '', 'breakdown': None, 'issues': None,
+        'export': None
+    }
+    try:
+        calendar = None
+        if calendar_key is not None:
+            public_holidays, closures = calendar_key
+            calendar = HolidayCalendar(public_holidays, dict(closures))
+        on_stage('read')
+        leave_df, result['Filtered'], breakdown_df, positions = process_leave_chunks(
+            iter_leave_chunks(io.BytesIO(data), sheet=sheet), employee_df, calendar
+        )
+        result['Transactions'] = len(leave_df)
+        
+        on_stage('check')
+        issues_df = find_leave_issues(leave_df, employee_df, breakdown_df, positions)
+        result['Records'] = len(breakdown_df)
+        result['Issues'] = len(issues_df)
+        result['breakdown'] = breakdown_df
+        result['issues'] = issues_df
+        if export_format is not None:
+            on_stage('export')
+            result['export'] = export_breakdown(breakdown_df, export_format, issues_df)
+        
+        result['Status'] = '✅'
+        if 'Status' not in leave_df.columns:
+            result['Message'] = "No Status column - declined/cancelled leave not filtered"
+        elif len(breakdown_df) == 0:
+            result['Message'] = "No matching employees found"
+    except Exception as e:
+        result['Message'] = str(e)
+    return result
+
+def run_leave_batch(sources, employee_df, export_format=None, max_workers=BATCH_MAX_WORKERS, calendar_key=None):
+    """
+    Convert (name, data, sheet) sources concurrently in a process pool.
+    Results come back in the order of sources.
+    """
+    total_bytes = sum(len(data) for _, data, _ in sources)
+    if len(sources) <= 1 or max_workers <= 1 or total_bytes < BATCH_PARALLEL_MIN_BYTES:
+        return [convert_leave_source(name, data, sheet, employee_df, export_format, calendar_key)
+                for name, data, sheet in sources]
+    
+    # Spawned workers avoid forking a multi-threaded server
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(sources)), mp_context=context) as pool:
+        futures = [
+            pool.submit(convert_leave_source, name, data, sheet, employee_df, export_format, calendar_key)
+            for name, data, sheet in sources
+        ]
+        return [future.result() for future in futures]
+
+def combine_batch_issues(results):
+    """The findings of all batch results in one table, each row led by its File and Sheet"""
+    frames = [result['issues'].assign(File=result['File'], Sheet=str(result['Sheet']))
+              for result in results if result['issues'] is not None and len(result['issues']) > 0]
+    if not frames:
+        return None
+    combined = pd.concat(frames, ignore_index=True)
+    return combined[['File', 'Sheet'] + [col for col in combined.columns if col not in ('File', 'Sheet')]]
+
+def batch_output_name(name, sheet, sheet_count, extension):
+    """File name for one source's breakdown inside the batch zip"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    if sheet_count > 1:
+        stem = f"{stem}_{sheet}"
+    return f"{stem}_Leave_Breakdown.{extension}"
+
+def zip_batch_outputs(results, extension):
+    """Zip the serialized per-source exports of successful batch results"""
+    sheet_counts = {}
+    for result in results:
+        sheet_counts[result['File']] = sheet_counts.get(result['File'], 0) + 1
+    
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for result in results:
+            if result['export'] is not None:
+                archive.writestr(
+                    batch_output_name(result['File'], result['Sheet'], sheet_counts[result['File']], extension),
+                    result['export']
+                )
+    return output.getvalue()
@@ -0,0 +1,331 @@
+"""
+The leave breakdown engine: expands leave transactions into one row per
+working day with the employee's hours for that day.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+from .employees import EmployeeRoster
+from .instrumentation import instrumented
+from .lazy import pd
+
+DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+BREAKDOWN_COLUMNS = [
+    'Employee Number', 'Employee Name', 'Initials', 'Leave Description',
+    'Leave Type Description', 'Date', 'Day of Week', 'Daily Hours'
+]
+# Per-transaction text repeated on every day of the leave; held as categoricals
+BREAKDOWN_TEXT_COLUMNS = BREAKDOWN_COLUMNS[:5]
+NS_PER_DAY = 86_400 * 10**9
+# Daily Hours are float32 in the breakdown (about 7 significant digits);
+# exports round them to this many decimals
+HOURS_DECIMALS = 4
+# Rows formatted at a time when exporting, bounding the size of the text copy
+EXPORT_CHUNK_ROWS = 50_000
+
+def _coerce_dates(series):
+    """Convert a column to datetime64[ns], turning unparseable values into NaT"""
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        # 'mixed' parses every value on its own, like pd.to_datetime on a single cell
+        series = pd.to_datetime(series, errors='coerce', format='mixed')
+    return series.astype('datetime64[ns]')
+
+def _coerce_days(series):
+    """Convert No Days to float: blanks stay NaN, unparseable text becomes 0"""
+    numeric = pd.to_numeric(series, errors='coerce')
+    return numeric.where(series.isna() | numeric.notna(), 0).astype(float)
+
+def _text_values(series):
+    """Stringify and strip a column the way str(value).strip() does per cell"""
+    return series.astype(object).map(str).str.strip().to_numpy(dtype=object)
+
+def _small_codes(codes, size):
+    """Cast category codes to the smallest signed integer type that holds size categories"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return codes.astype(dtype)
+    return codes
+
+def _repeat_categorical(values, row_idx):
+    """values[row_idx] as a Categorical that stores each distinct string once"""
+    codes, categories = pd.factorize(values)
+    codes = _small_codes(codes, len(categories))
+    return pd.Categorical.from_codes(codes[row_idx], categories=categories)
+
+def _empty_breakdown():
+    """A breakdown with no rows and the usual column types"""
+    return pd.DataFrame({
+        **{col: pd.Categorical([]) for col in BREAKDOWN_TEXT_COLUMNS},
+        'Date': pd.Series([], dtype='datetime64[ns]'),
+        'Day of Week': pd.Categorical([], categories=DAY_NAMES),
+        'Daily Hours': pd.Series([], dtype=np.float32)
+    }, columns=BREAKDOWN_COLUMNS)
+
+@instrumented('process_leave_breakdown', 'expand')
+def process_leave_breakdown(leave_df, employee_df, calendar=None, source_rows=False):
+    """
+    Process leave transactions and create daily breakdown.
+    employee_df may be a DataFrame or a prebuilt EmployeeRoster.
+    With source_rows=True, returns (breakdown, positions): the position in
+    leave_df of the transaction behind each breakdown row as well.
+    Every (start, end) range is expanded into days in one batch, weekends and
+    the days in the optional HolidayCalendar are dropped, and hours are looked
+    up per day of the week from the schedule in force on that day (the
+    roster's, or an effective-dated version; see EmployeeRoster). A weekend
+    day is only kept when that schedule has hours on it.
+    
+    The result is columnar: the per-transaction text and the day names are
+    categoricals, Date is datetime64 and Daily Hours float32. Text is only
+    produced by format_breakdown, at export or display time. Formatted, it
+    has the same rows, in the same order, as process_leave_breakdown_reference.
+    """
+    if len(leave_df) == 0 or len(employee_df) == 0:
+        return (_empty_breakdown(), np.empty(0, dtype=np.int32)) if source_rows else _empty_breakdown()
+    
+    roster = employee_df if isinstance(employee_df, EmployeeRoster) else EmployeeRoster(employee_df)
+    emp_nums = _text_values(leave_df['Emp. Number'])
+    return _expand_transactions(leave_df, emp_nums, roster.index.get_indexer(emp_nums), roster,
+                                calendar, source_rows)
+
+def _expand_transactions(leave_df, emp_nums, emp_pos, roster, calendar=None, source_rows=False):
+    """
+    The expansion behind process_leave_breakdown, for transactions whose
+    stripped employee numbers (emp_nums) are already matched to roster
+    positions (emp_pos, -1 for unknown employees). The roster may be one
+    from EmployeeRoster.from_arrays, as in the sharded engine's workers.
+    """
+    hours = roster.hours
+    
+    start = _coerce_dates(leave_df['Start Date'])
+    end = _coerce_dates(leave_df['End Date'])
+    no_days = _coerce_days(leave_df['No Days']).to_numpy()
+    
+    valid = (emp_pos >= 0) & start.notna().to_numpy() & end.notna().to_numpy()
+    start_ns = start.to_numpy().view('i8')
+    end_ns = end.to_numpy().view('i8')
+    
+    # Number of calendar days each transaction covers (start, start + 1 day, ... <= end)
+    span = np.zeros(len(leave_df), dtype=np.int64)
+    span[valid] = np.maximum((end_ns[valid] - start_ns[valid]) // NS_PER_DAY + 1, 0)
+    
+    # Expand every range at once into day numbers (days since 1970-01-01), in
+    # transaction order. Adding whole days keeps any time of day on the start,
+    # so the day number of start + k days is floor(start / day) + k.
+    # int32 indices and day numbers keep the per-day arrays small.
+    total = int(span.sum())
+    row_idx = np.repeat(np.arange(len(leave_df), dtype=np.int32), span)
+    start_day = np.floor_divide(start_ns, NS_PER_DAY)
+    first_day = start_day - (np.cumsum(span) - span)
+    day_number = np.repeat(first_day.astype(np.int32), span) + np.arange(total, dtype=np.int32)
+    
+    # 1970-01-01 was a Thursday, so shift by 3 to get Monday = 0
+    weekday = ((day_number + 3) % 7).astype(np.int8)
+    workday = weekday < 5
+    if roster.works_weekends:
+        # A weekend day is worked if the schedule in force on it has hours
+        weekend = ~workday
+        weekend_schedule = roster.range_schedule_rows(emp_pos, start_day, span, row_idx[weekend], day_number[weekend])
+        workday[weekend] = hours[weekend_schedule, weekday[weekend]] > 0
+        del weekend, weekend_schedule
+    if calendar is not None:
+        workday &= ~calendar.is_holiday(day_number)
+    row_idx = row_idx[workday]
+    day_number = day_number[workday]
+    weekday = weekday[workday]
+    del workday
+    
+    schedule = roster.range_schedule_rows(emp_pos, start_day, span, row_idx, day_number)
+    
+    base_hours = hours[schedule, weekday]
+    has_hours = ~np.isnan(base_hours)
+    is_partial = ((start_ns == end_ns) & (no_days < 1))[row_idx]
+    daily_hours = np.where(
+        is_partial & has_hours,
+        no_days[row_idx] * base_hours,
+        np.where(has_hours, base_hours, 0.0)
+    )
+    daily_hours = np.where(np.isnan(daily_hours), 0.0, daily_hours).astype(np.float32)
+    del schedule, base_hours, has_hours, is_partial
+    
+    initials = np.where(leave_df['Initials'].notna().to_numpy(), _text_values(leave_df['Initials']), '')
+    
+    breakdown_df = pd.DataFrame({
+        'Employee Number': _repeat_categorical(emp_nums, row_idx),
+        'Employee Name': _repeat_categorical(_text_values(leave_df['Employee Name']), row_idx),
+        'Initials': _repeat_categorical(initials.astype(object), row_idx),
+        'Leave Description': _repeat_categorical(_text_values(leave_df['Leave Description']), row_idx),
+        'Leave Type Description': _repeat_categorical(_text_values(leave_df['Leave Type Description']), row_idx),
+        'Date': (day_number.astype(np.int64) * NS_PER_DAY).view('datetime64[ns]'),
+        'Day of Week': pd.Categorical.from_codes(weekday, categories=DAY_NAMES),
+        'Daily Hours': daily_hours
+    }, columns=BREAKDOWN_COLUMNS)
+    return (breakdown_df, row_idx) if source_rows else breakdown_df
+
+def format_breakdown(breakdown_df):
+    """
+    Text form of a breakdown for export and display: plain string columns,
+    dates as YYYY-MM-DD and hours as float64 rounded to HOURS_DECIMALS.
+    Each distinct string is built once and shared between rows. Columns
+    other than BREAKDOWN_COLUMNS (such as a delta's Change) pass through.
+    """
+    formatted = {}
+    for col in breakdown_df.columns:
+        values = breakdown_df[col]
+        if col == 'Date' and pd.api.types.is_datetime64_any_dtype(values):
+            codes, days = pd.factorize(values.to_numpy().astype('datetime64[D]'))
+            formatted[col] = pd.Series(np.datetime_as_string(days, unit='D').astype(object)[codes],
+                                       dtype=object, copy=False)
+        elif col == 'Daily Hours':
+            formatted[col] = pd.Series(values.to_numpy(dtype=float).round(HOURS_DECIMALS), copy=False)
+        elif col in BREAKDOWN_COLUMNS:
+            # Object columns stay object (no string-dtype conversion) for the writers
+            formatted[col] = pd.Series(np.asarray(values, dtype=object), dtype=object, copy=False)
+        else:
+            formatted[col] = pd.Series(values.to_numpy(), copy=False)
+    return pd.DataFrame(formatted, columns=breakdown_df.columns)
+
+def iter_formatted_breakdown(breakdown_df, chunk_size=EXPORT_CHUNK_ROWS):
+    """Yield format_breakdown of consecutive row ranges (at least one chunk)"""
+    for start in range(0, max(len(breakdown_df), 1), chunk_size):
+        yield format_breakdown(breakdown_df.iloc[start:start + chunk_size])
+
+def concat_breakdowns(breakdowns):
+    """Concatenate breakdowns, keeping text columns categorical (union of categories)"""
+    # Empty frames add no rows, and their categories may have another dtype
+    breakdowns = list(breakdowns)
+    non_empty = [frame for frame in breakdowns if len(frame) > 0]
+    if not non_empty:
+        return breakdowns[0].reset_index(drop=True) if breakdowns else _empty_breakdown()
+    breakdowns = non_empty
+    # Text columns are joined as categoricals; concatenating them with
+    # differing categories would go through object arrays of every row
+    text_cols = [col for col in BREAKDOWN_TEXT_COLUMNS if col in breakdowns[0].columns]
+    combined = pd.concat([frame.drop(columns=text_cols) for frame in breakdowns], ignore_index=True)
+    for col in text_cols:
+        combined[col] = pd.api.types.union_categoricals(
+            [pd.Categorical(frame[col]) for frame in breakdowns], ignore_order=True
+        )
+    return combined[breakdowns[0].columns]
+
+@instrumented('process_leave_chunks')
+def process_leave_chunks(chunks, employee_df, calendar=None):
+    """
+    process_leave_breakdown over the (leave_df, filtered_count) chunks of
+    reader.iter_leave_chunks, expanding each chunk as it is read so the
+    per-day working arrays are bounded by the chunk size, not the sheet.
+    Returns (leave_df, filtered_count, breakdown, positions): the combined
+    transactions and their breakdown with each row's transaction position,
+    as from process_leave_breakdown with source_rows=True.
+    """
+    roster = employee_df if isinstance(employee_df, EmployeeRoster) else EmployeeRoster(employee_df)
+    leave_chunks, breakdowns, positions = [], [], []
+    filtered_count = 0
+    offset = 0
+    for chunk, chunk_filtered in chunks:
+        breakdown_df, rows = process_leave_breakdown(chunk, roster, calendar, source_rows=True)
+        leave_chunks.append(chunk)
+        breakdowns.append(breakdown_df)
+        positions.append(rows.astype(np.int32) + np.int32(offset))
+        filtered_count += chunk_filtered
+        offset += len(chunk)
+    
+    leave_df = pd.concat(leave_chunks, ignore_index=True)
+    return leave_df, filtered_count, concat_breakdowns(breakdowns), np.concatenate(positions)
+
+def process_leave_breakdown_reference(leave_df, employee_df, calendar=None, schedule_df=None):
+    """
+    Row-by-row reference implementation of process_leave_breakdown.
+    Kept to check the vectorized engine against; not used by the app.
+    schedule_df holds the effective-dated schedule versions, scanned for
+    every day.
+    """
+    breakdown_data = []
+    day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+    
+    hours_dict = {}
+    for _, row in employee_df.iterrows():
+        emp_num = row['Employee Number']
+        hours_dict[emp_num] = {
+            'first_name': row['First Name'],
+            'last_name': row['Last Name'],
+            'monday': row['Monday'],
+            'tuesday': row['Tuesday'],
+            'wednesday': row['Wednesday'],
+            'thursday': row['Thursday'],
+            'friday': row['Friday'],
+            'saturday': 0.0,
+            'sunday': 0.0
+        }
+    
+    versions = {}
+    if schedule_df is not None:
+        for _, row in schedule_df.iterrows():
+            effective_from = pd.to_datetime(row['Effective From'], errors='coerce')
+            if pd.isna(effective_from):
+                continue
+            versions.setdefault(row['Employee Number'], []).append((
+                effective_from.normalize(),
+                {name: pd.to_numeric(row.get(name.capitalize()), errors='coerce') for name in day_names}
+            ))
+    
+    for idx, row in leave_df.iterrows():
+        # Explicitly convert to appropriate types to avoid datetime errors
+        emp_num = str(row['Emp. Number']).strip()
+        emp_name = str(row['Employee Name']).strip()
+        initials = str(row['Initials']).strip() if pd.notna(row['Initials']) else ''
+        leave_desc = str(row['Leave Description']).strip()
+        leave_type = str(row['Leave Type Description']).strip()
+        
+        # Convert dates properly
+        try:
+            start_date = pd.to_datetime(row['Start Date'])
+            end_date = pd.to_datetime(row['End Date'])
+        except Exception as e:
+            # Skip this row if dates can't be parsed
+            continue
+            
+        # Convert number of days to float
+        try:
+            no_days = float(row['No Days'])
+        except (ValueError, TypeError):
+            no_days = 0
+        
+        if emp_num not in hours_dict:
+            continue
+        
+        is_partial_day = (start_date == end_date) and (no_days < 1)
+        
+        current_date = start_date
+        while current_date <= end_date:
+            day_of_week = current_date.weekday()
+            
+            # The latest version starting on or before the day, else the roster hours
+            emp_hours = hours_dict[emp_num]
+            for effective_from, version_hours in sorted(versions.get(emp_num, []), key=lambda v: v[0]):
+                if effective_from <= current_date.normalize():
+                    emp_hours = version_hours
+            base_daily_hours = emp_hours[day_names[day_of_week]]
+            works_day = day_of_week < 5 or (pd.notna(base_daily_hours) and base_daily_hours > 0)
+            
+            if works_day and (calendar is None or current_date not in calendar):
+                if is_partial_day and pd.notna(base_daily_hours):
+                    daily_hours = no_days * base_daily_hours
+                else:
+                    daily_hours = base_daily_hours if pd.notna(base_daily_hours) else 0
+                
+                breakdown_data.append({
+                    'Employee Number': str(emp_num),
+                    'Employee Name': str(emp_name),
+                    'Initials': str(initials),
+                    'Leave Description': str(leave_desc),
+                    'Leave Type Description': str(leave_type),
+                    'Date': current_date.strftime('%Y-%m-%d'),
+                    'Day of Week': current_date.strftime('%A'),
+                    'Daily Hours': float(daily_hours) if pd.notna(daily_hours) else 0.0
+                })
+            
+            current_date += timedelta(days=1)
+    
+    return pd.DataFrame(breakdown_data)
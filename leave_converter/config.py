@@ -0,0 +1,86 @@
+"""
+File locations and tuning constants of the leave converter.
+Data files are relative to the working directory the app or API runs in,
+or to LEAVE_DATA_DIR when that is set (the Docker image keeps them in a volume).
+"""
+
+import os
+
+# File paths
+DATA_DIR = os.environ.get('LEAVE_DATA_DIR', '')
+EMPLOYEE_DATA_FILE = os.path.join(DATA_DIR, "employee_data.csv")
+SCHEDULES_FILE = os.path.join(DATA_DIR, "employee_schedules.csv")
+USERS_FILE = os.path.join(DATA_DIR, "users.csv")
+USER_COLUMNS = ['username', 'password', 'full_name', 'is_admin', 'active', 'created_date']
+CLOSURES_FILE = os.path.join(DATA_DIR, "company_closures.csv")
+SETTINGS_FILE = os.path.join(DATA_DIR, "app_settings.json")
+PERF_LOG_FILE = "perf_log.jsonl"
+# Employee and user changes are appended to a log next to their CSV, which is
+# folded back into the CSV once it holds as many records as the file (and at
+# least this many)
+STORAGE_COMPACT_MIN_CHANGES = 1000
+
+# Admin-configurable settings and their defaults
+DEFAULT_SETTINGS = {
+    'bcrypt_rounds': 12,
+    'perf_logging': False,
+}
+# bcrypt cost factors admins may choose (each step doubles the hashing time)
+BCRYPT_ROUNDS_RANGE = (10, 15)
+# Concurrent bcrypt checks; more logins queue instead of starving page renders
+AUTH_MAX_WORKERS = os.cpu_count() or 1
+CLOSURE_COLUMNS = ['Date', 'Description']
+
+# Header detection: keywords expected in the header row and how many rows to scan
+HEADER_KEYWORDS = ['emp', 'employee', 'start', 'end', 'days', 'leave']
+HEADER_SCAN_ROWS = 20
+
+# Accepted header variations for each standard leave column
+LEAVE_COLUMN_MAPPINGS = {
+    'Emp. Number': ['emp. number', 'emp number', 'employee number', 'empnumber', 'emp.number', 'emp . number'],
+    'Employee Name': ['employee name', 'emp name', 'name', 'employeename', 'emp. name'],
+    'Initials': ['initials', 'initial'],
+    'Leave Description': ['leave description', 'leavedescription', 'description', 'leave desc'],
+    'Leave Type Description': ['leave type description', 'leave type', 'leavetype', 'type description', 'leave type desc'],
+    'Start Date': ['start date', 'startdate', 'from date', 'date from', 'start'],
+    'End Date': ['end date', 'enddate', 'to date', 'date to', 'end'],
+    'No Days': ['no days', 'nodays', 'days', 'number of days', 'no. days', 'no.days', 'no . days'],
+    'Status': ['status', 'leave status', 'approval status', 'state']
+}
+OPTIONAL_LEAVE_COLUMNS = ['Status']  # These columns are optional
+
+# Streaming reader: rows per chunk handed to filtering and cleaning
+STREAM_CHUNK_ROWS = 5000
+
+# Batch uploads: maximum worker processes, and the total upload size below
+# which a batch runs in-process (worker start-up costs more than it saves)
+BATCH_MAX_WORKERS = os.cpu_count() or 1
+BATCH_PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+# Sharded expansion: the most worker processes expanding one large leave
+# frame split by employee, and the transaction count below which it stays
+# in-process. Spawning a worker takes about 0.9s and partitioning, pickling
+# and merging about 0.15s per 100k transactions, against 0.38s per 100k to
+# expand them in-process, so even 4-8 cores only gain from about 1M up.
+EXPAND_MAX_WORKERS = os.cpu_count() or 1
+EXPAND_PARALLEL_MIN_TRANSACTIONS = 1_000_000
+
+# Background jobs: where job state, inputs and results are kept, and how
+# long finished jobs are kept
+JOBS_DIR = "jobs"
+JOB_RETENTION_HOURS = 24
+# The server running a job renews its lease every JOB_HEARTBEAT_SECONDS;
+# another server (the app and api.py share JOBS_DIR) takes a job over only
+# once its lease has run out
+JOB_HEARTBEAT_SECONDS = 30
+JOB_LEASE_SECONDS = 120
+
+# Incremental processing: where each user's last breakdown is kept, with the
+# fingerprints of the transactions it came from
+BREAKDOWN_STORE_DIR = "breakdown_store"
+# Each run adds a segment file with the rows it expanded; a store with more
+# segments than this is rewritten as one
+BREAKDOWN_STORE_MAX_SEGMENTS = 20
+
+# Performance panel: how many recent runs are loaded from the log
+PERF_HISTORY_RUNS = 5000
@@ -0,0 +1,322 @@
+"""Employee working hours: the cached roster, persistence and bulk import"""
+
+import functools
+import os
+
+import numpy as np
+
+from .config import EMPLOYEE_DATA_FILE, SCHEDULES_FILE
+from .instrumentation import instrumented
+from .lazy import pd
+from .reader import find_column
+from .storage import (_delete_records, _read_csv_or_empty, _records_state, _replace_records, _upsert_records,
+                      compact_records)
+
+WEEKDAY_COLUMNS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+WEEKEND_COLUMNS = ['Saturday', 'Sunday']
+EMPLOYEE_COLUMNS = ['Employee Number', 'First Name', 'Last Name'] + WEEKDAY_COLUMNS
+# Effective-dated schedule versions: from Effective From until the employee's
+# next version, these hours replace the roster's (weekends included)
+SCHEDULE_COLUMNS = ['Employee Number', 'Effective From'] + WEEKDAY_COLUMNS + WEEKEND_COLUMNS
+
+# Bulk import: accepted header variations per employee column, and the
+# allowed range for daily hours
+EMPLOYEE_COLUMN_MAPPINGS = {
+    'Employee Number': ['Employee Number', 'Emp. Number', 'Emp Number', 'Employee No', 'Emp No'],
+    'First Name': ['First Name', 'Firstname', 'Name'],
+    'Last Name': ['Last Name', 'Lastname', 'Surname'],
+    **{day: [day, day[:3]] for day in WEEKDAY_COLUMNS}
+}
+MAX_DAILY_HOURS = 24.0
+
+# Schedule lookup keys: employee position * stride + offset day number, so
+# one sorted array orders versions by employee, then by date. Day numbers
+# of datetime64[ns] dates (1677-2262) stay within +/- the offset.
+SCHEDULE_KEY_STRIDE = 1 << 20
+SCHEDULE_KEY_OFFSET = 1 << 19
+
+class EmployeeRoster:
+    """
+    Employee table plus a prebuilt employee-number index and a compact
+    (schedules x days of the week) hours array, so processing needs no
+    per-call rebuild.
+    
+    Row i of hours is employee i's roster hours (no weekend work), which
+    apply before their first effective-dated schedule version. The versions
+    follow, sorted by employee and Effective From; schedule_rows finds the
+    one in force on each day with a binary search over them.
+    """
+    
+    def __init__(self, employee_df, version=None, schedule_df=None):
+        self.df = employee_df
+        # Identifies the roster file state the table was read from
+        self.version = version
+        # Employee numbers are matched as stripped text, like the leave files'
+        # Emp. Number; later duplicates win, as they did when building
+        # hours_dict row by row
+        emp_nums = employee_df['Employee Number'].astype(str).str.strip()
+        unique = employee_df[~emp_nums.duplicated(keep='last').to_numpy()]
+        self.index = pd.Index(emp_nums[unique.index], dtype=object)
+        roster_hours = unique[WEEKDAY_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        roster_hours = np.hstack([roster_hours, np.zeros((len(roster_hours), len(WEEKEND_COLUMNS)))])
+        
+        if schedule_df is None:
+            schedule_df = pd.DataFrame(columns=SCHEDULE_COLUMNS)
+        self.schedules = schedule_df
+        emp_pos = self.index.get_indexer(schedule_df['Employee Number'].astype(str).str.strip())
+        start = pd.to_datetime(schedule_df['Effective From'], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        start_day = start.astype('datetime64[D]').astype(np.int64)
+        # Versions of unknown employees or without a date never apply
+        usable = (emp_pos >= 0) & ~np.isnat(start)
+        keys = emp_pos[usable].astype(np.int64) * SCHEDULE_KEY_STRIDE + start_day[usable] + SCHEDULE_KEY_OFFSET
+        version_hours = (schedule_df.reindex(columns=WEEKDAY_COLUMNS + WEEKEND_COLUMNS)[usable]
+                         .apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float))
+        # Sorted by key; of two versions on the same day the later one wins
+        order = np.lexsort((np.arange(len(keys)), keys))
+        keys, version_hours = keys[order], version_hours[order]
+        last = np.ones(len(keys), dtype=bool)
+        last[:-1] = keys[1:] != keys[:-1]
+        self.employee_count = len(self.index)
+        self._set_hours(np.vstack([roster_hours, version_hours[last]]), keys[last])
+    
+    @classmethod
+    def from_arrays(cls, hours, schedule_keys, employee_count):
+        """
+        A roster over existing hours and schedule key arrays (such as views of
+        shared memory) for expansion only: it has no table or index, so
+        employee numbers must already be matched to positions.
+        """
+        roster = cls.__new__(cls)
+        roster.df = roster.version = roster.index = roster.schedules = None
+        roster.employee_count = employee_count
+        roster._set_hours(hours, schedule_keys)
+        return roster
+    
+    def _set_hours(self, hours, schedule_keys):
+        """Hold the hours rows and the sorted version keys, with what derives from them"""
+        self.hours = hours
+        self.schedule_keys = schedule_keys
+        self.schedule_employees = schedule_keys // SCHEDULE_KEY_STRIDE
+        self.schedule_start_days = schedule_keys % SCHEDULE_KEY_STRIDE - SCHEDULE_KEY_OFFSET
+        # Weekend days only become working days through a version with weekend hours
+        self.works_weekends = bool((hours[:, len(WEEKDAY_COLUMNS):] > 0).any())
+    
+    def __len__(self):
+        return len(self.df)
+    
+    def schedule_rows(self, emp_pos, day_number):
+        """
+        Row of hours in force for each (employee position, day number since
+        1970-01-01) pair: the employee's latest version starting on or before
+        the day, else their roster row. One searchsorted over the sorted
+        version keys, so the cost does not depend on how many versions exist.
+        """
+        if len(self.schedule_keys) == 0:
+            return emp_pos
+        keys = emp_pos.astype(np.int64) * SCHEDULE_KEY_STRIDE + day_number + SCHEDULE_KEY_OFFSET
+        found = np.searchsorted(self.schedule_keys, keys, side='right') - 1
+        in_force = found >= 0
+        in_force[in_force] = self.schedule_employees[found[in_force]] == emp_pos[in_force]
+        return np.where(in_force, self.employee_count + found, emp_pos)
+    
+    def range_schedule_rows(self, emp_pos, start_day, span, row_idx, day_number):
+        """
+        schedule_rows for days of expanded date ranges: range i is span[i]
+        days of employee emp_pos[i] from start_day[i], and each day is given
+        by its range (row_idx) and day_number. A range within one schedule is
+        resolved once; only the days of ranges that cross a schedule change
+        are looked up one by one.
+        """
+        if len(self.schedule_keys) == 0:
+            return emp_pos[row_idx]
+        first = self.schedule_rows(emp_pos, start_day)
+        last = self.schedule_rows(emp_pos, start_day + np.maximum(span - 1, 0))
+        schedule = first[row_idx]
+        crossing = (first != last)[row_idx]
+        if crossing.any():
+            schedule[crossing] = self.schedule_rows(emp_pos[row_idx[crossing]], day_number[crossing])
+        return schedule
+
+def read_roster_files(path, schedules_path=None, version=None):
+    """
+    EmployeeRoster from an employee CSV and, if it exists, a schedules CSV
+    (each with its change log applied), with employee numbers read as text
+    """
+    schedule_df = None
+    if schedules_path is not None and os.path.exists(schedules_path):
+        schedule_df = _read_csv_or_empty(schedules_path, SCHEDULE_COLUMNS, 'Employee Number')
+    return EmployeeRoster(_read_csv_or_empty(path, EMPLOYEE_COLUMNS, 'Employee Number'),
+                          version=version, schedule_df=schedule_df)
+
+@functools.lru_cache(maxsize=4)
+def _load_roster(path, state, schedules_path, schedules_state):
+    """Read and index the employee and schedule CSVs; cached across sessions per file version"""
+    return read_roster_files(path, schedules_path if schedules_state is not None else None,
+                             version=(state, schedules_state))
+
+@instrumented('load_employee_data', 'load_employee_data')
+def get_employee_roster():
+    """Return the cached employee roster, re-reading the CSVs only when they change"""
+    state = _records_state(EMPLOYEE_DATA_FILE)
+    if state is not None:
+        return _load_roster(EMPLOYEE_DATA_FILE, state, SCHEDULES_FILE, _records_state(SCHEDULES_FILE))
+    else:
+        return EmployeeRoster(pd.DataFrame(columns=EMPLOYEE_COLUMNS))
+
+@instrumented('load_employee_data')
+def load_employee_data():
+    """Load employee data (a copy of the cached roster table)"""
+    return get_employee_roster().df.copy()
+
+def save_employee_data(df):
+    """Save employee data to CSV file (atomic full replace)"""
+    _replace_records(EMPLOYEE_DATA_FILE, df)
+    _load_roster.cache_clear()
+
+def upsert_employees(records):
+    """
+    Insert or update employee records by Employee Number.
+    Returns the number of employees added and updated.
+    """
+    added, updated = _upsert_records(EMPLOYEE_DATA_FILE, records, 'Employee Number', EMPLOYEE_COLUMNS)
+    _load_roster.cache_clear()
+    return added, updated
+
+def delete_employees(employee_numbers):
+    """Delete employees, and their schedule versions, by Employee Number; returns the number removed"""
+    employee_numbers = list(employee_numbers)
+    removed = _delete_records(EMPLOYEE_DATA_FILE, 'Employee Number', employee_numbers, EMPLOYEE_COLUMNS)
+    _delete_records(SCHEDULES_FILE, 'Employee Number', employee_numbers, SCHEDULE_COLUMNS)
+    _load_roster.cache_clear()
+    return removed
+
+def load_employee_schedules():
+    """Load the effective-dated schedule versions (Effective From as YYYY-MM-DD)"""
+    return _read_csv_or_empty(SCHEDULES_FILE, SCHEDULE_COLUMNS, 'Employee Number')
+
+def save_employee_schedules(df):
+    """Replace the schedule versions (atomic full replace), sorted by employee and date"""
+    df = df.reindex(columns=SCHEDULE_COLUMNS)
+    _replace_records(SCHEDULES_FILE, df.sort_values(['Employee Number', 'Effective From'], kind='stable'))
+    _load_roster.cache_clear()
+
+def compact_employee_files():
+    """Fold the employee and schedule change logs into their CSVs, so each CSV holds all records (e.g. for a backup)"""
+    compact_records(EMPLOYEE_DATA_FILE, EMPLOYEE_COLUMNS, 'Employee Number')
+    compact_records(SCHEDULES_FILE, SCHEDULE_COLUMNS, 'Employee Number')
+
+def parse_employee_import(file):
+    """
+    Read an employee roster upload (CSV or Excel) in the
+    employee_data_template.csv layout into EMPLOYEE_COLUMNS.
+    Text is stripped and blanks become NaN; hours are left as text so
+    validate_employee_import can report unparseable values.
+    """
+    name = getattr(file, 'name', '')
+    if name.lower().endswith('.csv'):
+        df = pd.read_csv(file, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(file, dtype=str, keep_default_na=False)
+    return standardize_employee_columns(df)
+
+def standardize_employee_columns(df):
+    """
+    Map an employee table with text values and any accepted header
+    variations onto EMPLOYEE_COLUMNS, stripping text and turning blanks
+    into NaN. Raises ValueError listing the missing columns.
+    """
+    found, missing = {}, []
+    for standard_name, variations in EMPLOYEE_COLUMN_MAPPINGS.items():
+        col = find_column(df, variations)
+        if col is None:
+            missing.append(standard_name)
+        else:
+            found[standard_name] = col
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}. "
+                         f"Available columns: {', '.join(map(str, df.columns))}")
+    
+    imported = pd.DataFrame({standard_name: df[col].str.strip() for standard_name, col in found.items()})
+    return imported.replace('', np.nan)
+
+def validate_employee_import(import_df):
+    """
+    Check every imported row at once: employee number and names present,
+    employee numbers unique within the file, and hours numeric within
+    0-MAX_DAILY_HOURS. Returns the rows with hours as floats plus an
+    'Errors' column ('' for valid rows).
+    """
+    checked = import_df.copy()
+    errors = pd.Series('', index=checked.index)
+    
+    def flag(mask, message):
+        nonlocal errors
+        errors = errors.where(~mask, errors + np.where(errors == '', '', '; ') + message)
+    
+    for col in ['Employee Number', 'First Name', 'Last Name']:
+        flag(checked[col].isna(), f"{col} missing")
+    flag(checked['Employee Number'].notna() & checked['Employee Number'].duplicated(keep=False),
+         "Employee Number duplicated in file")
+    
+    for day in WEEKDAY_COLUMNS:
+        hours = pd.to_numeric(checked[day], errors='coerce')
+        flag(checked[day].isna(), f"{day} hours missing")
+        flag(checked[day].notna() & hours.isna(), f"{day} hours not a number")
+        flag((hours < 0) | (hours > MAX_DAILY_HOURS), f"{day} hours outside 0-{MAX_DAILY_HOURS:g}")
+        checked[day] = hours
+    
+    checked['Errors'] = errors
+    return checked
+
+def diff_employee_import(import_df, employee_df):
+    """
+    Compare a validated import against the current employees.
+    Returns one row per imported row with its source 'Row' number (as in the
+    file, header = row 1), 'Action' (Add, Update, Unchanged or Invalid) and
+    the changed fields as 'old -> new' in 'Changes'.
+    """
+    checked = validate_employee_import(import_df)
+    current = employee_df.drop_duplicates(subset='Employee Number', keep='last').copy()
+    current['Employee Number'] = current['Employee Number'].astype(str).str.strip()
+    current = current.set_index('Employee Number')
+    
+    exists = checked['Employee Number'].isin(current.index)
+    before = current.reindex(checked['Employee Number'])
+    before.index = checked.index
+    
+    changes = pd.Series('', index=checked.index)
+    for col in ['First Name', 'Last Name'] + WEEKDAY_COLUMNS:
+        old, new = before[col], checked[col]
+        if col in WEEKDAY_COLUMNS:
+            old = pd.to_numeric(old, errors='coerce')
+            differs = ~np.isclose(old.to_numpy(dtype=float), new.to_numpy(dtype=float), equal_nan=True)
+            old_text = old.map('{:g}'.format)
+            new_text = new.map('{:g}'.format)
+        else:
+            differs = (old.astype(str) != new.astype(str)).to_numpy()
+            old_text, new_text = old.astype(str), new.astype(str)
+        differs = differs & exists.to_numpy()
+        text = col + ': ' + old_text + ' -> ' + new_text
+        changes = changes.where(~differs, changes + np.where(changes == '', '', '; ') + text)
+    
+    action = np.select(
+        [checked['Errors'] != '', ~exists, changes != ''],
+        ['Invalid', 'Add', 'Update'],
+        default='Unchanged'
+    )
+    diff = checked[EMPLOYEE_COLUMNS].copy()
+    diff.insert(0, 'Row', checked.index + 2)
+    diff['Action'] = action
+    diff['Changes'] = changes.where(diff['Action'] == 'Update', '')
+    diff['Errors'] = checked['Errors']
+    return diff.reset_index(drop=True)
+
+def import_employees(diff_df):
+    """
+    Apply the Add and Update rows of diff_employee_import in one locked,
+    atomic upsert. Returns the number of employees added and updated.
+    """
+    to_write = diff_df[diff_df['Action'].isin(['Add', 'Update'])]
+    if len(to_write) == 0:
+        return 0, 0
+    return upsert_employees(to_write[EMPLOYEE_COLUMNS])
@@ -0,0 +1,162 @@
+"""South African public holidays and company closures excluded from breakdowns"""
+
+import functools
+from datetime import date, timedelta
+
+import numpy as np
+
+from .breakdown import _coerce_dates
+from .config import CLOSURE_COLUMNS, CLOSURES_FILE
+from .lazy import pd
+from .reader import find_column
+from .storage import _read_csv_or_empty, _replace_records
+
+# Fixed-date South African public holidays (Public Holidays Act 36 of 1994)
+SA_FIXED_HOLIDAYS = [
+    (1, 1, "New Year's Day"),
+    (3, 21, "Human Rights Day"),
+    (4, 27, "Freedom Day"),
+    (5, 1, "Workers' Day"),
+    (6, 16, "Youth Day"),
+    (8, 9, "National Women's Day"),
+    (9, 24, "Heritage Day"),
+    (12, 16, "Day of Reconciliation"),
+    (12, 25, "Christmas Day"),
+    (12, 26, "Day of Goodwill"),
+]
+
+def _easter_sunday(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+@functools.lru_cache(maxsize=None)
+def sa_public_holidays(year):
+    """
+    South African public holidays for a year as {date: name}.
+    A holiday falling on a Sunday is also observed on the following Monday
+    (or the next free day, when that Monday is itself a holiday).
+    One-off holidays declared by proclamation are not included; add them as
+    company closures.
+    """
+    easter = _easter_sunday(year)
+    holidays = {date(year, month, day): name for month, day, name in SA_FIXED_HOLIDAYS}
+    holidays[easter - timedelta(days=2)] = "Good Friday"
+    holidays[easter + timedelta(days=1)] = "Family Day"
+    
+    for day, name in sorted(holidays.items()):
+        if day.weekday() == 6:
+            observed = day + timedelta(days=1)
+            while observed in holidays:
+                observed += timedelta(days=1)
+            holidays[observed] = f"{name} (observed)"
+    return dict(sorted(holidays.items()))
+
+class HolidayCalendar:
+    """
+    Non-working weekdays excluded from leave breakdowns: South African public
+    holidays (optional) plus company closure dates.
+    Held as a boolean mask over day numbers (days since 1970-01-01) covering
+    whole years, built on first use, so the engine excludes them with a
+    single array lookup instead of a per-row check.
+    """
+    
+    def __init__(self, public_holidays=True, closures=None):
+        self.public_holidays = public_holidays
+        # closures: {date: description} or an iterable of dates
+        if closures is None:
+            closures = {}
+        elif not isinstance(closures, dict):
+            closures = dict.fromkeys(closures, "Company closure")
+        self.closures = {pd.Timestamp(day).date(): str(name) for day, name in closures.items()}
+        # Hashable identity for result caches
+        self.key = (public_holidays, tuple(sorted(self.closures.items())))
+        self._first_year = None
+        self._last_year = None
+        self._first_day = 0
+        self._mask = np.zeros(0, dtype=bool)
+    
+    def holidays(self, first_year, last_year):
+        """All non-working days from first_year to last_year as {date: name}"""
+        days = {}
+        if self.public_holidays:
+            for year in range(first_year, last_year + 1):
+                days.update(sa_public_holidays(year))
+        for day, name in self.closures.items():
+            if first_year <= day.year <= last_year:
+                days.setdefault(day, name)
+        return dict(sorted(days.items()))
+    
+    def _cover(self, first_year, last_year):
+        """Rebuild the mask if it does not span the given years"""
+        if self._first_year is not None:
+            if self._first_year <= first_year and last_year <= self._last_year:
+                return
+            first_year = min(first_year, self._first_year)
+            last_year = max(last_year, self._last_year)
+        
+        epoch = date(1970, 1, 1)
+        self._first_day = (date(first_year, 1, 1) - epoch).days
+        self._mask = np.zeros((date(last_year, 12, 31) - epoch).days - self._first_day + 1, dtype=bool)
+        for day in self.holidays(first_year, last_year):
+            self._mask[(day - epoch).days - self._first_day] = True
+        self._first_year, self._last_year = first_year, last_year
+    
+    def is_holiday(self, day_numbers):
+        """Boolean array: which day numbers (days since 1970-01-01) are non-working"""
+        day_numbers = np.asarray(day_numbers)
+        if len(day_numbers) == 0 or (not self.public_holidays and not self.closures):
+            return np.zeros(len(day_numbers), dtype=bool)
+        span = np.array([day_numbers.min(), day_numbers.max()], dtype='datetime64[D]')
+        first_year, last_year = span.astype('datetime64[Y]').astype(int) + 1970
+        self._cover(int(first_year), int(last_year))
+        return self._mask[day_numbers - self._first_day]
+    
+    def __contains__(self, day):
+        day = pd.Timestamp(day).date()
+        if day in self.closures:
+            return True
+        return self.public_holidays and day in sa_public_holidays(day.year)
+
+def load_company_closures():
+    """Load company closure dates (Date as YYYY-MM-DD, Description)"""
+    return _read_csv_or_empty(CLOSURES_FILE, CLOSURE_COLUMNS)
+
+def save_company_closures(df):
+    """Replace the company closure dates (atomic full replace)"""
+    _replace_records(CLOSURES_FILE, df[CLOSURE_COLUMNS])
+
+def parse_company_closures(file):
+    """
+    Read closure dates from an uploaded CSV or Excel file.
+    Needs a date column ('Date', 'Closure Date' or 'Non-Working Day'); a
+    'Description' column is optional. Returns a CLOSURE_COLUMNS DataFrame.
+    """
+    name = getattr(file, 'name', '')
+    df = pd.read_csv(file) if name.lower().endswith('.csv') else pd.read_excel(file)
+    date_col = find_column(df, ['Date', 'Closure Date', 'Non-Working Day', 'Holiday'])
+    if date_col is None:
+        raise ValueError(f"No date column found. Available columns: {', '.join(map(str, df.columns))}")
+    desc_col = find_column(df, ['Description', 'Reason', 'Name'])
+    
+    dates = _coerce_dates(df[date_col])
+    descriptions = df[desc_col].fillna('').astype(str).str.strip() if desc_col else pd.Series('', index=df.index)
+    closures = pd.DataFrame({
+        'Date': dates.dt.strftime('%Y-%m-%d'),
+        'Description': descriptions.where(descriptions != '', "Company closure")
+    })[dates.notna()]
+    return closures.drop_duplicates(subset='Date', keep='last').sort_values('Date').reset_index(drop=True)
+
+def get_holiday_calendar(public_holidays=True):
+    """Holiday calendar from the SA public holidays and the saved company closures"""
+    closures = load_company_closures()
+    return HolidayCalendar(public_holidays, dict(zip(closures["Date"], closures["Description"].fillna("Company closure"))))
@@ -0,0 +1,270 @@
+"""
+Incremental processing: each user's last breakdown of each source file is
+stored with the fingerprints of its transactions, so a re-upload of that
+file only expands what changed.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from .breakdown import (BREAKDOWN_COLUMNS, BREAKDOWN_TEXT_COLUMNS, DAY_NAMES, _coerce_dates, _coerce_days,
+                        _empty_breakdown, _text_values, concat_breakdowns, format_breakdown,
+                        process_leave_breakdown)
+from .config import BREAKDOWN_STORE_DIR, BREAKDOWN_STORE_MAX_SEGMENTS
+from .instrumentation import instrumented, perf_stage
+from .lazy import pd
+from .storage import _file_lock, _write_json_atomic
+
+# Normalized transaction fields that, with the employee's schedules, make
+# up a transaction's fingerprint
+FINGERPRINT_TEXT_COLUMNS = ['Emp. Number', 'Employee Name', 'Initials', 'Leave Description',
+                            'Leave Type Description', 'Status']
+
+def _schedule_hashes(roster):
+    """
+    One uint64 per roster employee covering their roster hours and each of
+    their schedule versions (start day and hours)
+    """
+    row_hash = pd.util.hash_pandas_object(pd.DataFrame(roster.hours), index=False).to_numpy()
+    employee_hash = row_hash[:len(roster.index)].copy()
+    if len(roster.schedule_keys) > 0:
+        version_hash = pd.util.hash_pandas_object(pd.DataFrame({
+            'start': roster.schedule_start_days, 'hours': row_hash[len(roster.index):]
+        }), index=False).to_numpy()
+        # Summed (wrapping) per employee, so the order of versions does not matter
+        np.add.at(employee_hash, roster.schedule_employees, version_hash)
+    return employee_hash
+
+def transaction_fingerprints(leave_df, roster):
+    """
+    One uint64 fingerprint per transaction, from its employee, leave type,
+    dates, day count and status plus the employee's hours and schedule
+    versions, so a roster or schedule change re-expands that employee's
+    leave. Repeated identical transactions are told apart by occurrence.
+    """
+    frame = pd.DataFrame({
+        col: _text_values(leave_df[col]) for col in FINGERPRINT_TEXT_COLUMNS if col in leave_df.columns
+    })
+    frame['Start Date'] = _coerce_dates(leave_df['Start Date']).to_numpy()
+    frame['End Date'] = _coerce_dates(leave_df['End Date']).to_numpy()
+    frame['No Days'] = _coerce_days(leave_df['No Days']).to_numpy()
+    
+    hours_hash = np.zeros(1, dtype=np.uint64)
+    if len(roster.index) > 0:
+        # Last slot (0) stands for employees missing from the roster
+        hours_hash = np.append(_schedule_hashes(roster), hours_hash)
+    frame['Hours'] = hours_hash[roster.index.get_indexer(frame['Emp. Number'])]
+    
+    fingerprint = pd.util.hash_pandas_object(frame, index=False)
+    occurrence = fingerprint.groupby(fingerprint, sort=False).cumcount()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({'fingerprint': fingerprint.to_numpy(), 'occurrence': occurrence.to_numpy()}), index=False
+    ).to_numpy()
+
+def _store_key(text):
+    """Directory name standing for a username or source name"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def _store_path(username, source_name, name):
+    """
+    Path of a file in a user's breakdown store for one source (the uploaded
+    file's name), so exports of different companies or payrolls never
+    replace each other's stored rows
+    """
+    return os.path.join(BREAKDOWN_STORE_DIR, _store_key(username), _store_key(source_name), name)
+
+def _calendar_state(calendar):
+    """JSON form of a HolidayCalendar's key (None for no calendar)"""
+    if calendar is None:
+        return None
+    public_holidays, closures = calendar.key
+    return [public_holidays, [[day.isoformat(), name] for day, name in closures]]
+
+def _write_npz_atomic(arrays, path):
+    """Save arrays as an .npz in a temporary file and atomically replace path with it"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _write_store_segment(rows, path):
+    """
+    Write breakdown rows, with their Key column, as a store segment: an .npz
+    of the columns in their compact form (category codes plus categories,
+    day values, float32 hours), so nothing is formatted or parsed as text.
+    """
+    arrays = {'Key': rows['Key'].to_numpy(), 'Date': rows['Date'].to_numpy().view('i8'),
+              'Daily Hours': rows['Daily Hours'].to_numpy(), 'Day of Week': rows['Day of Week'].cat.codes.to_numpy()}
+    for col in BREAKDOWN_TEXT_COLUMNS:
+        arrays[f'{col} codes'] = rows[col].cat.codes.to_numpy()
+        arrays[f'{col} categories'] = np.asarray(rows[col].cat.categories, dtype=str)
+    _write_npz_atomic(arrays, path)
+
+@functools.lru_cache(maxsize=64)
+def _load_store_segment(path, mtime_ns, size):
+    """Read a store segment back into breakdown form; cached, as segments never change once written"""
+    with np.load(path, allow_pickle=False) as arrays:
+        return pd.DataFrame({
+            **{col: pd.Categorical.from_codes(arrays[f'{col} codes'], categories=arrays[f'{col} categories'])
+               for col in BREAKDOWN_TEXT_COLUMNS},
+            'Date': arrays['Date'].view('datetime64[ns]'),
+            'Day of Week': pd.Categorical.from_codes(arrays['Day of Week'], categories=DAY_NAMES),
+            'Daily Hours': arrays['Daily Hours'],
+            'Key': arrays['Key']
+        }, columns=BREAKDOWN_COLUMNS + ['Key'])
+
+def load_breakdown_store(username, source_name):
+    """
+    A user's last incremental run of a source: (state, breakdown, transactions).
+    transactions has each transaction's Key and the Segment file holding its
+    rows; the breakdown has those rows with a Key column naming each row's
+    transaction. Returns (None, None, None) if there is no store.
+    """
+    try:
+        with open(_store_path(username, source_name, 'state.json')) as f:
+            state = json.load(f)
+        with np.load(_store_path(username, source_name, 'transactions.npz'), allow_pickle=False) as arrays:
+            transactions = pd.DataFrame({'Key': arrays['Key'], 'Segment': arrays['Segment'].astype(object)})
+        segments = []
+        for name in state['segments']:
+            path = _store_path(username, source_name, name)
+            stat = os.stat(path)
+            rows = _load_store_segment(path, stat.st_mtime_ns, stat.st_size)
+            # A segment may still hold rows of transactions that were expanded again later
+            live = transactions.loc[transactions['Segment'] == name, 'Key']
+            segments.append(rows[rows['Key'].isin(live).to_numpy()])
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None, None, None
+    return state, concat_breakdowns(segments), transactions
+
+def clear_breakdown_store(username, source_name=None):
+    """Forget a user's previous incremental runs of one source, or of every source"""
+    if source_name is None:
+        shutil.rmtree(os.path.join(BREAKDOWN_STORE_DIR, _store_key(username)), ignore_errors=True)
+    else:
+        shutil.rmtree(os.path.dirname(_store_path(username, source_name, 'state.json')), ignore_errors=True)
+
+def _row_keys(breakdown_df):
+    """Fingerprint per breakdown row, repeated rows told apart by occurrence"""
+    row_hash = pd.util.hash_pandas_object(breakdown_df[BREAKDOWN_COLUMNS], index=False)
+    occurrence = row_hash.groupby(row_hash, sort=False).cumcount()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({'row': row_hash.to_numpy(), 'occurrence': occurrence.to_numpy()}), index=False
+    ).to_numpy()
+
+def breakdown_delta(removed_df, added_df):
+    """
+    Day-level changes for OpenTime between two runs, given the rows of the
+    transactions that disappeared or changed (removed_df) and the rows of
+    the new or changed ones (added_df). Days that appear in both, e.g. the
+    unchanged days of a leave whose end date moved, cancel out. Returns the
+    formatted rows with a leading Change column ('Removed' or 'Added'),
+    sorted by employee and date.
+    """
+    removed_keys, added_keys = _row_keys(removed_df), _row_keys(added_df)
+    delta = pd.concat([
+        format_breakdown(removed_df.loc[~np.isin(removed_keys, added_keys), BREAKDOWN_COLUMNS]).assign(Change='Removed'),
+        format_breakdown(added_df.loc[~np.isin(added_keys, removed_keys), BREAKDOWN_COLUMNS]).assign(Change='Added')
+    ], ignore_index=True)
+    delta = delta[['Change'] + BREAKDOWN_COLUMNS]
+    return delta.sort_values(['Employee Number', 'Date'], kind='stable', ignore_index=True)
+
+@instrumented('process_leave_incremental')
+def process_leave_incremental(username, leave_df, roster, calendar=None, source_name='', source_rows=False):
+    """
+    Breakdown of leave_df that expands only the transactions that are new or
+    changed since the user's previous incremental run of the same source
+    (file name) and reuses the stored rows of the rest; the result replaces
+    that source's store for the next run.
+    Returns (breakdown, delta, summary): the same breakdown as
+    process_leave_breakdown, the breakdown_delta against the previous run,
+    and counts for display. With source_rows=True the breakdown is a
+    (breakdown, positions) pair, as from process_leave_breakdown.
+    """
+    with perf_stage('fingerprint'):
+        keys = transaction_fingerprints(leave_df, roster)
+    
+    os.makedirs(os.path.dirname(_store_path(username, source_name, 'state.json')), exist_ok=True)
+    with _file_lock(_store_path(username, source_name, 'state.json')):
+        with perf_stage('load_store'):
+            previous, stored, transactions = load_breakdown_store(username, source_name)
+        if previous is None:
+            stored = _empty_breakdown().assign(Key=np.empty(0, dtype=np.uint64))
+            transactions = pd.DataFrame({'Key': np.empty(0, dtype=np.uint64), 'Segment': []})
+        previous_keys = transactions['Key'].to_numpy()
+        # Stored rows are only valid for the holiday calendar they were expanded with
+        if previous is not None and previous['calendar'] == _calendar_state(calendar):
+            reused = np.isin(keys, previous_keys)
+        else:
+            reused = np.zeros(len(keys), dtype=bool)
+        
+        changed = np.flatnonzero(~reused)
+        new_df, source = process_leave_breakdown(leave_df.iloc[changed], roster, calendar, source_rows=True)
+        new_df['Key'] = keys[changed][source]
+        keep = stored['Key'].isin(keys[reused]).to_numpy()
+        
+        # Put every row back in transaction order; each transaction's days are
+        # already in order within the stored or the new rows
+        breakdown_df = concat_breakdowns([stored[keep], new_df])
+        positions = pd.Index(keys).get_indexer(breakdown_df['Key'])
+        order = np.argsort(positions, kind='stable')
+        breakdown_df = breakdown_df.iloc[order].reset_index(drop=True)
+        positions = positions[order].astype(np.int32)
+        delta_df = breakdown_delta(stored[~keep], new_df)
+        
+        with perf_stage('save_store'):
+            # New rows go to a new segment file, so a run writes only what it expanded.
+            # Once segments hold more unused rows than used ones, they are
+            # rewritten as a single segment.
+            segment = f"rows_{uuid.uuid4().hex[:12]}.npz"
+            segment_of = np.full(len(keys), segment, dtype=object)
+            segment_of[reused] = transactions['Segment'].to_numpy()[pd.Index(previous_keys).get_indexer(keys[reused])]
+            segment_rows = dict(previous['segment_rows']) if previous is not None else {}
+            segment_rows[segment] = len(new_df)
+            in_use = set(segment_of)
+            unused_rows = sum(segment_rows[name] for name in in_use) - len(breakdown_df)
+            if unused_rows > len(breakdown_df) or len(in_use) > BREAKDOWN_STORE_MAX_SEGMENTS:
+                _write_store_segment(breakdown_df, _store_path(username, source_name, segment))
+                segment_of[:] = segment
+                segment_rows[segment] = len(breakdown_df)
+            elif len(changed) > 0:
+                _write_store_segment(new_df, _store_path(username, source_name, segment))
+            in_use = [name for name in segment_rows if name in set(segment_of)]
+            
+            _write_npz_atomic({'Key': keys, 'Segment': segment_of.astype(str)},
+                              _store_path(username, source_name, 'transactions.npz'))
+            _write_json_atomic({
+                'updated': datetime.now().isoformat(timespec='seconds'),
+                'source': source_name,
+                'calendar': _calendar_state(calendar),
+                'transactions': len(keys),
+                'records': len(breakdown_df),
+                'segments': in_use,
+                'segment_rows': {name: segment_rows[name] for name in in_use}
+            }, _store_path(username, source_name, 'state.json'))
+            for name in set(previous['segments'] if previous is not None else []) - set(in_use):
+                os.remove(_store_path(username, source_name, name))
+    
+    summary = {
+        'previous': previous,
+        'reused': int(reused.sum()),
+        'expanded': len(changed),
+        'dropped': int((~np.isin(previous_keys, keys)).sum()) if previous is not None else 0,
+        'added_days': int((delta_df['Change'] == 'Added').sum()),
+        'removed_days': int((delta_df['Change'] == 'Removed').sum())
+    }
+    breakdown_df = breakdown_df.drop(columns='Key')
+    return ((breakdown_df, positions) if source_rows else breakdown_df), delta_df, summary
@@ -0,0 +1,172 @@
+"""
+Performance instrumentation: pipeline runs are recorded per thread, their
+stages timed and each run written to PERF_LOG_FILE as one JSON line.
+"""
+
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import PERF_HISTORY_RUNS, PERF_LOG_FILE
+from .lazy import pd
+from .settings import load_settings
+
+logger = logging.getLogger(__name__)
+
+perf_logger = logging.getLogger('leave_converter.perf')
+# The run being recorded in this thread, if any
+_perf_local = threading.local()
+
+def _rss_mb():
+    """Resident memory of this process in MB (Linux only, else None)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _perf_log_handler():
+    """Attach the JSON-lines file handler to perf_logger once per process"""
+    if not perf_logger.handlers:
+        # WatchedFileHandler reopens the file after the admin panel clears it
+        handler = logging.handlers.WatchedFileHandler(PERF_LOG_FILE)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        perf_logger.addHandler(handler)
+        perf_logger.setLevel(logging.INFO)
+        perf_logger.propagate = False
+    return perf_logger
+
+@contextmanager
+def perf_run(kind):
+    """
+    Record one instrumented run. Stages timed inside it (perf_stage) are
+    summed per stage and the run is written to PERF_LOG_FILE as one JSON line
+    when it ends. Nested runs join the outer one. When performance logging is
+    disabled in the settings this only costs one settings lookup.
+    Yields the run record, or None when not recording a new run.
+    """
+    if getattr(_perf_local, 'run', None) is not None or not load_settings()['perf_logging']:
+        yield None
+        return
+    
+    run = {'kind': kind, 'time': datetime.now().isoformat(timespec='milliseconds'),
+           'pid': os.getpid(), 'stages': {}}
+    _perf_local.run = run
+    start = time.perf_counter()
+    run['status'] = 'error'
+    try:
+        yield run
+        run['status'] = 'ok'
+    finally:
+        _perf_local.run = None
+        run['seconds'] = round(time.perf_counter() - start, 6)
+        run['rss_mb'] = _rss_mb()
+        for entry in run['stages'].values():
+            entry['seconds'] = round(entry['seconds'], 6)
+        try:
+            _perf_log_handler().info(json.dumps(run, default=str))
+        except OSError:
+            logger.warning("Could not write performance log %s", PERF_LOG_FILE)
+
+def perf_add(stage, seconds):
+    """Add time to a stage of the current run (no-op outside a run)"""
+    run = getattr(_perf_local, 'run', None)
+    if run is not None:
+        entry = run['stages'].setdefault(stage, {'seconds': 0.0, 'calls': 0})
+        entry['seconds'] += seconds
+        entry['calls'] += 1
+
+@contextmanager
+def perf_stage(stage):
+    """Time the enclosed block as a stage of the current run"""
+    if getattr(_perf_local, 'run', None) is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        perf_add(stage, time.perf_counter() - start)
+
+def timed_stage(stage):
+    """Decorator: time every call of the function as a stage of the current run"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_perf_local, 'run', None) is None:
+                return func(*args, **kwargs)
+            with perf_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def instrumented(kind, stage=None):
+    """
+    Decorator for pipeline entry points: the call is recorded as a perf_run
+    of this kind (or joins the caller's run), timed as stage if given, and
+    the run notes how many rows the result has.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with perf_run(kind) as run:
+                if stage is None:
+                    result = func(*args, **kwargs)
+                else:
+                    with perf_stage(stage):
+                        result = func(*args, **kwargs)
+                if run is not None:
+                    # Imported here: employees is itself instrumented
+                    from .employees import EmployeeRoster
+                    rows = result[0] if isinstance(result, tuple) else result
+                    if isinstance(rows, (pd.DataFrame, EmployeeRoster)):
+                        run['rows'] = len(rows)
+                return result
+        return wrapper
+    return decorate
+
+def load_perf_runs(limit=PERF_HISTORY_RUNS):
+    """The most recent performance log records, oldest first"""
+    if not os.path.exists(PERF_LOG_FILE):
+        return []
+    runs = []
+    with open(PERF_LOG_FILE) as f:
+        for line in deque(f, maxlen=limit):
+            try:
+                runs.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # Partially written line
+    return runs
+
+def perf_stage_summary(runs):
+    """Per (run kind, stage) timing percentiles from load_perf_runs records"""
+    rows = [
+        {'Run': run['kind'], 'Stage': stage, 'Seconds': entry['seconds']}
+        for run in runs for stage, entry in run['stages'].items()
+    ] + [
+        {'Run': run['kind'], 'Stage': '(total)', 'Seconds': run['seconds']}
+        for run in runs if run.get('status') == 'ok'
+    ]
+    if not rows:
+        return pd.DataFrame(columns=['Run', 'Stage', 'Runs', 'p50 (s)', 'p90 (s)', 'p99 (s)', 'Max (s)'])
+    grouped = pd.DataFrame(rows).groupby(['Run', 'Stage'])['Seconds']
+    summary = pd.DataFrame({
+        'Runs': grouped.count(),
+        'p50 (s)': grouped.quantile(0.5),
+        'p90 (s)': grouped.quantile(0.9),
+        'p99 (s)': grouped.quantile(0.99),
+        'Max (s)': grouped.max(),
+    }).round(4)
+    return summary.reset_index()
+
+def clear_perf_log():
+    """Delete the performance log"""
+    if os.path.exists(PERF_LOG_FILE):
+        os.remove(PERF_LOG_FILE)
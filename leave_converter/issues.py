@@ -0,0 +1,182 @@
+"""
+Checks on the transactions behind a breakdown: exact duplicates, leave
+ranges of one employee that overlap, and No Days values that disagree with
+the working days the engine expanded.
+"""
+
+import numpy as np
+
+from .breakdown import NS_PER_DAY, _coerce_dates, _coerce_days, _text_values
+from .employees import EmployeeRoster
+from .instrumentation import instrumented
+from .lazy import pd
+from .reader import SOURCE_ROW_COLUMN
+
+ISSUE_DUPLICATE = 'Duplicate'
+ISSUE_OVERLAP = 'Overlap'
+ISSUE_DAYS_MISMATCH = 'No Days mismatch'
+# Row is the transaction's row in the uploaded sheet; Related Row the row of
+# the transaction it duplicates or overlaps
+ISSUE_COLUMNS = ['Issue', 'Row', 'Emp. Number', 'Employee Name', 'Leave Description',
+                 'Start Date', 'End Date', 'No Days', 'Working Days', 'Related Row', 'Detail']
+# Fields that must all match for two transactions to be duplicates
+DUPLICATE_TEXT_COLUMNS = ['Emp. Number', 'Employee Name', 'Leave Description', 'Leave Type Description']
+# Offset that keeps day numbers positive in the (employee, end day) sort keys
+_DAY_OFFSET = 1 << 30
+
+def _empty_issues():
+    """An issue table with no rows"""
+    return pd.DataFrame(columns=ISSUE_COLUMNS)
+
+def working_days(breakdown_df, positions, transaction_count):
+    """Days with hours per transaction, from a breakdown and its source_rows positions"""
+    paid = breakdown_df['Daily Hours'].to_numpy() > 0
+    return np.bincount(positions[paid], minlength=transaction_count)
+
+def _duplicates(rows, text_codes, start_ns, end_ns, no_days):
+    """
+    (row, first row) pairs of the transactions in rows that repeat an
+    earlier one field for field. One sort puts identical transactions next
+    to each other, ordered by position.
+    """
+    keys = [np.nan_to_num(no_days[rows], nan=-1.0), end_ns[rows], start_ns[rows]]
+    keys += [codes[rows] for codes in reversed(text_codes)]
+    sort = np.lexsort([rows] + keys)
+    order = rows[sort]
+    if len(order) < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    
+    same = np.ones(len(order) - 1, dtype=bool)
+    for key in keys:
+        sorted_key = key[sort]
+        same &= sorted_key[1:] == sorted_key[:-1]
+    repeat = np.concatenate([[False], same])
+    first = order[np.maximum.accumulate(np.where(repeat, 0, np.arange(len(order))))]
+    return order[repeat], first[repeat]
+
+def _overlaps(rows, emp_codes, start_day, end_day, partial):
+    """
+    (row, related row) pairs of the transactions in rows that share a day
+    with an earlier-starting range of the same employee, found in one sweep
+    over the ranges sorted by employee and start: a range overlaps if it
+    starts on or before the latest end seen so far for that employee, and
+    the related row is the range with that end. Two partial days on the same
+    date (e.g. a morning and an afternoon) are not an overlap.
+    """
+    order = rows[np.lexsort([rows, end_day[rows], start_day[rows], emp_codes[rows]])]
+    if len(order) < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    
+    # Employee in the high bits, so the running maximum never crosses employees
+    end_key = (emp_codes[order].astype(np.int64) << 32) + end_day[order] + _DAY_OFFSET
+    latest = np.maximum.accumulate(end_key)
+    # Row holding the running maximum; the earliest one on ties
+    new_latest = np.concatenate([[True], end_key[1:] > latest[:-1]])
+    latest_row = order[np.maximum.accumulate(np.where(new_latest, np.arange(len(order)), 0))]
+    
+    start_key = (emp_codes[order[1:]].astype(np.int64) << 32) + start_day[order[1:]] + _DAY_OFFSET
+    overlapping = start_key <= latest[:-1]
+    row, related = order[1:][overlapping], latest_row[:-1][overlapping]
+    keep = ~(partial[row] & partial[related])
+    return row[keep], related[keep]
+
+@instrumented('find_leave_issues', 'check')
+def find_leave_issues(leave_df, employee_df, breakdown_df, positions):
+    """
+    Flag transactions that would make the breakdown double-count or miscount
+    hours. breakdown_df and positions are process_leave_breakdown's result
+    with source_rows=True. Only transactions of roster employees with valid
+    dates are checked. Transactions are identified by their sheet row
+    (leave_df's SOURCE_ROW_COLUMN, from the reader), or by their 1-based
+    position in leave_df when it has none. Each finding is one row of
+    ISSUE_COLUMNS:
+    
+    - Duplicate: same employee, leave, dates and No Days as an earlier transaction
+    - Overlap: shares a day with another (non-duplicate) range of the employee
+    - No Days mismatch: No Days differs from the days the employee's schedule
+      gives hours on (for a partial day, when that day has no hours)
+    
+    Sorting dominates, so the checks take O(n log n) for n transactions.
+    """
+    count = len(leave_df)
+    if count == 0 or len(employee_df) == 0:
+        return _empty_issues()
+    
+    roster = employee_df if isinstance(employee_df, EmployeeRoster) else EmployeeRoster(employee_df)
+    text = {col: _text_values(leave_df[col]) for col in DUPLICATE_TEXT_COLUMNS}
+    emp_nums = text['Emp. Number']
+    start = _coerce_dates(leave_df['Start Date'])
+    end = _coerce_dates(leave_df['End Date'])
+    no_days = _coerce_days(leave_df['No Days']).to_numpy()
+    start_dates = start.to_numpy().astype('datetime64[D]')
+    end_dates = end.to_numpy().astype('datetime64[D]')
+    start_ns = start.to_numpy().view('i8')
+    end_ns = end.to_numpy().view('i8')
+    start_day = np.floor_divide(start_ns, NS_PER_DAY)
+    end_day = np.floor_divide(end_ns, NS_PER_DAY)
+    valid = ((roster.index.get_indexer(emp_nums) >= 0) & start.notna().to_numpy() & end.notna().to_numpy()
+             & (end_ns >= start_ns))
+    partial = (start_ns == end_ns) & (no_days < 1)
+    days = working_days(breakdown_df, positions, count)
+    rows = np.flatnonzero(valid)
+    
+    text_codes = [pd.factorize(text[col])[0] for col in DUPLICATE_TEXT_COLUMNS]
+    duplicate_rows, duplicate_of = _duplicates(rows, text_codes, start_ns, end_ns, no_days)
+    
+    # Duplicates are reported once, not again as overlaps
+    distinct = np.setdiff1d(rows, duplicate_rows, assume_unique=True)
+    overlap_rows, overlaps_with = _overlaps(distinct, text_codes[0], start_day, end_day, partial)
+    
+    expected = np.where(partial, 1.0, no_days)
+    mismatch_rows = rows[~np.isnan(no_days[rows]) & ~np.isclose(days[rows], expected[rows])]
+    
+    issue = np.concatenate([np.full(len(duplicate_rows), ISSUE_DUPLICATE, dtype=object),
+                            np.full(len(overlap_rows), ISSUE_OVERLAP, dtype=object),
+                            np.full(len(mismatch_rows), ISSUE_DAYS_MISMATCH, dtype=object)])
+    row = np.concatenate([duplicate_rows, overlap_rows, mismatch_rows]).astype(np.intp)
+    related = np.concatenate([duplicate_of, overlaps_with, np.full(len(mismatch_rows), -1)]).astype(np.intp)
+    if len(row) == 0:
+        return _empty_issues()
+    # By transaction, in the order duplicate, overlap, mismatch
+    order = np.lexsort([np.arange(len(row)), row])
+    issue, row, related = issue[order], row[order], related[order]
+    
+    if SOURCE_ROW_COLUMN in leave_df.columns:
+        sheet_rows = leave_df[SOURCE_ROW_COLUMN].to_numpy(dtype=np.int64)
+    else:
+        sheet_rows = np.arange(1, count + 1)
+    related_rows = pd.Series(sheet_rows[related], dtype='Int64').mask(related < 0)
+    
+    # Built with vectorized string operations, one kind of finding at a time
+    # (a kind with no findings is skipped: its empty columns have no text dtype)
+    detail = pd.Series('', index=np.arange(len(row)), dtype=object)
+    related_text = related_rows.astype(str)
+    duplicate, overlap = issue == ISSUE_DUPLICATE, issue == ISSUE_OVERLAP
+    mismatch = ~duplicate & ~overlap
+    if duplicate.any():
+        detail[duplicate] = "Same as row " + related_text[duplicate]
+    if overlap.any():
+        other = related[overlap]
+        detail[overlap] = ("Overlaps row " + related_text[overlap] + " ("
+                           + pd.Series(start_dates[other], index=detail.index[overlap]).dt.strftime('%Y-%m-%d')
+                           + " to "
+                           + pd.Series(end_dates[other], index=detail.index[overlap]).dt.strftime('%Y-%m-%d') + ")")
+    if mismatch.any():
+        detail[mismatch] = ("No Days is "
+                            + pd.Series(no_days[row[mismatch]], index=detail.index[mismatch]).map('{:g}'.format)
+                            + " but the schedule gives hours on "
+                            + pd.Series(days[row[mismatch]], index=detail.index[mismatch]).astype(str) + " days")
+    
+    return pd.DataFrame({
+        'Issue': issue,
+        'Row': sheet_rows[row],
+        'Emp. Number': emp_nums[row],
+        'Employee Name': text['Employee Name'][row],
+        'Leave Description': text['Leave Description'][row],
+        'Start Date': np.datetime_as_string(start_dates[row], unit='D').astype(object),
+        'End Date': np.datetime_as_string(end_dates[row], unit='D').astype(object),
+        'No Days': no_days[row],
+        'Working Days': days[row],
+        'Related Row': related_rows,
+        'Detail': detail.to_numpy()
+    }, columns=ISSUE_COLUMNS)
@@ -0,0 +1,440 @@
+"""
+Background conversion jobs persisted in JOBS_DIR and run by worker
+processes, one task per source, so any session or server process can
+follow them.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+
+from .batch import combine_batch_issues, convert_leave_source, zip_batch_outputs
+from .breakdown import concat_breakdowns
+from .config import (BATCH_MAX_WORKERS, JOB_HEARTBEAT_SECONDS, JOB_LEASE_SECONDS, JOB_RETENTION_HOURS,
+                     JOBS_DIR)
+from .employees import EmployeeRoster, read_roster_files
+from .storage import _file_lock, _write_json_atomic
+from .writers import EXPORT_FORMATS, export_breakdown
+
+logger = logging.getLogger(__name__)
+
+JOB_ACTIVE_STATUSES = ('queued', 'running')
+# Share of a source's progress reached when each stage starts
+JOB_STAGE_PROGRESS = {'read': 0.0, 'check': 0.7, 'export': 0.8}
+JOB_STAGE_LABELS = {'read': "Reading and calculating hours for", 'check': "Checking", 'export': "Exporting"}
+# Share of a job's progress reached when all its sources are converted
+JOB_SOURCES_PROGRESS = 0.95
+
+def _job_path(job_id, name='job.json'):
+    """Path of a file inside a job's directory"""
+    return os.path.join(JOBS_DIR, job_id, name)
+
+def read_job(job_id):
+    """Load a job's state, or None if it does not exist"""
+    try:
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def job_result_path(job):
+    """Path of a finished job's result file, or None if it has none"""
+    return _job_path(job['id'], job['result_file']) if job['result_file'] else None
+
+def _modify_job(job_id, change):
+    """
+    Apply change(job) to a job's persisted state under the job's lock; the
+    job is saved only if change returns True. Returns (job, saved), with
+    job None if it does not exist.
+    """
+    path = _job_path(job_id)
+    with _file_lock(path):
+        job = read_job(job_id)
+        if job is None or not change(job):
+            return job, False
+        _write_json_atomic(job, path)
+    return job, True
+
+def update_job(job_id, **fields):
+    """Update fields of a job's persisted state under the job's lock"""
+    def change(job):
+        job.update(fields)
+        return True
+    return _modify_job(job_id, change)[0]
+
+def create_job(username, sources, employee_df, export_format, combined, calendar_key=None):
+    """
+    Persist a conversion job: the uploaded workbooks, a snapshot of the
+    employee table (and, for an EmployeeRoster, its schedule versions) and
+    the job settings. Returns the job id.
+    sources are (name, data, sheet) tuples, as for run_leave_batch.
+    """
+    job_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    os.makedirs(os.path.join(JOBS_DIR, job_id))
+    
+    # Each workbook is stored once, however many of its sheets are processed
+    inputs, job_sources = {}, []
+    for name, data, sheet in sources:
+        key = (name, hashlib.sha256(data).hexdigest())
+        if key not in inputs:
+            inputs[key] = f"input_{len(inputs)}.xlsx"
+            with open(_job_path(job_id, inputs[key]), 'wb') as f:
+                f.write(data)
+        job_sources.append({'file': name, 'input': inputs[key], 'sheet': sheet})
+    if isinstance(employee_df, EmployeeRoster):
+        employee_df.schedules.to_csv(_job_path(job_id, 'schedules.csv'), index=False)
+        employee_df = employee_df.df
+    employee_df.to_csv(_job_path(job_id, 'employees.csv'), index=False)
+    
+    public_holidays, closures = calendar_key if calendar_key is not None else (False, ())
+    _write_json_atomic({
+        'id': job_id,
+        'username': username,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'started': None,
+        'finished': None,
+        'status': 'queued',
+        'stage': "Waiting for a worker",
+        'progress': 0.0,
+        'sources': job_sources,
+        'source_progress': [0.0] * len(job_sources),
+        'finishing': False,
+        'export_format': export_format,
+        'combined': combined,
+        'calendar': [public_holidays, [[day.isoformat(), name] for day, name in closures]],
+        'results': [],
+        'records': 0,
+        'result_file': None,
+        'message': '',
+        # Leased to this server from the start, so no other server (or this
+        # server's queue starting up) takes it over before it is submitted
+        'owner': _server_id(),
+        'lease_until': time.time() + JOB_LEASE_SECONDS
+    }, _job_path(job_id))
+    return job_id
+
+def _start_job(job):
+    """Mark a queued job as running when its first task starts"""
+    if job['status'] != 'queued':
+        return False
+    job.update(status='running', started=job['started'] or datetime.now().isoformat(timespec='seconds'))
+    return True
+
+def _fail_job(job_id, message):
+    update_job(job_id, status='failed', stage="Failed", message=message,
+               finished=datetime.now().isoformat(timespec='seconds'))
+
+def _source_result_path(job_id, index):
+    """Where a worker leaves one source's convert_leave_source result for the job's last step"""
+    return _job_path(job_id, f"source_{index}.pkl")
+
+def _record_source_progress(job_id, index, progress, stage=None):
+    """Record one source's progress, and the job's overall progress, under the job's lock"""
+    def change(job):
+        source_progress = job.get('source_progress') or [0.0] * len(job['sources'])
+        source_progress[index] = progress
+        job['source_progress'] = source_progress
+        job['progress'] = JOB_SOURCES_PROGRESS * sum(source_progress) / len(source_progress)
+        if stage is not None:
+            job['stage'] = stage
+        return True
+    return _modify_job(job_id, change)[0]
+
+def _claim_job_finish(job_id):
+    """
+    True for the one worker that finds every source of a running job
+    converted; that worker combines the results.
+    """
+    def change(job):
+        if job['status'] != 'running' or job.get('finishing'):
+            return False
+        if not all(os.path.exists(_source_result_path(job_id, i)) for i in range(len(job['sources']))):
+            return False
+        job['finishing'] = True
+        return True
+    return _modify_job(job_id, change)[1]
+
+def run_leave_job_source(job_id, index):
+    """
+    Convert one source of a persisted job; called in a worker process, one
+    task per source, so a job's files and sheets are converted in parallel.
+    The worker that converts the last source also finishes the job.
+    """
+    job, _ = _modify_job(job_id, _start_job)
+    if job is None or job['status'] != 'running':
+        return
+    try:
+        roster = read_roster_files(_job_path(job_id, 'employees.csv'), _job_path(job_id, 'schedules.csv'))
+        public_holidays, closures = job['calendar']
+        calendar_key = (public_holidays, tuple((date.fromisoformat(day), name) for day, name in closures))
+        sources = job['sources']
+        source = sources[index]
+        label = source['file'] if len(sources) == 1 else f"{source['file']} [{source['sheet']}] ({index + 1}/{len(sources)})"
+        def on_stage(stage):
+            _record_source_progress(job_id, index, JOB_STAGE_PROGRESS[stage], f"{JOB_STAGE_LABELS[stage]} {label}")
+        with open(_job_path(job_id, source['input']), 'rb') as f:
+            data = f.read()
+        result = convert_leave_source(
+            source['file'], data, source['sheet'], roster,
+            None if job['combined'] else job['export_format'], calendar_key, on_stage
+        )
+        
+        # Written under a temporary name, so a result file is always complete
+        path = _source_result_path(job_id, index)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        _record_source_progress(job_id, index, 1.0)
+    except Exception as e:
+        logger.exception("Background job %s failed", job_id)
+        _fail_job(job_id, str(e))
+        return
+    if _claim_job_finish(job_id):
+        finish_leave_job(job_id)
+
+def finish_leave_job(job_id):
+    """
+    Combine the converted sources of a job into its result file and mark it
+    done; called in a worker process.
+    """
+    job, _ = _modify_job(job_id, _start_job)
+    if job is None or job['status'] != 'running':
+        return
+    sources = job['sources']
+    try:
+        export_format = job['export_format']
+        _, extension, _ = EXPORT_FORMATS[export_format]
+        results = []
+        for i in range(len(sources)):
+            with open(_source_result_path(job_id, i), 'rb') as f:
+                results.append(pickle.load(f))
+        
+        succeeded = [result for result in results if result['breakdown'] is not None and len(result['breakdown']) > 0]
+        result_file = None
+        if succeeded and job['combined']:
+            update_job(job_id, stage="Exporting combined breakdown", progress=JOB_SOURCES_PROGRESS)
+            result_file = f"result.{extension}"
+            breakdown_df = concat_breakdowns(result['breakdown'] for result in succeeded)
+            with open(_job_path(job_id, result_file), 'wb') as f:
+                f.write(export_breakdown(breakdown_df, export_format, combine_batch_issues(succeeded)))
+        elif succeeded:
+            result_file = "result.zip"
+            with open(_job_path(job_id, result_file), 'wb') as f:
+                f.write(zip_batch_outputs(results, extension))
+        
+        update_job(
+            job_id,
+            status='done',
+            stage="Finished",
+            progress=1.0,
+            finished=datetime.now().isoformat(timespec='seconds'),
+            results=[{key: value for key, value in result.items() if key not in ('breakdown', 'issues', 'export')}
+                     for result in results],
+            records=sum(result['Records'] for result in succeeded),
+            result_file=result_file,
+            message='' if succeeded else "No breakdown records were produced."
+        )
+    except Exception as e:
+        logger.exception("Background job %s failed", job_id)
+        _fail_job(job_id, str(e))
+    finally:
+        for i in range(len(sources)):
+            try:
+                os.remove(_source_result_path(job_id, i))
+            except FileNotFoundError:
+                pass
+
+def list_jobs(username=None):
+    """
+    Persisted jobs, newest first, optionally only one user's.
+    Finished jobs older than JOB_RETENTION_HOURS are deleted on the way.
+    """
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    cutoff = datetime.now() - timedelta(hours=JOB_RETENTION_HOURS)
+    jobs = []
+    for job_id in sorted(os.listdir(JOBS_DIR), reverse=True):
+        job = read_job(job_id)
+        if job is None:
+            continue
+        if job['finished'] and datetime.fromisoformat(job['finished']) < cutoff:
+            delete_job(job_id)
+            continue
+        if username is None or job['username'] == username:
+            jobs.append(job)
+    return jobs
+
+def delete_job(job_id):
+    """Remove a job's directory with its inputs and result"""
+    shutil.rmtree(os.path.join(JOBS_DIR, job_id), ignore_errors=True)
+
+def _process_alive(pid):
+    """True if a process with this pid is running on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _server_id():
+    """Owner recorded on the jobs this server process runs: host and pid"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _job_orphaned(job, now):
+    """
+    True if no running server holds an active job: its lease has run out,
+    or its owner is a process on this host that has exited (so a restarted
+    server need not wait for the lease). Pids of other hosts or containers
+    say nothing, and on Windows os.kill terminates instead of probing, so
+    there only the lease counts.
+    """
+    if job['status'] not in JOB_ACTIVE_STATUSES:
+        return False
+    if (job.get('lease_until') or 0) < now:
+        return True
+    host, _, pid = (job.get('owner') or '').rpartition(':')
+    if os.name == 'nt' or host != socket.gethostname() or not pid.isdigit():
+        return False
+    return not _process_alive(int(pid))
+
+def _claim_job(job_id):
+    """
+    Take over an orphaned job under the job's lock, queueing it again with
+    this server as owner. Returns False if the job is not orphaned, e.g.
+    because another server claimed it first.
+    """
+    def change(job):
+        now = time.time()
+        if not _job_orphaned(job, now):
+            return False
+        job.update(status='queued', stage="Waiting for a worker", progress=0.0, finishing=False,
+                   owner=_server_id(), lease_until=now + JOB_LEASE_SECONDS)
+        return True
+    return _modify_job(job_id, change)[1]
+
+class LeaveJobQueue:
+    """
+    Background conversion queue shared by all sessions: persisted jobs run
+    in a pool of worker processes, so request threads only submit and poll.
+    Each server process (the Streamlit app and api.py share jobs/) holds a
+    lease on the jobs it runs and renews it while they are pending. On
+    start-up, jobs whose server has gone (see _job_orphaned) are claimed
+    under their lock and queued again, so a job is run by one server only.
+    """
+    
+    def __init__(self, max_workers=BATCH_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pool = None
+        self._futures = {}
+        self._heartbeat = None
+        for job in reversed(list_jobs()):
+            if job['status'] in JOB_ACTIVE_STATUSES and _claim_job(job['id']):
+                self.submit(job['id'])
+    
+    def _get_pool(self):
+        if self._pool is None:
+            # Spawned workers avoid forking a multi-threaded server
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+    
+    def _submit_task(self, fn, *args):
+        """Submit one task to the pool; called with the queue's lock held"""
+        try:
+            return self._get_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool
+            self._pool = None
+            return self._get_pool().submit(fn, *args)
+    
+    def submit(self, job_id):
+        """
+        Queue a persisted job for worker processes, one task per source not
+        yet converted (or just the last step if all are); a job already
+        queued here is left as it is.
+        """
+        with self._lock:
+            if job_id in self._futures:
+                return
+            job = update_job(job_id, owner=_server_id(), lease_until=time.time() + JOB_LEASE_SECONDS)
+            if job is None:
+                return
+            pending = [i for i in range(len(job['sources'])) if not os.path.exists(_source_result_path(job_id, i))]
+            if pending:
+                futures = [self._submit_task(run_leave_job_source, job_id, i) for i in pending]
+            else:
+                futures = [self._submit_task(finish_leave_job, job_id)]
+            self._futures[job_id] = futures
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew_leases, name='job-leases', daemon=True)
+                self._heartbeat.start()
+        for future in futures:
+            future.add_done_callback(lambda f: self._on_done(job_id, f))
+    
+    def _renew_leases(self):
+        """Keep the leases of this server's pending and running jobs from running out"""
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            with self._lock:
+                job_ids = list(self._futures)
+            for job_id in job_ids:
+                try:
+                    update_job(job_id, lease_until=time.time() + JOB_LEASE_SECONDS)
+                except OSError:
+                    logger.warning("Could not renew the lease of job %s", job_id, exc_info=True)
+    
+    def _on_done(self, job_id, future):
+        with self._lock:
+            futures = self._futures.get(job_id, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._futures.pop(job_id, None)
+        # The tasks record their own errors; this catches a worker that died
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            _fail_job(job_id, f"Worker stopped: {error}")
+    
+    def cancel(self, job_id):
+        """
+        Cancel a job whose tasks have not all started; returns True if it
+        was cancelled. Sources already being converted are left to finish,
+        but the job is not completed.
+        """
+        with self._lock:
+            futures = list(self._futures.get(job_id, []))
+        cancelled = [future.cancel() for future in futures]
+        if any(cancelled):
+            update_job(job_id, status='failed', stage="Cancelled", message="Cancelled before it started",
+                       finished=datetime.now().isoformat(timespec='seconds'))
+            return True
+        return False
+
+@functools.lru_cache(maxsize=None)
+def get_job_queue():
+    """The background job queue of this server process"""
+    return LeaveJobQueue()
+
+def submit_leave_job(username, sources, employee_df, export_format, combined, calendar_key=None):
+    """Persist a conversion job and queue it; returns the job id"""
+    # The queue is started first: on start-up it takes over orphaned jobs,
+    # which must not include this one
+    queue = get_job_queue()
+    job_id = create_job(username, sources, employee_df, export_format, combined, calendar_key)
+    queue.submit(job_id)
+    return job_id
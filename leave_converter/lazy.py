@@ -0,0 +1,20 @@
+"""Deferred imports of heavy modules"""
+
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module that is imported on first attribute access,
+    so importing the package (or a login page render) does not wait for it.
+    Unlike a module in sys.modules, Streamlit's file watcher does not touch it.
+    """
+    
+    def __init__(self, name):
+        self._name = name
+    
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+# pandas is only needed once there is data to process
+pd = LazyModule('pandas')
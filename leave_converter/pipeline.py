@@ -0,0 +1,111 @@
+"""
+Typed entry points for the conversion pipeline, one per stage:
+
+    read -> normalize -> filter_approved -> expand -> export
+
+Each stage takes the previous stage's output, so any of them can be run,
+timed or tested on its own. check() flags duplicate, overlapping and
+miscounted transactions from expand's output with source rows. convert()
+does read to check in a single streaming pass over the workbook, expanding
+each chunk as it is read (process_leave_chunks); it is what convert.py and
+api.py use.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, BinaryIO, Optional, Tuple, Union
+
+from .breakdown import process_leave_breakdown, process_leave_chunks
+from .employees import EmployeeRoster
+from .holidays import HolidayCalendar
+from .issues import find_leave_issues
+from .reader import (clean_leave_dataframe, detect_header_row, filter_leave_transactions, iter_leave_chunks,
+                     normalize_leave_dataframe, read_leave_file)
+from .sharding import process_leave_breakdown_sharded
+from .writers import export_breakdown
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    from .lazy import pd
+
+# A workbook path or an open binary file (e.g. an upload)
+LeaveFile = Union[str, os.PathLike, BinaryIO]
+# Sheet index or name
+Sheet = Union[int, str]
+# A prebuilt roster, or an employee table in the employee_data.csv layout
+Roster = Union[EmployeeRoster, 'pd.DataFrame']
+
+
+@dataclass
+class ConversionResult:
+    """The breakdown of one sheet, the transaction counts behind it and their check() findings"""
+    breakdown: pd.DataFrame
+    transactions: int
+    filtered: int
+    has_status: bool
+    issues: Optional[pd.DataFrame] = None
+    
+    def export(self, export_format: str = 'xlsx') -> bytes:
+        """The breakdown serialized in one of EXPORT_FORMATS (xlsx with the findings as a second sheet)"""
+        return export(self.breakdown, export_format, self.issues)
+
+
+def read(file: LeaveFile, sheet: Sheet = 0, header_row: Optional[int] = None) -> pd.DataFrame:
+    """Read a sheet with its own column headers; the header row is detected when not given"""
+    if header_row is None:
+        header_row = detect_header_row(file, sheet)
+    return pd.read_excel(file, sheet_name=sheet, header=header_row)
+
+def normalize(raw_df: pd.DataFrame) -> pd.DataFrame:
+    """Rename the columns to the standard leave names; ValueError if required ones are missing"""
+    return normalize_leave_dataframe(raw_df)
+
+def filter_approved(leave_df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Keep the approved transactions and clean them (text stripped, dates and
+    No Days parsed). Returns them with the number of non-approved rows removed.
+    """
+    leave_df, filtered_count = filter_leave_transactions(leave_df)
+    return clean_leave_dataframe(leave_df), filtered_count
+
+def expand(leave_df: pd.DataFrame, roster: Roster, calendar: Optional[HolidayCalendar] = None,
+           workers: int = 1, source_rows: bool = False) -> Union[pd.DataFrame, Tuple[pd.DataFrame, np.ndarray]]:
+    """
+    One row per working day of each transaction, with the employee's hours.
+    workers > 1 expands large frames in that many processes, split by
+    employee (process_leave_breakdown_sharded); the result is the same.
+    With source_rows=True, also returns each row's transaction position.
+    """
+    if workers > 1:
+        return process_leave_breakdown_sharded(leave_df, roster, calendar, workers, source_rows)
+    return process_leave_breakdown(leave_df, roster, calendar, source_rows)
+
+def check(leave_df: pd.DataFrame, roster: Roster, breakdown_df: pd.DataFrame,
+          positions: np.ndarray) -> pd.DataFrame:
+    """Duplicate, overlapping and miscounted transactions (see find_leave_issues)"""
+    return find_leave_issues(leave_df, roster, breakdown_df, positions)
+
+def export(breakdown_df: pd.DataFrame, export_format: str = 'xlsx',
+           issues: Optional[pd.DataFrame] = None) -> bytes:
+    """Serialize a breakdown in one of EXPORT_FORMATS, with check() findings as an extra xlsx sheet"""
+    return export_breakdown(breakdown_df, export_format, issues)
+
+def convert(file: LeaveFile, roster: Roster, calendar: Optional[HolidayCalendar] = None,
+            sheet: Sheet = 0, workers: int = 1) -> ConversionResult:
+    """
+    Read, normalize, filter, expand and check one sheet of a leave
+    transactions workbook. With one worker each chunk is expanded as it is
+    read; with more, the whole sheet is read first and expanded in shards.
+    """
+    if workers > 1:
+        leave_df, filtered_count = read_leave_file(file, sheet=sheet)
+        breakdown_df, positions = expand(leave_df, roster, calendar, workers, source_rows=True)
+    else:
+        leave_df, filtered_count, breakdown_df, positions = process_leave_chunks(
+            iter_leave_chunks(file, sheet=sheet), roster, calendar)
+    return ConversionResult(breakdown_df, len(leave_df), filtered_count, 'Status' in leave_df.columns,
+                            check(leave_df, roster, breakdown_df, positions))
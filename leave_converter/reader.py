@@ -0,0 +1,280 @@
+"""
+Reading PaySpace leave transaction exports: header detection, column
+matching, normalizing, filtering and cleaning, and the streaming reader
+that runs them chunk by chunk.
+"""
+
+import functools
+import itertools
+import logging
+import time
+
+from .config import (HEADER_KEYWORDS, HEADER_SCAN_ROWS, LEAVE_COLUMN_MAPPINGS, OPTIONAL_LEAVE_COLUMNS,
+                     STREAM_CHUNK_ROWS)
+from .instrumentation import instrumented, perf_add, perf_stage, timed_stage
+from .lazy import pd
+
+logger = logging.getLogger(__name__)
+
+# Column iter_leave_chunks adds with each transaction's row number in the
+# sheet, as Excel shows it (the first row is 1)
+SOURCE_ROW_COLUMN = 'Sheet Row'
+
+def _normalize_header(name):
+    """Normalize a header for matching: strip whitespace, lowercase, collapse spaces"""
+    return ' '.join(str(name).strip().lower().split())
+
+def find_column(df, possible_names):
+    """
+    Find a column in the dataframe that matches one of the possible names.
+    Handles variations in spacing, capitalization, and punctuation.
+    """
+    # Create a mapping of normalized names to actual column names
+    col_map = {_normalize_header(col): col for col in df.columns}
+    
+    # Try each possible name
+    for name in possible_names:
+        normalized_name = _normalize_header(name)
+        if normalized_name in col_map:
+            return col_map[normalized_name]
+    
+    return None
+
+def _score_header_row(values):
+    """Count how many of the expected header keywords appear in a row"""
+    cols_lower = [str(value).lower() for value in values if value is not None]
+    return sum(1 for req in HEADER_KEYWORDS if any(req in col for col in cols_lower))
+
+def _best_header_row(rows):
+    """Index of the best scoring header candidate among rows, or 0 if none qualifies"""
+    best_row, best_score = 0, 0
+    for row_idx, values in enumerate(rows):
+        score = _score_header_row(values)
+        if score > best_score:
+            best_row, best_score = row_idx, score
+    
+    # Need at least 4 required columns; default to row 0 if detection fails
+    return best_row if best_score >= 4 else 0
+
+@timed_stage('detect_header')
+def detect_header_row(file, sheet=0):
+    """
+    Intelligently detect which row contains the column headers.
+    Reads the first HEADER_SCAN_ROWS rows of the sheet (index or name, the
+    first by default) in a single read-only pass and picks the best scoring
+    row (earliest on ties).
+    Common locations are row 0 (first row) and row 7 (8th row).
+    """
+    from openpyxl import load_workbook
+    
+    preview = []
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[sheet] if isinstance(sheet, str) else workbook.worksheets[sheet]
+            preview = list(worksheet.iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True))
+        finally:
+            workbook.close()
+    except Exception:
+        pass
+    finally:
+        if hasattr(file, 'seek'):
+            file.seek(0)  # Reset file pointer for the full read
+    
+    return _best_header_row(preview)
+
+def _missing_columns_error(missing_columns, available_columns):
+    """Build the error raised when required leave columns cannot be found"""
+    available_cols = ', '.join(available_columns)
+    return ValueError(
+        f"Missing required columns: {', '.join(missing_columns)}\n\n"
+        f"Available columns in your file: {available_cols}\n\n"
+        f"Please ensure your Excel file has these column headers."
+    )
+
+# Normalized names to try for each standard column, in priority order (built once)
+LEAVE_COLUMN_LOOKUP = {
+    standard_name: [_normalize_header(name) for name in [standard_name] + variations]
+    for standard_name, variations in LEAVE_COLUMN_MAPPINGS.items()
+}
+
+@functools.lru_cache(maxsize=64)
+def _resolve_leave_layout(header):
+    """
+    Resolve one header layout (a tuple of column names) against the lookup
+    tables. Cached for the life of the process, so a known layout costs one
+    dictionary lookup; each new layout is logged once.
+    """
+    # Later duplicates win, matching find_column
+    col_map = {_normalize_header(col): col for col in header}
+    
+    found = {}
+    missing_columns = []
+    for standard_name, names in LEAVE_COLUMN_LOOKUP.items():
+        found_col = next((col_map[name] for name in names if name in col_map), None)
+        if found_col:
+            found[standard_name] = found_col
+        elif standard_name not in OPTIONAL_LEAVE_COLUMNS:
+            # Only add to missing if it's not an optional column
+            missing_columns.append(standard_name)
+    
+    renamed = {standard_name: col for standard_name, col in found.items() if col != standard_name}
+    logger.info(
+        "New leave column layout (%d columns): renamed %s, missing %s",
+        len(header), renamed or 'none', missing_columns or 'none'
+    )
+    return found, missing_columns
+
+def resolve_leave_columns(columns):
+    """
+    Match column headers to the standard leave column names.
+    Returns a dict of standard name -> matching header, and the list of
+    required columns that could not be found.
+    """
+    found, missing_columns = _resolve_leave_layout(tuple(columns))
+    # Copies, so callers cannot modify the cached layout
+    return dict(found), list(missing_columns)
+
+@timed_stage('normalize')
+def normalize_leave_dataframe(df):
+    """
+    Normalize column names in the leave transactions dataframe.
+    Maps various column name formats to standard names.
+    """
+    found, missing_columns = resolve_leave_columns(df.columns)
+    
+    # Create new column name mapping
+    rename_dict = {col: standard_name for standard_name, col in found.items() if col != standard_name}
+    
+    # Rename columns
+    if rename_dict:
+        df = df.rename(columns=rename_dict)
+    
+    # Check for missing required columns
+    if missing_columns:
+        raise _missing_columns_error(missing_columns, df.columns.tolist())
+    
+    return df
+
+@timed_stage('filter')
+def filter_leave_transactions(leave_df):
+    """
+    Drop group header rows, negative day counts and, when the file has a
+    Status column, every transaction that is not Approved.
+    Returns the filtered dataframe and the number of non-approved rows removed.
+    """
+    leave_df = leave_df[leave_df['Emp. Number'] != 'Group : All Groups'].reset_index(drop=True)
+    leave_df = leave_df[leave_df['No Days'] >= 0].reset_index(drop=True)
+    
+    filtered_count = 0
+    if 'Status' in leave_df.columns:
+        original_count = len(leave_df)
+        # Keep only Approved status, remove Declined/Cancelled
+        leave_df = leave_df[leave_df['Status'].astype(str).str.strip().str.lower() == 'approved'].reset_index(drop=True)
+        filtered_count = original_count - len(leave_df)
+    
+    return leave_df, filtered_count
+
+@timed_stage('clean')
+def clean_leave_dataframe(leave_df):
+    """Strip text columns, parse dates and No Days, and drop rows with invalid dates"""
+    leave_df = leave_df.copy()
+    leave_df['Emp. Number'] = leave_df['Emp. Number'].astype(str).str.strip()
+    leave_df['Employee Name'] = leave_df['Employee Name'].astype(str).str.strip()
+    leave_df['Initials'] = leave_df['Initials'].astype(str).str.strip()
+    leave_df['Leave Description'] = leave_df['Leave Description'].astype(str).str.strip()
+    leave_df['Leave Type Description'] = leave_df['Leave Type Description'].astype(str).str.strip()
+    
+    # Ensure dates are datetime objects
+    leave_df['Start Date'] = pd.to_datetime(leave_df['Start Date'], errors='coerce')
+    leave_df['End Date'] = pd.to_datetime(leave_df['End Date'], errors='coerce')
+    
+    # Remove rows with invalid dates
+    leave_df = leave_df.dropna(subset=['Start Date', 'End Date']).reset_index(drop=True)
+    
+    # Ensure No Days is numeric
+    leave_df['No Days'] = pd.to_numeric(leave_df['No Days'], errors='coerce').fillna(0)
+    
+    return leave_df
+
+def iter_leave_chunks(file, header_row=None, chunk_size=STREAM_CHUNK_ROWS, sheet=0):
+    """
+    Stream leave transactions from one sheet (index or name) of an xlsx file.
+    The workbook is opened once in openpyxl read-only mode; when header_row is
+    None the header is detected from the first rows of that same pass. Only the
+    mapped columns are kept, and each chunk is filtered and cleaned as it is
+    read, so the raw cell values held at once are bounded by chunk_size
+    rather than the sheet size. Yields (leave_df, filtered_count) pairs with
+    standard column names plus SOURCE_ROW_COLUMN, which survives filtering;
+    breakdown.process_leave_chunks expands them as they arrive.
+    """
+    from openpyxl import load_workbook
+    
+    stage_start = time.perf_counter()
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if isinstance(sheet, str) else workbook.worksheets[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        preview = list(itertools.islice(rows, HEADER_SCAN_ROWS))
+        if header_row is None:
+            header_row = _best_header_row(preview)
+        first_data_row = header_row + 2
+        if header_row >= len(preview):
+            # Header sits past the preview window; skip ahead to it
+            preview = list(itertools.islice(rows, header_row - len(preview), header_row - len(preview) + 1))
+            header_row = 0
+        header = list(preview[header_row]) if preview else []
+        perf_add('detect_header', time.perf_counter() - stage_start)
+        
+        with perf_stage('normalize'):
+            found, missing_columns = resolve_leave_columns([col for col in header if col is not None])
+        if missing_columns:
+            raise _missing_columns_error(missing_columns, [str(col) for col in header if col is not None])
+        
+        names = list(found) + [SOURCE_ROW_COLUMN]
+        positions = [header.index(found[name]) for name in found]
+        width = max(positions) + 1
+        
+        def flush(records):
+            # Time spent pulling rows since the last chunk counts as reading
+            chunk = pd.DataFrame.from_records(records, columns=names)
+            perf_add('read', time.perf_counter() - stage_start)
+            chunk, filtered_count = filter_leave_transactions(chunk)
+            return clean_leave_dataframe(chunk), filtered_count
+        
+        records = []
+        chunk_count = 0
+        stage_start = time.perf_counter()
+        for row_number, values in enumerate(itertools.chain(preview[header_row + 1:], rows), first_data_row):
+            if len(values) < width:
+                values = tuple(values) + (None,) * (width - len(values))
+            records.append([values[pos] for pos in positions] + [row_number])
+            if len(records) >= chunk_size:
+                yield flush(records)
+                chunk_count += 1
+                records = []
+                stage_start = time.perf_counter()
+        
+        # Always yield at least one (possibly empty) chunk so callers see the columns
+        if records or chunk_count == 0:
+            yield flush(records)
+    finally:
+        workbook.close()
+
+@instrumented('read_leave_file')
+def read_leave_file(file, header_row=None, chunk_size=STREAM_CHUNK_ROWS, sheet=0):
+    """
+    Read, filter and clean a leave transactions file with iter_leave_chunks.
+    Returns the combined leave dataframe (which grows with the sheet) and
+    the number of non-approved rows removed.
+    """
+    chunks = []
+    filtered_count = 0
+    for chunk, chunk_filtered in iter_leave_chunks(file, header_row, chunk_size, sheet):
+        chunks.append(chunk)
+        filtered_count += chunk_filtered
+    
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    
+    return pd.concat(chunks, ignore_index=True), filtered_count
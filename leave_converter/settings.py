@@ -0,0 +1,33 @@
+"""Admin settings persisted in SETTINGS_FILE"""
+
+import functools
+import json
+import os
+
+from .config import DEFAULT_SETTINGS, SETTINGS_FILE
+from .storage import _file_lock, _write_json_atomic
+
+@functools.lru_cache(maxsize=4)
+def _load_settings(path, mtime_ns, size):
+    """
+    Read the settings file; cached per file version.
+    perf_run checks the settings on every instrumented call, so this must
+    stay cheap when performance logging is disabled.
+    """
+    with open(path) as f:
+        return {**DEFAULT_SETTINGS, **json.load(f)}
+
+def load_settings():
+    """Current admin settings, falling back to DEFAULT_SETTINGS"""
+    if os.path.exists(SETTINGS_FILE):
+        stat = os.stat(SETTINGS_FILE)
+        return dict(_load_settings(SETTINGS_FILE, stat.st_mtime_ns, stat.st_size))
+    return dict(DEFAULT_SETTINGS)
+
+def save_settings(**fields):
+    """Update settings under the file lock (atomic replace)"""
+    with _file_lock(SETTINGS_FILE):
+        settings = load_settings()
+        settings.update(fields)
+        _write_json_atomic(settings, SETTINGS_FILE)
+    _load_settings.cache_clear()
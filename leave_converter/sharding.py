@@ -0,0 +1,132 @@
+"""
+Sharded expansion: one large leave frame is split by employee and expanded
+in worker processes that read the roster from shared memory.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .breakdown import _expand_transactions, _text_values, concat_breakdowns, process_leave_breakdown
+from .config import EXPAND_MAX_WORKERS, EXPAND_PARALLEL_MIN_TRANSACTIONS
+from .employees import EmployeeRoster
+from .holidays import HolidayCalendar
+from .instrumentation import instrumented, perf_stage
+from .lazy import pd
+
+# Leave columns the expansion reads besides the employee number; shards
+# carry only these
+SHARD_COLUMNS = ['Employee Name', 'Initials', 'Leave Description', 'Leave Type Description',
+                 'Start Date', 'End Date', 'No Days']
+
+def _share_array(array):
+    """Copy an array into a new shared memory block; returns the block and its (name, shape, dtype)"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+def _attach_array(spec):
+    """The shared memory block of a _share_array spec and a read-only array view of it"""
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    array.flags.writeable = False
+    return block, array
+
+def _expand_shard(leave_df, emp_nums, emp_pos, hours_spec, keys_spec, employee_count, calendar_key):
+    """Expand one shard against the shared roster; returns (breakdown, positions within the shard)"""
+    hours_block, hours = _attach_array(hours_spec)
+    keys_block, schedule_keys = _attach_array(keys_spec)
+    try:
+        roster = EmployeeRoster.from_arrays(hours, schedule_keys, employee_count)
+        calendar = None
+        if calendar_key is not None:
+            public_holidays, closures = calendar_key
+            calendar = HolidayCalendar(public_holidays, dict(closures))
+        return _expand_transactions(leave_df, emp_nums, emp_pos, roster, calendar, source_rows=True)
+    finally:
+        # Views of a block must be gone before it is closed; the breakdown
+        # holds copies of the hours
+        roster = hours = schedule_keys = None
+        hours_block.close()
+        keys_block.close()
+
+def partition_by_employee(emp_nums, shard_count):
+    """
+    Split transactions into at most shard_count shards, keeping each
+    employee's transactions together and the shard sizes even (employees
+    with the most transactions first, each to the smallest shard).
+    Returns the transaction positions of every non-empty shard, in order.
+    """
+    codes, uniques = pd.factorize(emp_nums)
+    counts = np.bincount(codes, minlength=len(uniques))
+    load = np.zeros(shard_count, dtype=np.int64)
+    employee_shard = np.empty(len(uniques), dtype=np.int32)
+    for employee in np.argsort(-counts, kind='stable'):
+        shard = int(np.argmin(load))
+        employee_shard[employee] = shard
+        load[shard] += counts[employee]
+    
+    row_shard = employee_shard[codes]
+    order = np.argsort(row_shard, kind='stable')
+    bounds = np.searchsorted(row_shard[order], np.arange(shard_count + 1))
+    return [order[first:last] for first, last in zip(bounds[:-1], bounds[1:]) if last > first]
+
+@instrumented('process_leave_breakdown_sharded')
+def process_leave_breakdown_sharded(leave_df, employee_df, calendar=None, workers=1, source_rows=False):
+    """
+    process_leave_breakdown on several cores. Transactions are partitioned
+    by employee and each shard is expanded in its own worker process,
+    spawned for the call and shut down before it returns. The roster's
+    hours and schedule arrays are placed in shared memory once for all
+    workers; the shards and their breakdowns are pickled. The shards' rows
+    are put back in transaction order, so the result has the same rows in
+    the same order as process_leave_breakdown.
+    
+    workers is capped at EXPAND_MAX_WORKERS (the CPU count). With one
+    worker, or fewer than EXPAND_PARALLEL_MIN_TRANSACTIONS transactions,
+    where starting workers costs more than it saves, it runs in-process.
+    """
+    workers = min(workers, EXPAND_MAX_WORKERS)
+    if workers <= 1 or len(leave_df) < EXPAND_PARALLEL_MIN_TRANSACTIONS or len(employee_df) == 0:
+        return process_leave_breakdown(leave_df, employee_df, calendar, source_rows)
+    
+    with perf_stage('partition'):
+        roster = employee_df if isinstance(employee_df, EmployeeRoster) else EmployeeRoster(employee_df)
+        emp_nums = _text_values(leave_df['Emp. Number'])
+        emp_pos = roster.index.get_indexer(emp_nums)
+        shards = partition_by_employee(emp_nums, workers)
+        shard_df = leave_df[SHARD_COLUMNS]
+    if len(shards) <= 1:
+        return process_leave_breakdown(leave_df, roster, calendar, source_rows)
+    
+    with perf_stage('expand'):
+        blocks = []
+        try:
+            hours_block, hours_spec = _share_array(roster.hours)
+            blocks.append(hours_block)
+            keys_block, keys_spec = _share_array(roster.schedule_keys)
+            blocks.append(keys_block)
+            calendar_key = None if calendar is None else calendar.key
+            # Spawned, not forked, so a multi-threaded server is never forked
+            with ProcessPoolExecutor(max_workers=len(shards),
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [pool.submit(_expand_shard, shard_df.iloc[rows], emp_nums[rows], emp_pos[rows],
+                                       hours_spec, keys_spec, roster.employee_count, calendar_key)
+                           for rows in shards]
+                results = [future.result() for future in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+    
+    with perf_stage('merge'):
+        breakdown_df = concat_breakdowns(breakdown for breakdown, _ in results)
+        positions = np.concatenate([rows[shard_positions] for rows, (_, shard_positions) in zip(shards, results)])
+        # Stable, so each transaction's days keep their order
+        order = np.argsort(positions, kind='stable')
+        breakdown_df = breakdown_df.take(order).reset_index(drop=True)
+        positions = positions[order].astype(np.int32)
+    return (breakdown_df, positions) if source_rows else breakdown_df
@@ -0,0 +1,321 @@
+"""
+CSV/JSON record storage shared by every process: writes happen under a
+sidecar file lock and replace files atomically.
+
+Keyed record files (employees, users) are also changed record by record:
+upserts and deletes are appended to a change log next to the CSV
+(employee_data.csv.changes), which readers apply, so a write costs the size
+of the change rather than the table. Once the log holds about as many
+records as the table it is folded back into the CSV (compaction), keeping
+the amortized cost per changed record constant.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+from .config import STORAGE_COMPACT_MIN_CHANGES
+from .lazy import pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on a sidecar .lock file so concurrent sessions write one at a time"""
+    with open(path + '.lock', 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _write_csv_atomic(df, path):
+    """Write a CSV to a temporary file and atomically replace path with it"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _write_json_atomic(data, path):
+    """Write JSON to a temporary file and atomically replace the target"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _file_state(path):
+    """(inode, mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+def _changes_path(path):
+    """Change log of the records not yet folded into path"""
+    return path + '.changes'
+
+def _records_state(path):
+    """Version of a record file and its change log, for caches; None if neither exists"""
+    base, changes = _file_state(path), _file_state(_changes_path(path))
+    if base is None and changes is None:
+        return None
+    return tuple(base or ()), tuple(changes or ())
+
+def _read_changes(path):
+    """
+    Change log entries of path, oldest first. The log's first line records
+    the version of path it was started on; a log left from an earlier
+    version (e.g. when a compaction was cut short) is ignored, as is a line
+    cut short by a crash.
+    """
+    try:
+        with open(_changes_path(path), encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    changes = []
+    for line in lines:
+        try:
+            changes.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    header = changes[0] if changes else None
+    if not isinstance(header, dict) or header.get('base', False) != _file_state(path):
+        return []
+    return changes[1:]
+
+def _fold_changes(changes, key):
+    """
+    Net effect of change log entries per key, in order of first change:
+    None for a deleted key, else (replaced, fields) where replaced means
+    the key was deleted first, so its stored record is dropped and fields
+    make up a new one.
+    """
+    final = {}
+    for change in changes:
+        for value in change.get('delete', ()):
+            final[value] = None
+        for record in change.get('upsert', ()):
+            value = record[key]
+            if value not in final:
+                final[value] = (False, dict(record))
+            elif final[value] is None:
+                final[value] = (True, dict(record))
+            else:
+                final[value][1].update(record)
+    return final
+
+def _apply_changes(df, changes, key):
+    """df's records with change log entries applied; fields of unknown columns are ignored"""
+    final = _fold_changes(changes, key)
+    if not final:
+        return df
+    
+    keys = _key_values(df[key])
+    present = set(keys)
+    dropped = [value for value, state in final.items() if state is None or state[0]]
+    result = df.assign(**{key: keys})[~keys.isin(dropped)].reset_index(drop=True)
+    
+    updates = {value: state[1] for value, state in final.items()
+               if state is not None and not state[0] and value in present}
+    rows = result[key]
+    for col in result.columns:
+        values = {value: fields[col] for value, fields in updates.items() if col in fields and col != key}
+        if values:
+            # Whole-column replace, so e.g. 7.5 hours can update an integer column
+            result[col] = result[col].mask(rows.isin(values.keys()), rows.map(values))
+    
+    new_records = [state[1] for value, state in final.items()
+                   if state is not None and (state[0] or value not in present)]
+    if new_records:
+        result = pd.concat([result, pd.DataFrame(new_records).reindex(columns=result.columns)], ignore_index=True)
+    return result
+
+def _apply_changes_to_rows(rows, changes, key):
+    """
+    Change log entries applied to rows read with the csv module (dicts of
+    text); values are written as they would read back from the CSV
+    """
+    final = _fold_changes(changes, key)
+    if not final:
+        return rows
+    
+    def as_text(record):
+        return {name: '' if value is None else str(value) for name, value in record.items()}
+    present = {row[key] for row in rows}
+    result = []
+    for row in rows:
+        state = final.get(row[key], False)
+        if state is False:
+            result.append(row)
+        elif state is not None and not state[0]:
+            result.append({**row, **{name: value for name, value in as_text(state[1]).items() if name in row}})
+    columns = list(rows[0]) if rows else None
+    for value, state in final.items():
+        if state is not None and (state[0] or value not in present):
+            record = as_text(state[1])
+            result.append({name: record.get(name, '') for name in columns} if columns else record)
+    return result
+
+def _read_csv_or_empty(path, columns, key=None):
+    """
+    Read a CSV, or return an empty frame with the given columns if it does
+    not exist. The key column, if given, is read as text (so employee
+    number 1001 stays '1001' and matches keys typed or imported as text),
+    and the file's change log is applied.
+    """
+    if os.path.exists(path):
+        df = pd.read_csv(path, dtype={key: str} if key is not None else None)
+    else:
+        df = pd.DataFrame(columns=columns)
+    if key is None:
+        return df
+    return _apply_changes(df, _read_changes(path), key)
+
+def _key_values(series):
+    """Record keys in their stored form: text, stripped"""
+    return series.astype(str).str.strip()
+
+# Per record file (absolute path): (version, stored keys, records in the
+# change log), so this process's writes need not re-read the table
+_record_keys_cache = {}
+
+def _record_keys(path, columns, key):
+    """
+    (keys, logged): the set of keys stored in a record file and the number
+    of records in its change log. Called under the file's lock; re-read only
+    when another process has written since this one last did.
+    """
+    cached = _record_keys_cache.get(os.path.abspath(path))
+    if cached is None or cached[0] != _records_state(path):
+        keys = set(_key_values(_read_csv_or_empty(path, columns, key)[key]))
+        logged = sum(len(change.get('upsert', ())) + len(change.get('delete', ()))
+                     for change in _read_changes(path))
+        cached = (_records_state(path), keys, logged)
+        _record_keys_cache[os.path.abspath(path)] = cached
+    return cached[1], cached[2]
+
+def _log_is_current(path):
+    """True if path's change log exists and was started on path's current version"""
+    try:
+        with open(_changes_path(path), encoding='utf-8') as f:
+            header = json.loads(f.readline())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return isinstance(header, dict) and header.get('base', False) == _file_state(path)
+
+def _append_change(path, change):
+    """
+    Append one entry to path's change log (under the lock), first starting
+    a new log, stamped with path's version, if there is none for it
+    """
+    line = json.dumps(change, default=str).encode('utf-8') + b'\n'
+    if not _log_is_current(path):
+        with open(_changes_path(path), 'wb') as f:
+            f.write(json.dumps({'base': _file_state(path)}).encode('utf-8') + b'\n' + line)
+        return
+    with open(_changes_path(path), 'r+b') as f:
+        # A crash may have cut the last entry short; never extend it
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            line = b'\n' + line
+        f.seek(0, os.SEEK_END)
+        f.write(line)
+
+def _record_written(path, keys, logged, columns, key):
+    """
+    Remember a write's keys and log length for the next write, and compact
+    once the log holds as many records as the table (so compaction's cost,
+    spread over the writes since the last one, stays constant per record)
+    """
+    _record_keys_cache[os.path.abspath(path)] = (_records_state(path), keys, logged)
+    if logged >= max(STORAGE_COMPACT_MIN_CHANGES, len(keys)):
+        _compact_records(path, columns, key)
+
+def _remove_changes(path):
+    """Delete path's change log, if any"""
+    try:
+        os.remove(_changes_path(path))
+    except FileNotFoundError:
+        pass
+
+def _compact_records(path, columns, key):
+    """Fold path's change log into the CSV (under the lock)"""
+    df = _read_csv_or_empty(path, columns, key)
+    _write_csv_atomic(df, path)
+    # Should this fail, the log no longer matches the file's version and is ignored
+    _remove_changes(path)
+    _record_keys_cache[os.path.abspath(path)] = (_records_state(path), set(_key_values(df[key])), 0)
+
+def compact_records(path, columns, key):
+    """Fold a record file's change log into the CSV, e.g. before copying the CSV as a backup"""
+    with _file_lock(path):
+        if os.path.exists(_changes_path(path)):
+            _compact_records(path, columns, key)
+
+def _replace_records(path, df):
+    """Replace the whole file, dropping its change log, under the lock"""
+    with _file_lock(path):
+        _write_csv_atomic(df, path)
+        _remove_changes(path)
+        _record_keys_cache.pop(os.path.abspath(path), None)
+
+def _upsert_records(path, records, key, columns, insert=True):
+    """
+    Insert or update records by key under the lock. The records are
+    appended to the file's change log, so the cost follows the number of
+    records written, not stored. With insert=False every key must already
+    exist, else KeyError is raised and nothing is written.
+    Returns (added, updated) counts.
+    """
+    with _file_lock(path):
+        keys, logged = _record_keys(path, columns, key)
+        records = records.assign(**{key: _key_values(records[key])})
+        # Looked up one by one: isin would hash every stored key
+        is_update = records[key].map(keys.__contains__).to_numpy(dtype=bool)
+        new_records = records[~is_update]
+        if not insert and len(new_records) > 0:
+            raise KeyError(f"No record with {key} {', '.join(new_records[key])}")
+        
+        # Through to_json, so NaN becomes null and numpy values plain JSON
+        _append_change(path, {'upsert': json.loads(records.to_json(orient='records', date_format='iso'))})
+        keys.update(records[key])
+        _record_written(path, keys, logged + len(records), columns, key)
+        return len(new_records), int(is_update.sum())
+
+def _delete_records(path, key, values, columns):
+    """Delete records whose key is in values under the lock; returns the number of keys removed"""
+    with _file_lock(path):
+        keys, logged = _record_keys(path, columns, key)
+        removed = [value for value in dict.fromkeys(_key_values(pd.Series(list(values), dtype=object)))
+                   if value in keys]
+        if removed:
+            _append_change(path, {'delete': removed})
+            keys.difference_update(removed)
+            _record_written(path, keys, logged + len(removed), columns, key)
+        return len(removed)
@@ -0,0 +1,171 @@
+"""User accounts in USERS_FILE and bcrypt password checks"""
+
+import csv
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import bcrypt
+
+from .config import AUTH_MAX_WORKERS, USER_COLUMNS, USERS_FILE
+from .instrumentation import instrumented
+from .lazy import pd
+from .settings import load_settings
+from .storage import (_apply_changes_to_rows, _delete_records, _read_changes, _read_csv_or_empty, _records_state,
+                      _replace_records, _upsert_records, compact_records)
+
+@functools.lru_cache(maxsize=None)
+def _get_auth_pool():
+    """Thread pool shared by all sessions for bcrypt checks"""
+    return ThreadPoolExecutor(max_workers=AUTH_MAX_WORKERS, thread_name_prefix='bcrypt')
+
+def hash_password(password, rounds=None):
+    """Hash a password using bcrypt at the configured cost"""
+    if rounds is None:
+        rounds = load_settings()['bcrypt_rounds']
+    hashed = _get_auth_pool().submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).result()
+    return hashed.decode('utf-8')
+
+def password_rounds(hashed):
+    """
+    bcrypt cost factor stored in a hash ('$2b$12$...' -> 12), or None if
+    the hash cannot be parsed (so it is rehashed on the next login)
+    """
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+def verify_password(password, hashed):
+    """
+    Verify a password against a hash.
+    Runs in the shared auth thread pool (bcrypt releases the GIL), which
+    caps how many checks use the CPU at once during login spikes.
+    A stored hash bcrypt cannot parse fails the check.
+    """
+    try:
+        return _get_auth_pool().submit(
+            bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8')
+        ).result()
+    except ValueError:
+        return False
+
+@functools.lru_cache(maxsize=4)
+def _load_user_index(path, state):
+    """
+    Read users.csv, with its change log, and index records by username;
+    cached per file version. Uses the csv module rather than pandas, so
+    logging in does not need pandas.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        records = _apply_changes_to_rows(list(csv.DictReader(f)), _read_changes(path), 'username')
+    # The first record wins, as with the old boolean-mask lookup
+    index = {}
+    for record in records:
+        for flag in ('is_admin', 'active'):
+            record[flag] = str(record.get(flag, '')).strip().lower() == 'true'
+        index.setdefault(record['username'], record)
+    return index
+
+@functools.lru_cache(maxsize=4)
+def _load_users_table(path, state):
+    """Read users.csv, with its change log, as a table for the admin panel; cached per file version"""
+    return _read_csv_or_empty(path, USER_COLUMNS, 'username')
+
+def _clear_user_caches():
+    """Drop the cached users.csv reads after a write"""
+    _load_user_index.cache_clear()
+    _load_users_table.cache_clear()
+
+@instrumented('get_user', 'get_user')
+def get_user(username):
+    """One user's record as a dict, or None"""
+    if not os.path.exists(USERS_FILE):
+        load_users()  # Creates the default admin
+    record = _load_user_index(USERS_FILE, _records_state(USERS_FILE)).get(username)
+    return dict(record) if record is not None else None
+
+@instrumented('load_users', 'load_users')
+def load_users():
+    """Load users from CSV file (a copy of the cached table)"""
+    if os.path.exists(USERS_FILE):
+        return _load_users_table(USERS_FILE, _records_state(USERS_FILE)).copy()
+    else:
+        # Create default admin user
+        default_users = pd.DataFrame([{
+            'username': 'admin',
+            'password': hash_password('admin123'),
+            'full_name': 'System Administrator',
+            'is_admin': True,
+            'active': True,
+            'created_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }])
+        save_users(default_users)
+        return default_users
+
+def save_users(df):
+    """Save users to CSV file (atomic full replace)"""
+    _replace_records(USERS_FILE, df)
+    _clear_user_caches()
+
+def compact_users_file():
+    """Fold the users change log into users.csv, so the CSV holds all users (e.g. for a backup)"""
+    compact_records(USERS_FILE, USER_COLUMNS, 'username')
+
+def update_user(username, **fields):
+    """Update fields of one user record in place; raises KeyError if there is no such user"""
+    record = pd.DataFrame([{'username': username, **fields}])
+    _upsert_records(USERS_FILE, record, 'username', USER_COLUMNS, insert=False)
+    _clear_user_caches()
+
+def delete_user(username):
+    """Delete one user record"""
+    removed = _delete_records(USERS_FILE, 'username', [username], USER_COLUMNS) > 0
+    _clear_user_caches()
+    return removed
+
+def authenticate(username, password):
+    """
+    Authenticate a user.
+    A password hashed at a different cost than the configured one is
+    rehashed on successful login.
+    """
+    user = get_user(username)
+    
+    if user is None:
+        return False, None
+    
+    if not user['active']:
+        return False, None
+    
+    if verify_password(password, user['password']):
+        rounds = load_settings()['bcrypt_rounds']
+        if password_rounds(user['password']) != rounds:
+            try:
+                update_user(username, password=hash_password(password, rounds))
+            except KeyError:
+                # Deleted by another session since get_user
+                return False, None
+        return True, user
+    
+    return False, None
+
+def add_user(username, password, full_name, is_admin=False):
+    """Add a new user"""
+    # Check if user already exists
+    if get_user(username) is not None:
+        return False, "Username already exists"
+    
+    new_user = pd.DataFrame([{
+        'username': username,
+        'password': hash_password(password),
+        'full_name': full_name,
+        'is_admin': is_admin,
+        'active': True,
+        'created_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }])
+    
+    _upsert_records(USERS_FILE, new_user, 'username', USER_COLUMNS)
+    _clear_user_caches()
+    return True, "User added successfully"
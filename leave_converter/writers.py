@@ -0,0 +1,81 @@
+"""Serializing breakdowns for download: xlsx, CSV and Parquet"""
+
+import importlib.util
+import io
+
+from .breakdown import format_breakdown, iter_formatted_breakdown
+from .instrumentation import instrumented
+from .lazy import pd
+
+# Download formats: label, file extension and MIME type
+EXPORT_FORMATS = {
+    'xlsx': ('Excel (.xlsx)', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('CSV (.csv)', 'csv', 'text/csv'),
+    'parquet': ('Parquet (.parquet)', 'parquet', 'application/vnd.apache.parquet'),
+}
+# Sheet of xlsx exports listing duplicate, overlapping and miscounted transactions
+ISSUES_SHEET = 'Leave Issues'
+
+def available_export_formats():
+    """Export formats whose writer is installed (Parquet needs pyarrow)"""
+    formats = ['xlsx', 'csv']
+    if importlib.util.find_spec('pyarrow') is not None:
+        formats.append('parquet')
+    return formats
+
+def export_breakdown_excel(breakdown_df, issues=None):
+    """
+    Serialize the breakdown to xlsx bytes in the OpenTime import layout.
+    Findings from find_leave_issues, if any, follow on a second sheet.
+    Uses xlsxwriter in constant-memory mode, writing row by row, and falls
+    back to openpyxl when xlsxwriter is not installed.
+    """
+    output = io.BytesIO()
+    if importlib.util.find_spec('xlsxwriter') is None:
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            format_breakdown(breakdown_df).to_excel(writer, index=False, sheet_name='Leave Breakdown')
+            if issues is not None and len(issues) > 0:
+                issues.to_excel(writer, index=False, sheet_name=ISSUES_SHEET)
+        return output.getvalue()
+    
+    import xlsxwriter
+    
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'nan_inf_to_errors': True})
+    worksheet = workbook.add_worksheet('Leave Breakdown')
+    # Same header style pandas gives to_excel output
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    worksheet.write_row(0, 0, [str(col) for col in breakdown_df.columns], header_format)
+    row_idx = 1
+    for chunk in iter_formatted_breakdown(breakdown_df):
+        for values in chunk.itertuples(index=False, name=None):
+            worksheet.write_row(row_idx, 0, values)
+            row_idx += 1
+    if issues is not None and len(issues) > 0:
+        issues_sheet = workbook.add_worksheet(ISSUES_SHEET)
+        issues_sheet.write_row(0, 0, [str(col) for col in issues.columns], header_format)
+        # Missing related transactions are written as blank cells
+        for row_idx, values in enumerate(issues.astype(object).where(issues.notna(), None)
+                                         .itertuples(index=False, name=None), start=1):
+            issues_sheet.write_row(row_idx, 0, values)
+    workbook.close()
+    return output.getvalue()
+
+@instrumented('export_breakdown', 'export')
+def export_breakdown(breakdown_df, export_format='xlsx', issues=None):
+    """
+    Serialize the breakdown in one of EXPORT_FORMATS and return the bytes.
+    issues (find_leave_issues findings) are added as a sheet to xlsx
+    exports; CSV and Parquet hold the breakdown only.
+    """
+    if export_format == 'xlsx':
+        return export_breakdown_excel(breakdown_df, issues)
+    if export_format == 'csv':
+        output = io.StringIO()
+        for i, chunk in enumerate(iter_formatted_breakdown(breakdown_df)):
+            chunk.to_csv(output, index=False, header=(i == 0))
+        return output.getvalue().encode('utf-8')
+    if export_format == 'parquet':
+        output = io.BytesIO()
+        format_breakdown(breakdown_df).to_parquet(output, index=False)
+        return output.getvalue()
+    raise ValueError(f"Unsupported export format: {export_format}")
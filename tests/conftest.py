@@ -0,0 +1,19 @@
+"""
+Shared fixtures. The data files in leave_converter.config are relative to
+the working directory, so every test runs in its own empty directory.
+"""
+
+import pytest
+
+from leave_converter.employees import _load_roster
+from leave_converter.users import _clear_user_caches
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Run the test in an empty directory with no cached data files"""
+    monkeypatch.chdir(tmp_path)
+    _load_roster.cache_clear()
+    _clear_user_caches()
+    yield tmp_path
+    _load_roster.cache_clear()
+    _clear_user_caches()
@@ -0,0 +1,137 @@
+"""The REST/JSON API, called in-process through its ASGI interface"""
+
+import asyncio
+import base64
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import api
+from leave_converter.employees import save_employee_data
+from leave_converter.settings import save_settings
+from leave_converter.users import add_user, authenticate, delete_user, hash_password, load_users, update_user
+
+@pytest.fixture(autouse=True)
+def users():
+    """The default admin plus jane, hashed at bcrypt's minimum cost"""
+    save_settings(bcrypt_rounds=4)
+    load_users()
+    add_user('jane', 'secret1', 'Jane Doe')
+    api._verified_credentials.clear()
+    yield
+    api._verified_credentials.clear()
+
+def call(method, path, body=b'', username='jane', password='secret1', query=''):
+    """(status, headers, body) of one request"""
+    headers = [(b'content-type', b'application/octet-stream')]
+    if username is not None:
+        token = base64.b64encode(f"{username}:{password}".encode()).decode()
+        headers.append((b'authorization', f"Basic {token}".encode()))
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'path': path, 'raw_path': path.encode(),
+             'root_path': '', 'scheme': 'http', 'query_string': query.encode(), 'headers': headers,
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+    
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # The client stays connected until the response is complete
+        await asyncio.Event().wait()
+    
+    async def send(message):
+        sent.append(message)
+    
+    asyncio.run(api.api(scope, receive, send))
+    start = sent[0]
+    return (start['status'], {key.decode(): value.decode() for key, value in start['headers']},
+            b''.join(message.get('body', b'') for message in sent[1:]))
+
+def count_bcrypt_checks(monkeypatch):
+    """A list that gets one entry per full (bcrypt) authentication"""
+    checks = []
+    authenticate = api.authenticate
+    def counted(username, password):
+        checks.append(username)
+        return authenticate(username, password)
+    monkeypatch.setattr(api, 'authenticate', counted)
+    return checks
+
+def leave_workbook():
+    """An xlsx upload with two days of leave for employee 1001 and one day for an unknown employee"""
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        'Emp. Number': ['1001', '2002'], 'Employee Name': ['Ann Smith', 'Temp'], 'Initials': 'A',
+        'Leave Description': 'Annual', 'Leave Type Description': 'Full Day',
+        'Start Date': ['2025-03-03', '2025-03-05'], 'End Date': ['2025-03-04', '2025-03-05'], 'No Days': [2, 1]
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def test_missing_or_wrong_credentials_are_rejected():
+    assert call('GET', '/api/employees', username=None)[0] == 401
+    assert call('GET', '/api/employees', password='wrong')[0] == 401
+    assert call('GET', '/api/employees', username='ghost')[0] == 401
+    assert call('GET', '/api/health', username=None)[0] == 200
+
+def test_verified_password_is_cached_until_it_changes(monkeypatch):
+    checks = count_bcrypt_checks(monkeypatch)
+    
+    assert call('GET', '/api/employees')[0] == 200
+    assert call('GET', '/api/employees')[0] == 200
+    assert call('GET', '/api/employees', password='wrong')[0] == 401
+    assert checks == ['jane', 'jane']
+    assert all(password_digest != b'secret1' for _, password_digest in api._verified_credentials.values())
+    
+    update_user('jane', password=hash_password('secret2'))
+    assert call('GET', '/api/employees')[0] == 401
+    assert call('GET', '/api/employees', password='secret2')[0] == 200
+
+def test_cached_password_expires(monkeypatch):
+    checks = count_bcrypt_checks(monkeypatch)
+    monkeypatch.setattr(api, 'CREDENTIAL_CACHE_SECONDS', 0)
+    
+    call('GET', '/api/employees')
+    call('GET', '/api/employees')
+    
+    assert checks == ['jane', 'jane']
+    assert len(api._verified_credentials) == 1
+
+def test_deactivated_user_is_rejected_despite_cache():
+    assert call('GET', '/api/employees')[0] == 200
+    update_user('jane', active=False)
+    
+    assert call('GET', '/api/employees')[0] == 401
+
+def test_user_deleted_during_login_is_rejected(monkeypatch):
+    def authenticate_then_delete(username, password):
+        result = authenticate(username, password)
+        delete_user(username)
+        return result
+    monkeypatch.setattr(api, 'authenticate', authenticate_then_delete)
+    
+    assert call('GET', '/api/employees')[0] == 401
+    assert api._verified_credentials == {}
+
+def test_convert_returns_breakdown_with_counts():
+    save_employee_data(pd.DataFrame({
+        'Employee Number': ['1001'], 'First Name': ['Ann'], 'Last Name': ['Smith'],
+        'Monday': [8.0], 'Tuesday': [8.0], 'Wednesday': [8.0], 'Thursday': [8.0], 'Friday': [8.0]
+    }))
+    
+    status, headers, body = call('POST', '/api/convert', leave_workbook(), query='format=csv')
+    
+    assert status == 200
+    assert (headers['x-transactions'], headers['x-records'], headers['x-leave-issues']) == ('2', '2', '0')
+    assert list(pd.read_csv(io.BytesIO(body))['Date']) == ['2025-03-03', '2025-03-04']
+
+def test_xlsx_export_failure_is_a_500_before_the_response_starts(monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError("workbook too large")
+    monkeypatch.setattr(api, 'export_breakdown', fail)
+    
+    status, _, body = call('POST', '/api/convert', leave_workbook())
+    
+    assert status == 500
+    assert json.loads(body) == {'error': "Could not write the xlsx breakdown: workbook too large"}
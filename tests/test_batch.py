@@ -0,0 +1,45 @@
+"""Converting one uploaded sheet: streamed expansion against the whole-sheet engine"""
+
+import functools
+import io
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from leave_converter import batch, reader
+from leave_converter.batch import convert_leave_source
+from leave_converter.breakdown import format_breakdown, process_leave_breakdown
+from leave_converter.reader import read_leave_file
+
+EMPLOYEES = pd.DataFrame({
+    'Employee Number': ['1001', '1002'], 'First Name': ['Ann', 'Ben'], 'Last Name': ['Smith', 'Jones'],
+    'Monday': [8.0, 4.0], 'Tuesday': [8.0, 4.0], 'Wednesday': [8.0, 4.0], 'Thursday': [8.0, 4.0], 'Friday': [8.0, 4.0]
+})
+
+def _workbook():
+    """Leave of two employees, including a duplicate, a declined row and an unknown employee"""
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        'Emp. Number': ['1001', '1002', '1001', '1002', '9999'],
+        'Employee Name': ['Ann Smith', 'Ben Jones', 'Ann Smith', 'Ben Jones', 'Temp'],
+        'Initials': 'A', 'Leave Description': 'Annual', 'Leave Type Description': 'Full Day',
+        'Start Date': ['2025-03-03', '2025-03-05', '2025-03-03', '2025-03-10', '2025-03-03'],
+        'End Date': ['2025-03-07', '2025-03-06', '2025-03-07', '2025-03-10', '2025-03-03'],
+        'No Days': [5, 2, 5, 1, 1],
+        'Status': ['Approved', 'Approved', 'Approved', 'Declined', 'Approved']
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def test_source_is_expanded_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(batch, 'iter_leave_chunks', functools.partial(reader.iter_leave_chunks, chunk_size=2))
+    data = _workbook()
+    
+    result = convert_leave_source('leave.xlsx', data, 0, EMPLOYEES)
+    
+    leave_df, filtered_count = read_leave_file(io.BytesIO(data))
+    expected = process_leave_breakdown(leave_df, EMPLOYEES)
+    assert result['Status'] == '✅'
+    assert (result['Transactions'], result['Filtered'], result['Records']) == (4, 1, len(expected))
+    assert_frame_equal(format_breakdown(result['breakdown']), format_breakdown(expected))
+    # The duplicate is reported by its sheet row, across chunks
+    assert result['issues'][['Issue', 'Row', 'Related Row']].values.tolist() == [['Duplicate', 4, 2]]
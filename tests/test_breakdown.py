@@ -0,0 +1,54 @@
+"""Expanding leave transactions into daily records"""
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from leave_converter import EmployeeRoster, HolidayCalendar, format_breakdown, process_leave_breakdown
+from leave_converter.breakdown import concat_breakdowns, process_leave_chunks
+from leave_converter.reader import iter_leave_chunks, read_leave_file
+
+ROSTER = EmployeeRoster(pd.DataFrame({
+    'Employee Number': ['1001', '1002'], 'First Name': ['Ann', 'Ben'], 'Last Name': ['Smith', 'Jones'],
+    'Monday': 8.0, 'Tuesday': 8.0, 'Wednesday': 8.0, 'Thursday': 8.0, 'Friday': 6.0
+}))
+
+def _write_leave(path):
+    """Seven transactions of two employees (and one unknown) with a declined row among them"""
+    pd.DataFrame({
+        'Emp. Number': ['1001', '1002', '1001', '9999', '1002', '1001', '1002'],
+        'Employee Name': ['Ann Smith', 'Ben Jones', 'Ann Smith', 'Temp', 'Ben Jones', 'Ann Smith', 'Ben Jones'],
+        'Initials': ['A', 'B', 'A', 'T', 'B', 'A', 'B'],
+        'Leave Description': ['Annual', 'Sick', 'Annual', 'Annual', 'Family', 'Study', 'Annual'],
+        'Leave Type Description': ['Full Day', 'Full Day', 'Half Day', 'Full Day', 'Full Day', 'Partial', 'Full Day'],
+        'Start Date': ['2025-12-22', '2025-03-03', '2025-04-04', '2025-03-03', '2025-05-05', '2025-06-06', '2025-07-07'],
+        'End Date': ['2025-12-26', '2025-03-07', '2025-04-04', '2025-03-04', '2025-05-06', '2025-06-06', '2025-07-08'],
+        'No Days': [3, 5, 0.5, 2, 2, 0.25, 2],
+        'Status': ['Approved', 'Approved', 'Approved', 'Approved', 'Declined', 'Approved', 'Approved']
+    }).to_excel(path, index=False)
+
+def test_chunked_expansion_matches_whole_sheet():
+    _write_leave('leave.xlsx')
+    calendar = HolidayCalendar()
+    leave_df, filtered = read_leave_file('leave.xlsx')
+    expected, expected_positions = process_leave_breakdown(leave_df, ROSTER, calendar, source_rows=True)
+    
+    chunked_df, chunked_filtered, breakdown_df, positions = process_leave_chunks(
+        iter_leave_chunks('leave.xlsx', chunk_size=2), ROSTER, calendar)
+    
+    assert_frame_equal(chunked_df, leave_df)
+    assert chunked_filtered == filtered == 1
+    assert_frame_equal(format_breakdown(breakdown_df), format_breakdown(expected))
+    np.testing.assert_array_equal(positions, expected_positions)
+    assert positions.dtype == np.int32
+
+def test_concat_breakdowns_keeps_text_columns_categorical():
+    _write_leave('leave.xlsx')
+    leave_df, _ = read_leave_file('leave.xlsx')
+    parts = [process_leave_breakdown(leave_df.iloc[i:i + 1], ROSTER) for i in range(len(leave_df))]
+    
+    combined = concat_breakdowns(parts)
+    
+    assert isinstance(combined['Employee Name'].dtype, pd.CategoricalDtype)
+    assert list(combined.columns) == list(parts[0].columns)
+    assert_frame_equal(format_breakdown(combined), format_breakdown(process_leave_breakdown(leave_df, ROSTER)))
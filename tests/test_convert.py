@@ -0,0 +1,46 @@
+"""The headless convert.py command"""
+
+import pandas as pd
+
+import convert
+
+def _write_inputs():
+    """One employee, a schedule change adding Saturday hours, and a week of leave"""
+    pd.DataFrame({
+        'Employee Number': ['1001'], 'First Name': ['Ann'], 'Last Name': ['Smith'],
+        'Monday': [8.0], 'Tuesday': [8.0], 'Wednesday': [8.0], 'Thursday': [8.0], 'Friday': [8.0]
+    }).to_csv('employee_data.csv', index=False)
+    pd.DataFrame({
+        'Employee Number': ['1001'], 'Effective From': ['2025-01-01'],
+        'Monday': [8.0], 'Tuesday': [8.0], 'Wednesday': [8.0], 'Thursday': [8.0], 'Friday': [8.0],
+        'Saturday': [4.0], 'Sunday': [0.0]
+    }).to_csv('weekend_schedules.csv', index=False)
+    pd.DataFrame({
+        'Emp. Number': ['1001'], 'Employee Name': ['Ann Smith'], 'Initials': ['A'],
+        'Leave Description': ['Annual'], 'Leave Type Description': ['Annual Leave'],
+        'Start Date': ['2025-03-03'], 'End Date': ['2025-03-09'], 'No Days': [6]
+    }).to_excel('leave.xlsx', index=False)
+
+def _saturday_hours():
+    """Hours on Saturday 8 March in the CSV breakdown of leave.xlsx"""
+    breakdown = pd.read_csv('leave_Leave_Breakdown.csv')
+    return breakdown.loc[pd.to_datetime(breakdown['Date']).dt.dayofweek == 5, 'Daily Hours'].tolist()
+
+def test_schedules_option_applies_weekend_hours():
+    _write_inputs()
+    
+    assert convert.main(['leave.xlsx', '--format', 'csv', '--schedules', 'weekend_schedules.csv']) == 0
+    
+    assert _saturday_hours() == [4.0]
+
+def test_without_schedules_weekends_are_excluded():
+    _write_inputs()
+    
+    assert convert.main(['leave.xlsx', '--format', 'csv']) == 0
+    
+    assert _saturday_hours() == []
+
+def test_missing_schedules_file_is_an_error():
+    _write_inputs()
+    
+    assert convert.main(['leave.xlsx', '--schedules', 'missing.csv']) == 2
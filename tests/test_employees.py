@@ -0,0 +1,64 @@
+"""Employee storage and roster imports"""
+
+import io
+
+import pandas as pd
+
+from leave_converter.employees import (
+    diff_employee_import, get_employee_roster, import_employees, load_employee_data,
+    parse_employee_import, save_employee_data
+)
+
+HEADER = "Employee Number,First Name,Last Name,Monday,Tuesday,Wednesday,Thursday,Friday\n"
+
+def _upload(text, name='employees.csv'):
+    """An uploaded CSV file"""
+    file = io.BytesIO(text.encode())
+    file.name = name
+    return file
+
+def _import(text):
+    """Diff an upload against the stored employees and apply it"""
+    diff = diff_employee_import(parse_employee_import(_upload(HEADER + text)), load_employee_data())
+    return diff, import_employees(diff)
+
+def _seed_numeric():
+    """Two employees whose numbers read back from the CSV as integers by default"""
+    save_employee_data(pd.DataFrame({
+        'Employee Number': [1001, 1002], 'First Name': ['Ann', 'Ben'], 'Last Name': ['Smith', 'Jones'],
+        'Monday': 8.0, 'Tuesday': 8.0, 'Wednesday': 8.0, 'Thursday': 8.0, 'Friday': 8.0
+    }))
+
+def test_import_updates_numeric_employee_number_in_place():
+    _seed_numeric()
+    
+    diff, (added, updated) = _import("1001,Ann,Smith,8,8,8,8,4\n")
+    
+    assert list(diff['Action']) == ['Update']
+    assert (added, updated) == (0, 1)
+    stored = load_employee_data()
+    assert list(stored['Employee Number']) == ['1001', '1002']
+    assert stored.loc[0, 'Friday'] == 4.0
+
+def test_import_diff_reports_add_update_unchanged_and_invalid():
+    _seed_numeric()
+    
+    diff, (added, updated) = _import("1001,Ann,Smith,8,8,8,8,8\n"
+                                     "1002,Ben,Jones,8,8,8,8,6\n"
+                                     "1003,Cara,Brown,7.5,7.5,7.5,7.5,7.5\n"
+                                     "1004,,Green,8,8,8,8,x\n")
+    
+    assert list(diff['Row']) == [2, 3, 4, 5]
+    assert list(diff['Action']) == ['Unchanged', 'Update', 'Add', 'Invalid']
+    assert diff.loc[1, 'Changes'] == 'Friday: 8 -> 6'
+    assert 'First Name missing' in diff.loc[3, 'Errors']
+    assert 'Friday hours not a number' in diff.loc[3, 'Errors']
+    assert (added, updated) == (1, 1)
+    assert list(load_employee_data()['Employee Number']) == ['1001', '1002', '1003']
+
+def test_roster_matches_numeric_employee_numbers_as_text():
+    _seed_numeric()
+    
+    roster = get_employee_roster()
+    
+    assert list(roster.index.get_indexer(['1002', '1001', '1003'])) == [1, 0, -1]
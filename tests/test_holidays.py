@@ -0,0 +1,43 @@
+"""South African public holidays: Easter dates and Sunday observance"""
+
+from datetime import date
+
+import pytest
+
+from leave_converter.holidays import HolidayCalendar, sa_public_holidays
+
+@pytest.mark.parametrize('year, good_friday, family_day', [
+    (2019, date(2019, 4, 19), date(2019, 4, 22)),
+    (2024, date(2024, 3, 29), date(2024, 4, 1)),
+    (2025, date(2025, 4, 18), date(2025, 4, 21)),
+    (2038, date(2038, 4, 23), date(2038, 4, 26)),
+])
+def test_easter_holidays(year, good_friday, family_day):
+    holidays = sa_public_holidays(year)
+    
+    assert holidays[good_friday] == "Good Friday"
+    assert holidays[family_day] == "Family Day"
+
+def test_sunday_holiday_is_observed_on_the_next_free_day():
+    # Christmas 2022 fell on a Sunday; Monday 26 December was already the Day of Goodwill
+    holidays_2022 = sa_public_holidays(2022)
+    assert holidays_2022[date(2022, 12, 27)] == "Christmas Day (observed)"
+    # New Year's Day 2023 fell on a Sunday
+    assert sa_public_holidays(2023)[date(2023, 1, 2)] == "New Year's Day (observed)"
+
+def test_only_sunday_holidays_are_observed_again():
+    holidays = sa_public_holidays(2025)
+    
+    # Freedom Day 2025 fell on a Sunday; the year's other holidays on weekdays or Saturdays
+    assert {day: name for day, name in holidays.items() if name.endswith("(observed)")} == {
+        date(2025, 4, 28): "Freedom Day (observed)"
+    }
+    assert len(holidays) == 13
+
+def test_calendar_excludes_observed_days():
+    calendar = HolidayCalendar()
+    
+    assert date(2022, 12, 27) in calendar
+    assert date(2023, 1, 2) in calendar
+    assert date(2023, 1, 3) not in calendar
+    assert date(2023, 1, 2) not in HolidayCalendar(public_holidays=False)
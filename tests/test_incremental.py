@@ -0,0 +1,65 @@
+"""Incremental processing against a user's previous upload of a source"""
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from leave_converter import EmployeeRoster, HolidayCalendar, filter_approved, normalize, process_leave_breakdown
+from leave_converter.incremental import clear_breakdown_store, process_leave_incremental
+
+ROSTER = EmployeeRoster(pd.DataFrame({
+    'Employee Number': ['1001', '1002'], 'First Name': ['Ann', 'Ben'], 'Last Name': ['Smith', 'Jones'],
+    'Monday': 8.0, 'Tuesday': 8.0, 'Wednesday': 8.0, 'Thursday': 8.0, 'Friday': 6.0
+}))
+CALENDAR = HolidayCalendar()
+
+def _leave(*rows):
+    """Approved transactions from (employee, start, end, days) tuples"""
+    leave_df, _ = filter_approved(normalize(pd.DataFrame({
+        'Emp. Number': [row[0] for row in rows],
+        'Employee Name': ['Ann Smith' if row[0] == '1001' else 'Ben Jones' for row in rows],
+        'Initials': 'X', 'Leave Description': 'Annual', 'Leave Type Description': 'Annual Leave',
+        'Start Date': [row[1] for row in rows], 'End Date': [row[2] for row in rows],
+        'No Days': [row[3] for row in rows]
+    })))
+    return leave_df
+
+def _run(source_name, leave_df):
+    """Incremental breakdown of leave_df for user 'jane', checked against a full calculation"""
+    breakdown_df, delta_df, summary = process_leave_incremental('jane', leave_df, ROSTER, CALENDAR, source_name)
+    assert_frame_equal(breakdown_df, process_leave_breakdown(leave_df, ROSTER, CALENDAR))
+    return delta_df, summary
+
+def test_reupload_of_a_source_expands_only_changed_transactions():
+    first = _leave(('1001', '2025-03-03', '2025-03-05', 3), ('1002', '2025-03-10', '2025-03-10', 1))
+    second = _leave(('1001', '2025-03-03', '2025-03-05', 3), ('1002', '2025-03-10', '2025-03-11', 2))
+    _run('acme.xlsx', first)
+    
+    delta_df, summary = _run('acme.xlsx', second)
+    
+    assert (summary['reused'], summary['expanded'], summary['dropped']) == (1, 1, 1)
+    assert list(delta_df['Change']) == ['Added']
+    assert summary['previous']['source'] == 'acme.xlsx'
+
+def test_sources_of_one_user_are_stored_separately():
+    acme = _leave(('1001', '2025-03-03', '2025-03-05', 3))
+    globex = _leave(('1002', '2025-04-01', '2025-04-01', 1))
+    _run('acme.xlsx', acme)
+    
+    _, summary = _run('globex.xlsx', globex)
+    assert summary['previous'] is None
+    
+    delta_df, summary = _run('acme.xlsx', acme)
+    assert (summary['reused'], summary['expanded'], summary['dropped']) == (1, 0, 0)
+    assert len(delta_df) == 0
+
+def test_clear_breakdown_store_forgets_one_or_every_source():
+    acme = _leave(('1001', '2025-03-03', '2025-03-05', 3))
+    _run('acme.xlsx', acme)
+    _run('globex.xlsx', acme)
+    
+    clear_breakdown_store('jane', 'acme.xlsx')
+    assert _run('acme.xlsx', acme)[1]['previous'] is None
+    assert _run('globex.xlsx', acme)[1]['previous'] is not None
+    
+    clear_breakdown_store('jane')
+    assert _run('globex.xlsx', acme)[1]['previous'] is None
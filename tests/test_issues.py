@@ -0,0 +1,88 @@
+"""Duplicate, overlapping and miscounted transactions"""
+
+import pandas as pd
+from openpyxl import Workbook
+
+from leave_converter import EmployeeRoster, HolidayCalendar, convert, find_leave_issues, process_leave_breakdown
+from leave_converter.reader import SOURCE_ROW_COLUMN, read_leave_file
+
+ROSTER = EmployeeRoster(pd.DataFrame({
+    'Employee Number': ['1001', '1002'], 'First Name': ['Ann', 'Ben'], 'Last Name': ['Smith', 'Jones'],
+    'Monday': 8.0, 'Tuesday': 8.0, 'Wednesday': 8.0, 'Thursday': 8.0, 'Friday': 0.0
+}))
+HEADER = ['Emp. Number', 'Employee Name', 'Initials', 'Leave Description', 'Leave Type Description',
+          'Start Date', 'End Date', 'No Days', 'Status']
+
+def _workbook(path, transactions):
+    """A leave export with a two-row report banner, so the header is sheet row 4"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Leave Transactions Report'])
+    sheet.append(['Printed 2025-08-01'])
+    sheet.append([])
+    sheet.append(HEADER)
+    for transaction in transactions:
+        sheet.append(list(transaction))
+    workbook.save(path)
+
+def _transaction(emp, start, end, days, status='Approved', leave='Annual'):
+    name = 'Ann Smith' if emp == '1001' else 'Ben Jones'
+    return (emp, name, name[0], leave, 'Full Day', start, end, days, status)
+
+def _issues(path):
+    """Findings for a workbook, as convert() reports them"""
+    return convert(path, ROSTER, HolidayCalendar()).issues
+
+def test_findings_name_sheet_rows():
+    _workbook('leave.xlsx', [
+        _transaction('1001', '2025-03-03', '2025-03-05', 3),                      # row 5
+        _transaction('1002', '2025-03-03', '2025-03-03', 1, status='Declined'),   # row 6, filtered out
+        _transaction('1001', '2025-03-03', '2025-03-05', 3),                      # row 7, duplicate of 5
+        _transaction('1001', '2025-03-05', '2025-03-06', 2, leave='Sick'),        # row 8, overlaps 5
+        _transaction('1002', '2025-03-10', '2025-03-14', 5),                      # row 9, Friday has no hours
+    ])
+    
+    issues = _issues('leave.xlsx')
+    
+    assert list(zip(issues['Issue'], issues['Row'], issues['Related Row'].astype(object))) == [
+        ('Duplicate', 7, 5), ('Overlap', 8, 5), ('No Days mismatch', 9, pd.NA)
+    ]
+    assert list(issues['Detail']) == [
+        "Same as row 5",
+        "Overlaps row 5 (2025-03-03 to 2025-03-05)",
+        "No Days is 5 but the schedule gives hours on 4 days"
+    ]
+
+def test_sheet_rows_survive_filtering_across_chunks():
+    _workbook('leave.xlsx', [_transaction('1001', f'2025-04-{day:02d}', f'2025-04-{day:02d}', 1,
+                                          status='Declined' if day % 3 == 0 else 'Approved')
+                             for day in range(1, 21)])
+    
+    leave_df, filtered = read_leave_file('leave.xlsx', chunk_size=4)
+    
+    assert filtered == 6
+    assert list(leave_df[SOURCE_ROW_COLUMN]) == [4 + day for day in range(1, 21) if day % 3 != 0]
+
+def test_duplicates_without_other_findings():
+    _workbook('leave.xlsx', [_transaction('1001', '2025-03-03', '2025-03-04', 2)] * 2)
+    
+    issues = _issues('leave.xlsx')
+    
+    assert list(issues['Issue']) == ['Duplicate']
+    assert list(issues['Detail']) == ["Same as row 5"]
+
+def test_frames_without_sheet_rows_use_positions():
+    leave_df = pd.DataFrame([_transaction('1001', '2025-03-03', '2025-03-04', 2)] * 2, columns=HEADER)
+    for col in ['Start Date', 'End Date']:
+        leave_df[col] = pd.to_datetime(leave_df[col])
+    breakdown_df, positions = process_leave_breakdown(leave_df, ROSTER, source_rows=True)
+    
+    issues = find_leave_issues(leave_df, ROSTER, breakdown_df, positions)
+    
+    assert (issues.loc[0, 'Row'], issues.loc[0, 'Related Row']) == (2, 1)
+
+def test_no_findings():
+    _workbook('leave.xlsx', [_transaction('1001', '2025-03-03', '2025-03-04', 2),
+                             _transaction('1002', '2025-03-03', '2025-03-04', 2)])
+    
+    assert len(_issues('leave.xlsx')) == 0
@@ -0,0 +1,150 @@
+"""
+Background job ownership: a server queues a job again only when no
+running server holds it, and only one server gets to.
+"""
+
+import socket
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+import pytest
+
+from leave_converter import jobs
+from leave_converter.jobs import (LeaveJobQueue, create_job, get_job_queue, job_result_path, read_job,
+                                  run_leave_job_source, submit_leave_job, update_job)
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Job ids queued by LeaveJobQueue, without starting worker processes"""
+    ids = []
+    monkeypatch.setattr(LeaveJobQueue, 'submit', lambda self, job_id: ids.append(job_id))
+    return ids
+
+class _RecordingPool:
+    """Stands in for the worker pool: records the tasks it is given and never runs them"""
+    
+    def __init__(self):
+        self.tasks = []
+    
+    def submit(self, fn, *args):
+        self.tasks.append((fn.__name__, args))
+        return Future()
+
+EMPLOYEES = pd.DataFrame({
+    'Employee Number': ['1001'], 'First Name': ['Ann'], 'Last Name': ['Smith'],
+    'Monday': [8.0], 'Tuesday': [8.0], 'Wednesday': [8.0], 'Thursday': [8.0], 'Friday': [8.0]
+})
+SOURCES = [('leave.xlsx', b'workbook', 'Sheet1')]
+
+def _running_job(owner, lease_until):
+    job_id = create_job('admin', SOURCES, EMPLOYEES, 'csv', True)
+    update_job(job_id, status='running', owner=owner, lease_until=lease_until)
+    return job_id
+
+def _exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_job_with_live_lease_is_left_to_its_server(submitted):
+    job_id = _running_job('other-host:4242', time.time() + 60)
+    
+    LeaveJobQueue()
+    
+    assert submitted == []
+    job = read_job(job_id)
+    assert job['status'] == 'running' and job['owner'] == 'other-host:4242'
+
+def test_expired_job_is_claimed_by_one_queue(submitted):
+    job_id = _running_job('other-host:4242', time.time() - 1)
+    
+    LeaveJobQueue()
+    LeaveJobQueue()
+    
+    assert submitted == [job_id]
+    job = read_job(job_id)
+    assert job['status'] == 'queued' and job['owner'] == jobs._server_id()
+    assert job['lease_until'] > time.time()
+
+def test_job_of_exited_server_on_this_host_is_claimed(submitted):
+    job_id = _running_job(f"{socket.gethostname()}:{_exited_pid()}", time.time() + 60)
+    
+    LeaveJobQueue()
+    
+    assert submitted == [job_id]
+
+def test_concurrent_claims_take_a_job_once():
+    job_id = _running_job('other-host:4242', time.time() - 1)
+    barrier = threading.Barrier(8)
+    claimed = []
+    
+    def claim():
+        barrier.wait()
+        claimed.append(jobs._claim_job(job_id))
+    
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert claimed.count(True) == 1
+
+def test_new_job_is_submitted_once(monkeypatch):
+    pool = _RecordingPool()
+    monkeypatch.setattr(LeaveJobQueue, '_get_pool', lambda self: pool)
+    get_job_queue.cache_clear()
+    try:
+        job_id = submit_leave_job('admin', SOURCES, EMPLOYEES, 'csv', True)
+        get_job_queue().submit(job_id)
+        # A queue started while the job is pending leaves it to its server
+        LeaveJobQueue()
+    finally:
+        get_job_queue.cache_clear()
+    
+    assert pool.tasks == [('run_leave_job_source', (job_id, 0))]
+
+def _workbook(start, end):
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        'Emp. Number': ['1001'], 'Employee Name': ['Ann Smith'], 'Initials': ['A'],
+        'Leave Description': ['Annual'], 'Leave Type Description': ['Full Day'],
+        'Start Date': [start], 'End Date': [end], 'No Days': [2]
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def test_sources_are_queued_as_separate_tasks(monkeypatch):
+    pool = _RecordingPool()
+    monkeypatch.setattr(LeaveJobQueue, '_get_pool', lambda self: pool)
+    sources = [('a.xlsx', _workbook('2025-03-03', '2025-03-04'), 'Sheet1'),
+               ('b.xlsx', _workbook('2025-03-10', '2025-03-11'), 'Sheet1')]
+    job_id = create_job('admin', sources, EMPLOYEES, 'csv', True)
+    
+    LeaveJobQueue().submit(job_id)
+    
+    assert pool.tasks == [('run_leave_job_source', (job_id, 0)), ('run_leave_job_source', (job_id, 1))]
+
+def test_last_converted_source_finishes_the_job():
+    sources = [('a.xlsx', _workbook('2025-03-03', '2025-03-04'), 'Sheet1'),
+               ('b.xlsx', _workbook('2025-03-10', '2025-03-11'), 'Sheet1')]
+    job_id = create_job('admin', sources, EMPLOYEES, 'csv', True)
+    
+    run_leave_job_source(job_id, 1)
+    job = read_job(job_id)
+    assert job['status'] == 'running' and job['source_progress'] == [0.0, 1.0]
+    assert job['progress'] == pytest.approx(0.475)
+    
+    run_leave_job_source(job_id, 0)
+    job = read_job(job_id)
+    assert job['status'] == 'done' and job['progress'] == 1.0
+    assert [result['File'] for result in job['results']] == ['a.xlsx', 'b.xlsx']
+    assert job['records'] == 4
+    breakdown = pd.read_csv(job_result_path(job))
+    assert len(breakdown) == 4
+    assert not any(name.startswith('source_') for name in os.listdir(os.path.dirname(job_result_path(job))))
@@ -0,0 +1,67 @@
+"""Expansion split by employee across worker processes"""
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from leave_converter import (EmployeeRoster, HolidayCalendar, format_breakdown, partition_by_employee,
+                             process_leave_breakdown, process_leave_breakdown_sharded, sharding)
+
+ROSTER = EmployeeRoster(
+    pd.DataFrame({
+        'Employee Number': [f'E{i}' for i in range(6)], 'First Name': 'A', 'Last Name': 'B',
+        'Monday': 8.0, 'Tuesday': 8.0, 'Wednesday': 7.5, 'Thursday': 8.0, 'Friday': 5.0
+    }),
+    schedule_df=pd.DataFrame({
+        'Employee Number': ['E1'], 'Effective From': ['2025-06-01'],
+        'Monday': [4.0], 'Tuesday': [4.0], 'Wednesday': [4.0], 'Thursday': [4.0], 'Friday': [4.0],
+        'Saturday': [3.0], 'Sunday': [0.0]
+    })
+)
+
+def _leave(count, seed=0):
+    """Random transactions of the roster employees and one unknown employee"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, count), 'D')
+    return pd.DataFrame({
+        'Emp. Number': rng.choice([f'E{i}' for i in range(7)], count),
+        'Employee Name': 'A B', 'Initials': 'A', 'Leave Description': rng.choice(['Annual', 'Sick'], count),
+        'Leave Type Description': 'Full Day', 'Start Date': start,
+        'End Date': start + pd.to_timedelta(rng.integers(0, 12, count), 'D'),
+        'No Days': rng.choice([0.5, 1.0, 3.0], count)
+    })
+
+def test_partition_keeps_employees_together():
+    emp_nums = np.array(['E1', 'E2', 'E1', 'E3', 'E2', 'E1', 'E4'], dtype=object)
+    
+    shards = partition_by_employee(emp_nums, 3)
+    
+    assert sorted(np.concatenate(shards).tolist()) == list(range(len(emp_nums)))
+    assert [len(set(emp_nums[rows])) for rows in shards] == [1, 1, 2]
+    assert all(len(set(emp_nums[rows]) & set(emp_nums[other])) == 0
+               for i, rows in enumerate(shards) for other in shards[i + 1:])
+
+def test_sharded_matches_serial(monkeypatch):
+    monkeypatch.setattr(sharding, 'EXPAND_PARALLEL_MIN_TRANSACTIONS', 0)
+    monkeypatch.setattr(sharding, 'EXPAND_MAX_WORKERS', 2)
+    leave_df = _leave(2000)
+    calendar = HolidayCalendar(True, {pd.Timestamp('2025-03-03').date(): 'Shutdown'})
+    expected, expected_positions = process_leave_breakdown(leave_df, ROSTER, calendar, source_rows=True)
+    
+    breakdown_df, positions = process_leave_breakdown_sharded(leave_df, ROSTER, calendar, workers=4,
+                                                              source_rows=True)
+    
+    assert_frame_equal(format_breakdown(breakdown_df), format_breakdown(expected))
+    np.testing.assert_array_equal(positions, expected_positions)
+
+def test_small_frames_and_single_core_stay_in_process(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("worker pool started")
+    monkeypatch.setattr(sharding, 'ProcessPoolExecutor', no_pool)
+    leave_df = _leave(200)
+    expected = format_breakdown(process_leave_breakdown(leave_df, ROSTER))
+    
+    assert_frame_equal(format_breakdown(process_leave_breakdown_sharded(leave_df, ROSTER, workers=4)), expected)
+    monkeypatch.setattr(sharding, 'EXPAND_PARALLEL_MIN_TRANSACTIONS', 0)
+    monkeypatch.setattr(sharding, 'EXPAND_MAX_WORKERS', 1)
+    assert_frame_equal(format_breakdown(process_leave_breakdown_sharded(leave_df, ROSTER, workers=4)), expected)
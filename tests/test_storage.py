@@ -0,0 +1,84 @@
+"""Keyed record files: change-log writes, compaction and concurrent writers"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from leave_converter import storage
+from leave_converter.storage import _delete_records, _read_csv_or_empty, _replace_records, _upsert_records
+
+COLUMNS = ['id', 'name', 'hours']
+
+def _seed(count):
+    _replace_records('records.csv', pd.DataFrame({'id': range(count), 'name': 'x', 'hours': 8}))
+
+def _table():
+    return _read_csv_or_empty('records.csv', COLUMNS, 'id')
+
+def test_small_write_leaves_the_csv_alone():
+    _seed(5000)
+    before = os.stat('records.csv')
+    
+    assert _upsert_records('records.csv', pd.DataFrame({'id': ['7'], 'hours': [7.5]}), 'id', COLUMNS) == (0, 1)
+    assert _upsert_records('records.csv', pd.DataFrame({'id': ['new'], 'name': ['y']}), 'id', COLUMNS) == (1, 0)
+    assert _delete_records('records.csv', 'id', ['3', 'missing'], COLUMNS) == 1
+    
+    after = os.stat('records.csv')
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert os.path.getsize('records.csv.changes') < 200
+    table = _table().set_index('id')
+    assert len(table) == 5000
+    assert table.loc['7', 'hours'] == 7.5 and table.loc['7', 'name'] == 'x'
+    assert table.loc['new', 'name'] == 'y' and pd.isna(table.loc['new', 'hours'])
+    assert '3' not in table.index
+
+def test_deleted_then_added_record_starts_afresh():
+    _seed(3)
+    
+    _delete_records('records.csv', 'id', ['1'], COLUMNS)
+    _upsert_records('records.csv', pd.DataFrame({'id': ['1'], 'name': ['again']}), 'id', COLUMNS)
+    
+    table = _table()
+    assert list(table['id']) == ['0', '2', '1']
+    assert table['name'].iloc[-1] == 'again' and pd.isna(table['hours'].iloc[-1])
+
+def test_log_is_folded_into_the_csv_once_it_matches_the_table(monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_COMPACT_MIN_CHANGES', 1)
+    _seed(4)
+    
+    for i in range(3):
+        _upsert_records('records.csv', pd.DataFrame({'id': [str(i)], 'hours': [i]}), 'id', COLUMNS)
+    assert os.path.exists('records.csv.changes')
+    _upsert_records('records.csv', pd.DataFrame({'id': ['3'], 'hours': [3]}), 'id', COLUMNS)
+    
+    assert not os.path.exists('records.csv.changes')
+    stored = pd.read_csv('records.csv')
+    assert list(stored['hours']) == [0, 1, 2, 3]
+
+def test_write_of_another_process_is_seen():
+    _seed(2)
+    _upsert_records('records.csv', pd.DataFrame({'id': ['a']}), 'id', COLUMNS)
+    # Another process adds 'b', which this process's key cache does not know about
+    with open('records.csv.changes', 'a') as f:
+        f.write('{"upsert": [{"id": "b"}]}\n')
+    
+    with pytest.raises(KeyError):
+        _upsert_records('records.csv', pd.DataFrame({'id': ['c']}), 'id', COLUMNS, insert=False)
+    assert _upsert_records('records.csv', pd.DataFrame({'id': ['b'], 'name': ['bee']}), 'id', COLUMNS) == (0, 1)
+    assert list(_table()['id']) == ['0', '1', 'a', 'b']
+
+def test_log_of_a_replaced_file_is_ignored():
+    _seed(2)
+    _upsert_records('records.csv', pd.DataFrame({'id': ['a']}), 'id', COLUMNS)
+    with open('records.csv.changes') as f:
+        log = f.read()
+    
+    _replace_records('records.csv', pd.DataFrame({'id': ['z'], 'name': ['zed'], 'hours': [1]}))
+    # As if the replacing process stopped before removing the old log
+    with open('records.csv.changes', 'w') as f:
+        f.write(log)
+    
+    assert list(_table()['id']) == ['z']
+    _upsert_records('records.csv', pd.DataFrame({'id': ['y']}), 'id', COLUMNS)
+    assert list(_table()['id']) == ['z', 'y']
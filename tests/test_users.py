@@ -0,0 +1,67 @@
+"""User records in USERS_FILE"""
+
+import pytest
+
+from leave_converter.settings import save_settings
+from leave_converter.users import (_clear_user_caches, add_user, authenticate, get_user, load_users, password_rounds,
+                                   update_user)
+
+@pytest.fixture(autouse=True)
+def fast_hashes():
+    """Hash at bcrypt's minimum cost so tests do not wait on key stretching"""
+    save_settings(bcrypt_rounds=4)
+
+def test_add_user_appends_to_the_change_log():
+    load_users()
+    with open('users.csv') as f:
+        before = f.read()
+    
+    assert add_user('jane', 'secret1', 'Jane Doe') == (True, "User added successfully")
+    
+    with open('users.csv') as f:
+        assert f.read() == before
+    assert list(load_users()['username']) == ['admin', 'jane']
+    assert get_user('jane')['full_name'] == 'Jane Doe'
+
+def test_entry_cut_short_by_a_crash_is_ignored():
+    load_users()
+    add_user('jane', 'secret1', 'Jane Doe')
+    with open('users.csv.changes', 'a') as f:
+        f.write('{"upsert": [{"username": "bo')
+    _clear_user_caches()
+    
+    assert get_user('bo') is None
+    assert add_user('kim', 'secret1', 'Kim Lee') == (True, "User added successfully")
+    assert list(load_users()['username']) == ['admin', 'jane', 'kim']
+    assert get_user('kim')['active'] is True
+
+def test_update_user_changes_only_the_given_fields():
+    load_users()
+    add_user('jane', 'secret1', 'Jane Doe')
+    
+    update_user('jane', active=False)
+    
+    jane = get_user('jane')
+    assert jane['active'] is False
+    assert jane['full_name'] == 'Jane Doe'
+    assert authenticate('jane', 'secret1') == (False, None)
+
+def test_update_user_rejects_unknown_username():
+    load_users()
+    with open('users.csv') as f:
+        before = f.read()
+    
+    with pytest.raises(KeyError):
+        update_user('ghost', active=False)
+    
+    with open('users.csv') as f:
+        assert f.read() == before
+    assert get_user('ghost') is None
+
+def test_unparseable_stored_hash_fails_login():
+    load_users()
+    add_user('jane', 'secret1', 'Jane Doe')
+    update_user('jane', password='not-a-bcrypt-hash')
+    
+    assert authenticate('jane', 'secret1') == (False, None)
+    assert password_rounds('not-a-bcrypt-hash') is None
@@ -6,6 +6,7 @@ Tests core functionality without running Streamlit
 
 import sys
 import os
+import subprocess
 
 print("=" * 70)
 print("RDS PaySpace Leave Converter - Validation Script")
@@ -26,6 +27,7 @@ print()
 print("✓ Testing: Required Files")
 required_files = [
     'app.py',
+    'leave_converter/__init__.py',
     'requirements.txt',
     'RDS_Logo.jpg',
     'employee_data_seed.csv',
@@ -73,40 +75,94 @@ if missing_deps:
 else:
     print()
 
-# Test 4: Test core functions
+# Test 4: Measure app start-up import time
+print("✓ Testing: Start-up Import Time")
+# The conversion core must import quickly and without Streamlit
+CORE_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import leave_converter
+print(time.perf_counter() - start)
+print(','.join(name for name in ['streamlit', 'pandas', 'openpyxl'] if name in sys.modules))
+"""
+
+try:
+    result = subprocess.run([sys.executable, '-c', CORE_SCRIPT], capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    core_seconds, core_modules = result.stdout.splitlines()[-2:]
+    core_modules = [name for name in core_modules.split(',') if name]
+    if core_modules:
+        print(f"  ⚠️  import leave_converter: {float(core_seconds):.2f}s, but it loaded {', '.join(core_modules)}")
+    else:
+        print(f"  ✅ import leave_converter: {float(core_seconds):.2f}s (no Streamlit, pandas deferred)")
+except Exception as e:
+    print(f"  ❌ Core import test failed: {e}")
+
+# Modules the login page should not wait for; app.py loads them on first use
+DEFERRED_MODULES = ['pandas', 'openpyxl']
+STARTUP_SCRIPT = f"""
+import sys, time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+print(','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))
+start = time.perf_counter()
+for name in {DEFERRED_MODULES!r}:
+    __import__(name)
+print(time.perf_counter() - start)
+"""
+
+try:
+    # A fresh interpreter, so modules imported by this script do not count
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    app_seconds, eager_modules, deferred_seconds = result.stdout.strip().splitlines()[-3:]
+    eager_modules = [name for name in eager_modules.split(',') if name]
+    
+    print(f"  ✅ import app: {float(app_seconds):.2f}s")
+    # -X importtime lines are "import time: self [us] | cumulative | package",
+    # indented two spaces per nesting level, each package after its imports;
+    # app's direct imports are the one-level entries before app itself
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.strip() == 'app' and not name.startswith('  '):
+            break
+        if name.startswith('   ') and not name.startswith('    '):
+            imports.append((int(cumulative), name.strip()))
+    for cumulative, name in sorted(imports, reverse=True)[:5]:
+        print(f"     {name:25} {cumulative / 1e6:.2f}s")
+    
+    if eager_modules:
+        print(f"  ⚠️  Imported at start-up instead of on first use: {', '.join(eager_modules)}")
+    else:
+        print(f"  ✅ Deferred until first use: {', '.join(DEFERRED_MODULES)} ({float(deferred_seconds):.2f}s)")
+except Exception as e:
+    print(f"  ❌ Start-up import test failed: {e}")
+print()
+
+# Test 5: Test core functions
 print("✓ Testing: Core Functionality")
 
 try:
     import pandas as pd
-    import bcrypt
-    from datetime import datetime, timedelta
+    from leave_converter import EmployeeRoster, HolidayCalendar, expand, filter_approved, normalize
+    from leave_converter.users import hash_password, verify_password
     
     # Test password hashing
     test_password = "test123"
-    hashed = bcrypt.hashpw(test_password.encode('utf-8'), bcrypt.gensalt())
-    verified = bcrypt.checkpw(test_password.encode('utf-8'), hashed)
+    hashed = hash_password(test_password, rounds=4)
     
-    if verified:
+    if verify_password(test_password, hashed) and not verify_password("wrong", hashed):
         print("  ✅ Password encryption/verification")
     else:
         print("  ❌ Password verification failed")
     
-    # Test date calculations
-    start = datetime(2025, 12, 22)
-    end = datetime(2025, 12, 26)
-    days = []
-    current = start
-    while current <= end:
-        if current.weekday() not in [5, 6]:  # Skip weekends
-            days.append(current)
-        current += timedelta(days=1)
-    
-    expected_days = 5  # Mon, Tue, Wed, Thu, Fri
-    if len(days) == expected_days:
-        print("  ✅ Date range calculation")
-    else:
-        print(f"  ❌ Date calculation: expected {expected_days}, got {len(days)}")
-    
     # Test Excel reading
     df = pd.read_csv('employee_data_seed.csv')
     if len(df) == 34:
@@ -114,14 +170,33 @@ try:
     else:
         print(f"  ⚠️  CSV reading ({len(df)} employees, expected 34)")
     
-    # Test partial day calculation
-    partial_days = 0.5
-    base_hours = 8.5
-    calculated = partial_days * base_hours
-    expected = 4.25
+    # Run the conversion pipeline on Mon 22 - Fri 26 Dec 2025 (Christmas and
+    # Day of Goodwill are public holidays) and a half day
+    roster = EmployeeRoster(df)
+    raw_df = pd.DataFrame({
+        'Emp. Number': ['RDS00004', 'RDS00004'],
+        'Employee Name': ['Elvis Mzukwa', 'Elvis Mzukwa'],
+        'Initials': ['E', 'E'],
+        'Leave Description': ['Annual', 'Annual'],
+        'Leave Type Description': ['Annual Leave', 'Annual Leave'],
+        'Start Date': ['2025-12-22', '2025-12-29'],
+        'End Date': ['2025-12-26', '2025-12-29'],
+        'No Days': [3, 0.5],
+    })
+    leave_df, _ = filter_approved(normalize(raw_df))
     
-    if calculated == expected:
-        print(f"  ✅ Partial day calculation (0.5 × 8.5 = 4.25)")
+    without_holidays = expand(leave_df.iloc[:1], roster, HolidayCalendar(False))
+    with_holidays = expand(leave_df.iloc[:1], roster, HolidayCalendar())
+    if len(without_holidays) == 5 and len(with_holidays) == 3:
+        print("  ✅ Date range calculation (weekdays, public holidays excluded)")
+    else:
+        print(f"  ❌ Date calculation: expected 5 and 3 days, got {len(without_holidays)} and {len(with_holidays)}")
+    
+    # Test partial day calculation
+    monday_hours = float(df.loc[df['Employee Number'] == 'RDS00004', 'Monday'].iloc[0])
+    partial = expand(leave_df.iloc[1:], roster, HolidayCalendar())
+    if len(partial) == 1 and abs(partial['Daily Hours'].iloc[0] - 0.5 * monday_hours) < 1e-9:
+        print(f"  ✅ Partial day calculation (0.5 × {monday_hours:g} = {0.5 * monday_hours:g})")
     else:
         print(f"  ❌ Partial day calculation failed")
     
@@ -131,7 +206,7 @@ except Exception as e:
     print(f"  ❌ Core functionality test failed: {e}")
     print()
 
-# Test 5: Check logo file
+# Test 6: Check logo file
 print("✓ Testing: Logo File")
 try:
     from PIL import Image
@@ -143,7 +218,7 @@ except Exception as e:
     print(f"  ❌ Logo test failed: {e}")
     print()
 
-# Test 6: Validate seed data
+# Test 7: Validate seed data
 print("✓ Testing: Seed Data Structure")
 try:
     df = pd.read_csv('employee_data_seed.csv')